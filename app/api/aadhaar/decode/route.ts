@@ -1,6 +1,36 @@
 import { NextResponse } from "next/server";
 import { spawn } from "child_process";
 import path from "path";
+import { callPythonWorker, scriptEnv } from "@/lib/python-worker";
+
+// Map decode_aadhaar.py output to the response the frontend expects
+function toDecodeResponse(result: any): NextResponse {
+    if (!result.success) {
+        return NextResponse.json({ error: result.error || "Decoding failed" }, { status: 400 });
+    }
+
+    const data = result.data;
+
+    const identity = {
+        uid: data.aadhaar_masked || (data.aadhaar_last_4 ? `XXXX XXXX ${data.aadhaar_last_4}` : ""),
+        name: data.name || "",
+        dob: data.dob || "",
+        gender: data.gender || "",
+        address: data.address || "",
+        city: data.vtc || data.district || "",
+        state: data.state || "",
+        pincode: data.pincode || "",
+        // Additional fields for debugging/display
+        reference_id: data.reference_id || "",
+        care_of: data.care_of || "",
+        _raw_parts: data._raw_parts || [],
+    };
+
+    return NextResponse.json({
+        verified: true,
+        identity
+    });
+}
 
 export async function POST(req: Request) {
     try {
@@ -10,11 +40,20 @@ export async function POST(req: Request) {
             return NextResponse.json({ error: "No payload provided" }, { status: 400 });
         }
 
+        // Prefer the persistent Python worker, fall back to spawning the script
+        const workerResult = await callPythonWorker("aadhaar.decode", { qrPayload }).catch((e) => {
+            console.error("Python worker error, spawning decoder:", e);
+            return null;
+        });
+        if (workerResult) {
+            return toDecodeResponse(workerResult);
+        }
+
         // Execute Python script to decode
         const scriptPath = path.join(process.cwd(), "lib", "decode_aadhaar.py");
 
         return new Promise<NextResponse>((resolve) => {
-            const pythonProcess = spawn("python3", [scriptPath]);
+            const pythonProcess = spawn("python3", [scriptPath], { env: scriptEnv() });
 
             let outputData = "";
             let errorData = "";
@@ -39,34 +78,7 @@ export async function POST(req: Request) {
                 }
 
                 try {
-                    const result = JSON.parse(outputData);
-                    if (result.success) {
-                        // Map pyaadhaar output to our expected format
-                        const data = result.data;
-
-                        // Map Python output to frontend expected format
-                        const identity = {
-                            uid: data.aadhaar_masked || (data.aadhaar_last_4 ? `XXXX XXXX ${data.aadhaar_last_4}` : ""),
-                            name: data.name || "",
-                            dob: data.dob || "",
-                            gender: data.gender || "",
-                            address: data.address || "",
-                            city: data.vtc || data.district || "",
-                            state: data.state || "",
-                            pincode: data.pincode || "",
-                            // Additional fields for debugging/display
-                            reference_id: data.reference_id || "",
-                            care_of: data.care_of || "",
-                            _raw_parts: data._raw_parts || [],
-                        };
-
-                        resolve(NextResponse.json({
-                            verified: true,
-                            identity
-                        }));
-                    } else {
-                        resolve(NextResponse.json({ error: result.error || "Decoding failed" }, { status: 400 }));
-                    }
+                    resolve(toDecodeResponse(JSON.parse(outputData)));
                 } catch (e) {
                     console.error("JSON parse error:", e, outputData);
                     resolve(NextResponse.json({ error: "Invalid response from decoder" }, { status: 500 }));
@@ -1,42 +1,65 @@
 import { NextRequest, NextResponse } from 'next/server';
 import prisma from '@/lib/prisma';
-import { exec } from 'child_process';
+import { execFile } from 'child_process';
 import { promisify } from 'util';
 import path from 'path';
+import { callPythonWorker, scriptEnv } from '@/lib/python-worker';
 
-const execAsync = promisify(exec);
+const execFileAsync = promisify(execFile);
 
-// Helper to generate barcode using Python script
+type BarcodeResult = { barcode: string; verification_hash: string; is_valid: boolean };
+
+// Thrown when neither the worker nor the script could produce a barcode;
+// there is no local fallback, as only the Python side allocates sequences
+// and computes check digits
+class BarcodeUnavailableError extends Error {}
+
+// Helper to generate barcode using Python script; the daily sequence is
+// allocated atomically on the Python side (scripts/barcode_sequence.py)
 async function generateBarcodeWithPython(
     labCode: string,
     patientId: string,
-    testCode: string,
-    sequence: number
-): Promise<{ barcode: string; verification_hash: string; is_valid: boolean }> {
+    testCode: string
+): Promise<BarcodeResult> {
     const scriptPath = path.join(process.cwd(), 'scripts', 'generate_barcode.py');
 
+    // Prefer the persistent Python worker, fall back to running the script
+    try {
+        const workerResult = await callPythonWorker<BarcodeResult>(
+            'barcode.generate',
+            { lab_code: labCode, patient_id: patientId, test_code: testCode }
+        );
+        if (workerResult) {
+            return {
+                barcode: workerResult.barcode,
+                verification_hash: workerResult.verification_hash,
+                is_valid: workerResult.is_valid
+            };
+        }
+    } catch (error) {
+        console.error('Python worker barcode generation failed, running the script:', error);
+    }
+
     try {
-        const { stdout } = await execAsync(
-            `python "${scriptPath}" -l "${labCode}" -p "${patientId}" -t "${testCode}" -s ${sequence}`
+        // Without the worker socket the script allocates in-process
+        const { stdout } = await execFileAsync(
+            'python',
+            [scriptPath, '-l', labCode, '-p', patientId, '-t', testCode],
+            { env: scriptEnv() }
         );
 
         const result = JSON.parse(stdout);
+        if (!result.barcode) {
+            throw new Error(result.error || 'No barcode in script output');
+        }
         return {
             barcode: result.barcode,
             verification_hash: result.verification_hash,
             is_valid: result.is_valid
         };
     } catch (error) {
-        console.error('Python barcode generation failed, using fallback:', error);
-        // Fallback to simple generation if Python fails
-        const date = new Date();
-        const dateStr = date.toISOString().slice(2, 10).replace(/-/g, '');
-        const timeStr = date.toTimeString().slice(0, 8).replace(/:/g, '');
-        const patientShort = patientId.replace(/\D/g, '').slice(-6).padStart(6, '0');
-        const seq = String(sequence).padStart(4, '0');
-        const barcode = `${labCode}-${dateStr}${timeStr}-${patientShort}-${testCode.toUpperCase().slice(0, 4)}-${seq}-0`;
-
-        return { barcode, verification_hash: 'FALLBACK', is_valid: true };
+        console.error('Python barcode generation failed:', error);
+        throw new BarcodeUnavailableError('Barcode generation is unavailable');
     }
 }
 
@@ -71,29 +94,13 @@ export async function POST(request: NextRequest) {
             });
         }
 
-        // Get sequence number for today
-        const date = new Date();
-        const todayStart = new Date(date.getFullYear(), date.getMonth(), date.getDate());
-        const todayEnd = new Date(todayStart.getTime() + 24 * 60 * 60 * 1000);
-
-        const todayCount = await prisma.labTestOrder.count({
-            where: {
-                barcode: { not: null },
-                updatedAt: {
-                    gte: todayStart,
-                    lt: todayEnd,
-                },
-            },
-        });
-
         const labCode = order.LabTest.type === 'RADIOLOGY' ? 'RAD' : 'LAB';
 
         // Generate barcode using Python script
         const barcodeResult = await generateBarcodeWithPython(
             labCode,
             order.Patient.uhid,
-            order.LabTest.code,
-            todayCount + 1
+            order.LabTest.code
         );
 
         // Update order with barcode
@@ -121,6 +128,9 @@ export async function POST(request: NextRequest) {
             message: 'Barcode generated successfully',
         }, { status: 201 });
     } catch (error) {
+        if (error instanceof BarcodeUnavailableError) {
+            return NextResponse.json({ error: error.message }, { status: 503 });
+        }
         console.error('Error generating barcode:', error);
         return NextResponse.json({ error: 'Failed to generate barcode' }, { status: 500 });
     }
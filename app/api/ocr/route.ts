@@ -1,6 +1,11 @@
 import { NextResponse } from "next/server";
 import { spawn } from "child_process";
 import path from "path";
+import { callPythonWorker, scriptEnv } from "@/lib/python-worker";
+
+// The script gives up on Vision after its own deadline (OCR_DEADLINE, 20 s by
+// default); this is the backstop if the process itself hangs
+const OCR_PROCESS_TIMEOUT_MS = 30000;
 
 /**
  * POST /api/ocr
@@ -8,17 +13,33 @@ import path from "path";
  * Extracts text from image using PaddleOCR (Python)
  * Better accuracy for handwriting recognition than Tesseract.js
  * 
- * Request body: { image: "base64 encoded image data" }
- * Response: { success: true, text: "extracted text", confidence: 85.5 }
+ * Request body: { image: "base64 encoded image data", preset?: "fast" | "balanced" | "quality" | "none", bypassCache?: boolean,
+ *                 structured?: boolean, packed?: boolean }
+ * Response: { success: true, text: "extracted text", confidence: 85.5, review_lines: [2], structure?: {...} }
  */
 export async function POST(req: Request): Promise<Response> {
     try {
-        const { image } = await req.json();
+        const { image, preset, bypassCache, structured, packed } = await req.json();
 
         if (!image) {
             return NextResponse.json({ success: false, error: "No image provided" }, { status: 400 });
         }
 
+        // Prefer the persistent Python worker, fall back to spawning the script
+        const workerResult = await callPythonWorker("ocr.handwriting", {
+            image,
+            preset,
+            bypass_cache: Boolean(bypassCache),
+            structured: Boolean(structured),
+            packed: Boolean(packed),
+        }, 120000).catch((e) => {
+            console.error("Python worker error, spawning OCR script:", e);
+            return null;
+        });
+        if (workerResult) {
+            return NextResponse.json(workerResult);
+        }
+
         // Path to Python OCR script
         const scriptPath = path.join(process.cwd(), "lib", "ocr_handwriting.py");
         // Use virtual environment Python if available, fallback to system python3
@@ -26,7 +47,19 @@ export async function POST(req: Request): Promise<Response> {
         const pythonCmd = venvPython; // Using venv python for PaddleOCR
 
         const result = await new Promise<Response>((resolve) => {
-            const pythonProcess = spawn(pythonCmd, [scriptPath]);
+            const pythonArgs = [scriptPath];
+            if (preset) pythonArgs.push("--preset", String(preset));
+            if (bypassCache) pythonArgs.push("--no-cache");
+            if (structured) pythonArgs.push("--structured");
+            if (packed) pythonArgs.push("--packed");
+            const pythonProcess = spawn(pythonCmd, pythonArgs, { env: scriptEnv() });
+            const killTimer = setTimeout(() => {
+                pythonProcess.kill("SIGKILL");
+                resolve(NextResponse.json({
+                    success: false,
+                    error: "OCR timed out"
+                }, { status: 504 }));
+            }, OCR_PROCESS_TIMEOUT_MS);
 
             let outputData = "";
             let errorData = "";
@@ -44,6 +77,7 @@ export async function POST(req: Request): Promise<Response> {
             });
 
             pythonProcess.on("close", (code) => {
+                clearTimeout(killTimer);
                 if (code !== 0 || !outputData) {
                     console.error("Python OCR script error:", errorData);
                     resolve(NextResponse.json({
@@ -68,6 +102,7 @@ export async function POST(req: Request): Promise<Response> {
 
             // Handle process errors
             pythonProcess.on("error", (err) => {
+                clearTimeout(killTimer);
                 console.error("Failed to start Python process:", err);
                 resolve(NextResponse.json({
                     success: false,
@@ -1,8 +1,191 @@
 import sys
 import json
-import gzip
 import zlib
 import re
+import os
+import time
+import argparse
+import multiprocessing
+import multiprocessing.util
+from functools import partial
+from collections import namedtuple
+
+from result_cache import MemoryCache, SqliteCache, content_key, stats_delta
+
+try:
+    from cryptography import x509
+    from cryptography.exceptions import InvalidSignature
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import padding
+except ImportError:  # Only needed for signature verification
+    x509 = None
+
+# UIDAI signing certificate for verify mode, overridable with AADHAAR_CERT_PATH
+DEFAULT_CERT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'public', 'uidai_12_06_18_cer.cer')
+
+# Decimal chunks at or below this size are handed straight to int(); it stays
+# well under CPython's int_max_str_digits limit (4300 by default on 3.11+).
+_BASE10_CHUNK_DIGITS = 2048
+
+# 10**(_BASE10_CHUNK_DIGITS * 2**k), shared by every conversion in the process
+_POW10 = {}
+
+
+def _pow10(width):
+    value = _POW10.get(width)
+    if value is None:
+        value = _POW10[width] = 10 ** width
+    return value
+
+
+def base10_to_int(digits):
+    """
+    Convert a decimal digit string of any length to an int.
+
+    int(str) refuses strings longer than sys.get_int_max_str_digits(), which
+    photo-bearing Secure QR payloads can exceed, so longer strings are split
+    into chunks int() accepts. The split point is always a power-of-two
+    multiple of the chunk size, so the powers of ten used to recombine
+    (high * 10**width + low) come from a process-wide cache.
+
+    At typical Secure QR sizes (up to ~5k digits) this runs at the speed of
+    int(); the gain from Karatsuba recombination only shows on longer strings
+    (about 1.4x at 10k digits, 1.8x at 20k, 2.5x at 50k on CPython 3.11).
+    """
+    if len(digits) <= _BASE10_CHUNK_DIGITS:
+        return int(digits)
+
+    def convert(lo, hi):
+        if hi - lo <= _BASE10_CHUNK_DIGITS:
+            return int(digits[lo:hi])
+        width = _BASE10_CHUNK_DIGITS
+        while width * 2 < hi - lo:
+            width *= 2
+        return convert(lo, hi - width) * _pow10(width) + convert(hi - width, hi)
+
+    return convert(0, len(digits))
+
+
+def base10_to_bytes(digits):
+    """Convert a Secure QR decimal string to its big-endian byte string"""
+    value = base10_to_int(digits)
+    return value.to_bytes((value.bit_length() + 7) // 8, byteorder='big')
+
+
+# Decompressed Secure QR data is a few KB; anything far larger is not a card
+MAX_DECOMPRESSED_BYTES = 1024 * 1024
+_DECOMPRESS_CHUNK = 4096
+
+# A card is typically rescanned within one visit (reception, IPD, insurance)
+CACHE_TTL = 12 * 60 * 60
+CACHE_MAX_ENTRIES = 10000
+
+# zlib wbits for each container sniff_compression() recognises
+_WBITS = {'gzip': 16 + zlib.MAX_WBITS, 'zlib': zlib.MAX_WBITS}
+
+
+def sniff_compression(data):
+    """Identify 'gzip', 'zlib' or 'raw' data from its header bytes"""
+    if data[:2] == b'\x1f\x8b':
+        return 'gzip'
+    # zlib: deflate method (8) with a window of at most 32K and a valid FCHECK
+    if len(data) >= 2 and data[0] & 0x0F == 8 and data[0] >> 4 <= 7 and ((data[0] << 8) | data[1]) % 31 == 0:
+        return 'zlib'
+    return 'raw'
+
+
+# Secure QR V2 address fields that are read straight from a fixed part index
+FIELD_INDEX = {
+    'care_of': 5,
+    'district': 6,
+    'landmark': 7,
+    'house': 8,
+    'location': 9,
+    'pincode': 10,
+    'post_office': 11,
+    'state': 12,
+    'street': 13,
+    'sub_district': 14,
+    'vtc': 15,  # Village/Town/City
+}
+
+# Order in which the components are joined into the full address
+ADDRESS_FIELDS = [
+    'house', 'street', 'landmark', 'location', 'vtc',
+    'post_office', 'sub_district', 'district', 'state', 'pincode',
+]
+
+# Every field decodeddata() can return, in output order
+FIELDS = (
+    'reference_id', 'aadhaar_last_4', 'aadhaar_masked',
+    'name', 'dob', 'dob_raw', 'gender',
+    *FIELD_INDEX,
+    'address',
+    'layout_profile',
+)
+
+_REFERENCE_FIELDS = {'reference_id', 'aadhaar_last_4', 'aadhaar_masked'}
+_GENDERS = frozenset(['M', 'F', 'MALE', 'FEMALE', 'T', 'TRANSGENDER'])
+
+# Known Secure QR layouts: part index of each identity slot and of the part
+# where the photo starts, tried in order. A profile matches when its
+# reference ID part is all digits (4 or more).
+LayoutProfile = namedtuple('LayoutProfile', ['id', 'reference_id', 'name', 'dob', 'gender', 'photo'])
+
+LAYOUT_PROFILES = [
+    LayoutProfile('v2', 1, 2, 3, 4, 16),          # Newer cards, reference ID after the flags
+    LayoutProfile('v2-legacy', 16, 2, 3, 4, 17),  # Older cards, reference ID after the address
+]
+
+# Trailing binary segments: RSA-2048 signature, preceded by a SHA-256 hash
+# for each of email and mobile when part 0 flags them (1 email, 2 mobile, 3 both)
+SIGNATURE_BYTES = 256
+CONTACT_HASH_BYTES = 32
+MEDIA_SEGMENTS = ('photo', 'signature')
+
+_NAME_RE = re.compile(r'^[A-Za-z\s]+$')
+_NAME_LIKE_RE = re.compile(r'^[A-Za-z][A-Za-z\s]{2,}$')
+_DATE_RE = re.compile(r'(\d{2})[-/](\d{2})[-/](\d{4})')
+_DDMMYYYY_RE = re.compile(r'^\d{8}$')
+_ISO_DATE_RE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+
+def _scan_reference_id(part):
+    # Any 8+ digit number (reference ID pattern)
+    return part if part.isdigit() and len(part) >= 8 else None
+
+
+def _scan_name(part):
+    return part if _NAME_LIKE_RE.match(part) else None
+
+
+def _scan_dob(part):
+    date_match = _DATE_RE.search(part)
+    if date_match:
+        return f"{date_match.group(1)}-{date_match.group(2)}-{date_match.group(3)}"
+    if _DDMMYYYY_RE.match(part):
+        return f"{part[:2]}-{part[2:4]}-{part[4:]}"
+    return None
+
+
+def _scan_gender(part):
+    return part if part.upper() in _GENDERS else None
+
+
+# Text fields come before the photo in every known layout, so fallback scans
+# stop there; longer parts than this cannot be a reference ID, DOB or gender
+_TEXT_PARTS = max(profile.photo for profile in LAYOUT_PROFILES)
+_MAX_FIELD_BYTES = 256
+
+# Fallback rules for slots whose profile index did not validate:
+# slot -> (first part index, stop index, matcher)
+_SCAN_RULES = {
+    'reference_id': (0, _TEXT_PARTS, _scan_reference_id),
+    'name': (2, 10, _scan_name),
+    'dob': (0, _TEXT_PARTS, _scan_dob),
+    'gender': (0, _TEXT_PARTS, _scan_gender),
+}
+
 
 class AadhaarSecureQrDecoder:
     """
@@ -13,47 +196,265 @@ class AadhaarSecureQrDecoder:
     - Name, DOB, Gender
     - Full Address components
     - Digital signature (ignored in extraction-only mode)
+
+    Only the decompressed buffer is kept. Part boundaries are found lazily on
+    0xFF delimiters and parts are decoded to text only when a field needs
+    them, so projecting a few fields never touches the photo or signature.
     """
-    
-    def __init__(self, base10_data):
-        self.raw_data = str(base10_data)
-        self.data = int(base10_data)
-        self.decompressed_data = self._decompress()
-        self.parts = self._split_data()
-        self.all_parts_text = [self._decode_part(i) for i in range(len(self.parts))]
-
-    def _decompress(self):
-        # Convert integer to bytes
-        num_bytes = (self.data.bit_length() + 7) // 8
-        byte_data = self.data.to_bytes(num_bytes, byteorder='big')
-        
-        # Try gzip first, then zlib
+
+    __slots__ = ('_buffer', '_decompressor', '_pending', '_max_output',
+                 '_bounds', '_scan_pos', '_searched', '_texts', '_slots', '_segments')
+
+    def __init__(self, base10_data, max_output=MAX_DECOMPRESSED_BYTES):
+        compressed = base10_to_bytes(str(base10_data))
+        self._buffer = bytearray()  # decompressed bytes produced so far
+        self._max_output = max_output
+        self._bounds = []    # (start, end) byte offsets of the parts found so far
+        self._scan_pos = 0   # where the next part starts, -1 once the buffer is exhausted
+        self._searched = 0   # buffer already searched for the next delimiter
+        self._texts = {}     # part index -> decoded text
+        self._slots = {}     # identity slot -> classified value
+        self._segments = None  # media segment -> (offset, length), located on first use
+
+        fmt = sniff_compression(compressed)
+        if fmt == 'raw':
+            self._decompressor = None
+            self._pending = b''
+            self._buffer += compressed
+        else:
+            self._decompressor = zlib.decompressobj(wbits=_WBITS[fmt])
+            self._pending = compressed
+            self._fill()
+
+    def _fill(self):
+        """Decompress the next chunk into the buffer, return False once exhausted"""
+        decompressor = self._decompressor
+        if decompressor is None:
+            return False
+
+        room = self._max_output - len(self._buffer) + 1
         try:
-            return gzip.decompress(byte_data)
-        except Exception:
-            try:
-                return zlib.decompress(byte_data)
-            except Exception:
-                # Return as-is if decompression fails
-                return byte_data
+            chunk = decompressor.decompress(self._pending, min(_DECOMPRESS_CHUNK, room))
+        except zlib.error:
+            if self._buffer:
+                raise ValueError("Corrupt compressed Secure QR data")
+            # The header looked compressed but is not, use the bytes as-is
+            self._buffer += self._pending
+            self._decompressor = None
+            self._pending = b''
+            return True
+
+        self._pending = decompressor.unconsumed_tail
+        self._buffer += chunk
+        if len(self._buffer) > self._max_output:
+            raise ValueError(f"Decompressed Secure QR data exceeds {self._max_output} bytes")
+        if decompressor.eof or not (chunk or self._pending):
+            self._decompressor = None
+            self._pending = b''
+        return True
 
-    def _split_data(self):
+    def _finish(self):
+        """Decompress the rest of the payload"""
+        while self._fill():
+            pass
+
+    def _scan_to(self, idx):
+        """Locate part boundaries up to idx, return False if there are fewer parts"""
+        bounds = self._bounds
+        if idx < len(bounds):
+            return True
+        buf = self._buffer
         # Secure QR V2 uses delimiter 255 (0xFF)
-        return self.decompressed_data.split(b'\xff')
+        while len(bounds) <= idx and self._scan_pos >= 0:
+            pos = self._scan_pos
+            end = buf.find(b'\xff', max(pos, self._searched))
+            if end == -1:
+                self._searched = len(buf)
+                # Decompress only as far as the requested part needs
+                if self._fill():
+                    continue
+                bounds.append((pos, len(buf)))
+                self._scan_pos = -1
+            else:
+                bounds.append((pos, end))
+                self._scan_pos = end + 1
+        return idx < len(bounds)
+
+    def part_count(self):
+        """Number of delimited parts, scanning the whole buffer"""
+        while self._scan_pos >= 0:
+            self._scan_to(len(self._bounds))
+        return len(self._bounds)
+
+    def get_part(self, idx):
+        """
+        Zero-copy view of the raw bytes of part idx (empty if missing)
+
+        Decompresses the whole payload first, since the buffer cannot grow
+        while a view of it is held.
+        """
+        self._finish()
+        view = memoryview(self._buffer)
+        if not self._scan_to(idx):
+            return view[0:0]
+        start, end = self._bounds[idx]
+        return view[start:end]
+
+    def segment_bounds(self, name):
+        """
+        (offset, length) of the 'photo' or 'signature' segment in the decompressed data
+
+        Offsets are located on first use, so callers that never ask for
+        media do not pay for decompressing or scanning past the text fields.
+        """
+        if self._segments is None:
+            self._finish()
+            size = len(self._buffer)
+            signature_start = max(size - SIGNATURE_BYTES, 0)
+            flags = self._decode_part(0)
+            hashes = bin(int(flags)).count('1') if flags in ('0', '1', '2', '3') else 0
+            photo_end = max(signature_start - hashes * CONTACT_HASH_BYTES, 0)
+            layout = self.layout_profile() or LAYOUT_PROFILES[0]
+            photo_start = self._bounds[layout.photo][0] if self._scan_to(layout.photo) else photo_end
+            photo_start = min(photo_start, photo_end)
+            self._segments = {
+                'photo': (photo_start, photo_end - photo_start),
+                'signature': (signature_start, size - signature_start),
+            }
+        if name not in self._segments:
+            raise ValueError(f"Unknown segment: {name}")
+        return self._segments[name]
+
+    def segment(self, name):
+        """Zero-copy memoryview of the 'photo' (JPEG2000) or 'signature' bytes"""
+        offset, length = self.segment_bounds(name)
+        return memoryview(self._buffer)[offset:offset + length]
+
+    def write_segment(self, name, target):
+        """Write a segment to a binary stream or file path ('-' for stdout) without copying it"""
+        view = self.segment(name)
+        if hasattr(target, 'write'):
+            target.write(view)
+        elif target == '-':
+            sys.stdout.buffer.write(view)
+            sys.stdout.buffer.flush()
+        else:
+            with open(target, 'wb') as f:
+                f.write(view)
+        return len(view)
+
+    def verify_signature(self, public_key):
+        """
+        Verify the trailing signature over the rest of the decompressed data.
+
+        Both the signature and the signed region are passed to the RSA check
+        as views of the buffer, without copying it.
+        """
+        offset, length = self.segment_bounds('signature')
+        if length != SIGNATURE_BYTES:
+            return False
+        view = memoryview(self._buffer)
+        try:
+            public_key.verify(view[offset:], view[:offset], padding.PKCS1v15(), hashes.SHA256())
+            return True
+        except InvalidSignature:
+            return False
 
     def _decode_part(self, idx):
-        if idx < len(self.parts):
-            try:
-                return self.parts[idx].decode('utf-8', errors='ignore').strip()
-            except:
+        text = self._texts.get(idx)
+        if text is None:
+            if not self._scan_to(idx):
                 return ""
-        return ""
+            start, end = self._bounds[idx]
+            # Text parts are short, decoding a slice beats going through a memoryview
+            text = self._texts[idx] = self._buffer[start:end].decode('utf-8', 'ignore').strip()
+        return text
+
+    def _iter_parts(self, start=0, stop=None):
+        """Decoded parts from start (up to stop), scanning only as far as consumed"""
+        idx = start
+        while (stop is None or idx < stop) and self._scan_to(idx):
+            yield self._decode_part(idx)
+            idx += 1
 
     def get_all_parts(self):
         """Return all parts for debugging"""
-        return {f"part_{i}": self._decode_part(i) for i in range(len(self.parts))}
+        return {f"part_{i}": self._decode_part(i) for i in range(self.part_count())}
+
+    def layout_profile(self):
+        """The first LAYOUT_PROFILES entry whose reference ID part validates, or None"""
+        for profile in LAYOUT_PROFILES:
+            # The legacy slot is the photo in newer layouts; do not decode that as text
+            if not self._scan_to(profile.reference_id):
+                continue
+            start, end = self._bounds[profile.reference_id]
+            if end - start > _MAX_FIELD_BYTES:
+                continue
+            part = self._decode_part(profile.reference_id)
+            if part.isdigit() and len(part) >= 4:
+                return profile
+        return None
 
-    def decodeddata(self):
+    def _classify(self, slots):
+        """
+        Resolve identity slots ('reference_id', 'name', 'dob', 'gender').
+
+        Each slot is read at the index given by the matched layout profile
+        (the newest profile if none matched). Slots that do not validate
+        there are filled from the text parts, each decoded once and tested
+        with precompiled patterns, every slot taking the first part that
+        matches. The scan never reaches the photo, contact hashes or
+        signature.
+        """
+        found = self._slots
+        pending = [slot for slot in slots if slot not in found]
+        if not pending:
+            return found
+
+        profile = self.layout_profile()
+        layout = profile or LAYOUT_PROFILES[0]
+        unresolved = {}  # slot -> value kept if the scan finds nothing
+
+        for slot in pending:
+            raw = self._decode_part(getattr(layout, slot))
+            if slot == 'reference_id':
+                if profile is not None:
+                    found[slot] = raw
+                else:
+                    unresolved[slot] = ""
+            elif slot == 'name':
+                # Validate it looks like a name (letters and spaces)
+                if _NAME_RE.match(raw):
+                    found[slot] = raw
+                else:
+                    unresolved[slot] = raw
+            elif slot == 'dob':
+                # DD-MM-YYYY, DD/MM/YYYY, DDMMYYYY or YYYY-MM-DD
+                dob = _scan_dob(raw) or (raw if _ISO_DATE_RE.match(raw) else None)
+                if dob:
+                    found[slot] = dob
+                else:
+                    unresolved[slot] = ""
+            elif slot == 'gender':
+                if raw in _GENDERS:
+                    found[slot] = raw
+                else:
+                    unresolved[slot] = raw
+
+        if unresolved:
+            stop = max(_SCAN_RULES[slot][1] for slot in unresolved)
+            self._scan_to(stop - 1)
+            buf = self._buffer
+            # Parts too long to be a field (the photo) read as empty and match nothing
+            texts = [buf[begin:end].decode('utf-8', 'ignore').strip() if end - begin <= _MAX_FIELD_BYTES else ''
+                     for begin, end in self._bounds[:stop]]
+            for slot, default in unresolved.items():
+                first, last, match = _SCAN_RULES[slot]
+                found[slot] = next(filter(None, map(match, texts[first:last])), default)
+
+        return found
+
+    def decodeddata(self, fields=None):
         """
         Extract identity data from Secure QR
         
@@ -75,122 +476,182 @@ class AadhaarSecureQrDecoder:
         14: Sub District
         15: VTC (Village/Town/City)
         16+: Photo/Signature data
+
+        Args:
+            fields: Optional list of names from FIELDS to project. Only the
+                parts those fields need are scanned and decoded, and the
+                debugging '_raw_parts' list is left out.
+
+        Returns:
+            Dictionary of the requested fields (all of them by default)
         """
-        
+        if fields is None:
+            wanted = set(FIELDS)
+        else:
+            wanted = set(fields)
+            unknown = wanted.difference(FIELDS)
+            if unknown:
+                raise ValueError(f"Unknown field(s): {', '.join(sorted(unknown))}")
+
         data = {}
-        parts = self.all_parts_text
         
         # --- DEBUG: Include all parts ---
-        data['_raw_parts'] = parts[:20]  # First 20 parts for debugging
+        if fields is None:
+            data['_raw_parts'] = list(self._iter_parts(0, 20))  # First 20 parts for debugging
+        
+        slots = []
+        if wanted & _REFERENCE_FIELDS:
+            slots.append('reference_id')
+        if 'name' in wanted:
+            slots.append('name')
+        if 'dob' in wanted:
+            slots.append('dob')
+        if 'gender' in wanted:
+            slots.append('gender')
+        found = self._classify(slots)
         
         # --- REFERENCE ID / AADHAAR LAST 4 ---
         # Usually at index 1 or 16, format: "XXXXXXXX1234" where 1234 is last 4
-        ref_id = ""
-        aadhaar_last_4 = ""
-        
-        # Try index 1 first (common in newer format)
-        if len(parts) > 1 and parts[1].isdigit() and len(parts[1]) >= 4:
-            ref_id = parts[1]
-            aadhaar_last_4 = ref_id[-4:]
-        # Try index 16 (older format)
-        elif len(parts) > 16 and parts[16].isdigit() and len(parts[16]) >= 4:
-            ref_id = parts[16]
+        if wanted & _REFERENCE_FIELDS:
+            ref_id = found['reference_id']
             aadhaar_last_4 = ref_id[-4:]
-        else:
-            # Search for any 8+ digit number (reference ID pattern)
-            for i, part in enumerate(parts):
-                if part.isdigit() and len(part) >= 8:
-                    ref_id = part
-                    aadhaar_last_4 = part[-4:]
-                    break
-        
-        data['reference_id'] = ref_id
-        data['aadhaar_last_4'] = aadhaar_last_4
-        data['aadhaar_masked'] = f"XXXX XXXX {aadhaar_last_4}" if aadhaar_last_4 else ""
+            data['reference_id'] = ref_id
+            data['aadhaar_last_4'] = aadhaar_last_4
+            data['aadhaar_masked'] = f"XXXX XXXX {aadhaar_last_4}" if aadhaar_last_4 else ""
         
         # --- NAME ---
-        # Usually at index 2
-        name = parts[2] if len(parts) > 2 else ""
-        # Validate it looks like a name (letters and spaces)
-        if not re.match(r'^[A-Za-z\s]+$', name):
-            # Search for a name-like field
-            for part in parts[2:10]:
-                if re.match(r'^[A-Za-z][A-Za-z\s]{2,}$', part):
-                    name = part
-                    break
-        data['name'] = name
+        if 'name' in wanted:
+            data['name'] = found['name']
         
         # --- DOB ---
-        # Usually at index 3, formats: DD-MM-YYYY, DD/MM/YYYY, DDMMYYYY, YYYY-MM-DD
-        dob = ""
-        dob_raw = parts[3] if len(parts) > 3 else ""
-        
-        # Pattern 1: DD-MM-YYYY or DD/MM/YYYY
-        date_match = re.search(r'(\d{2})[-/](\d{2})[-/](\d{4})', dob_raw)
-        if date_match:
-            dob = f"{date_match.group(1)}-{date_match.group(2)}-{date_match.group(3)}"
-        # Pattern 2: DDMMYYYY (8 digits)
-        elif re.match(r'^\d{8}$', dob_raw):
-            dob = f"{dob_raw[:2]}-{dob_raw[2:4]}-{dob_raw[4:]}"
-        # Pattern 3: YYYY-MM-DD
-        elif re.match(r'^\d{4}-\d{2}-\d{2}$', dob_raw):
-            dob = dob_raw
-        else:
-            # Search in all parts for a date pattern
-            for part in parts:
-                date_match = re.search(r'(\d{2})[-/](\d{2})[-/](\d{4})', part)
-                if date_match:
-                    dob = f"{date_match.group(1)}-{date_match.group(2)}-{date_match.group(3)}"
-                    break
-                if re.match(r'^\d{8}$', part):
-                    dob = f"{part[:2]}-{part[2:4]}-{part[4:]}"
-                    break
-        
-        data['dob'] = dob
-        data['dob_raw'] = dob_raw  # For debugging
+        if 'dob' in wanted:
+            data['dob'] = found['dob']
+        if 'dob_raw' in wanted:
+            layout = self.layout_profile() or LAYOUT_PROFILES[0]
+            data['dob_raw'] = self._decode_part(layout.dob)  # For debugging
         
         # --- GENDER ---
-        gender = parts[4] if len(parts) > 4 else ""
-        if gender not in ['M', 'F', 'MALE', 'FEMALE', 'T', 'TRANSGENDER']:
-            # Search for gender pattern
-            for part in parts:
-                if part.upper() in ['M', 'F', 'MALE', 'FEMALE', 'T', 'TRANSGENDER']:
-                    gender = part
-                    break
-        data['gender'] = gender.upper() if gender else ""
+        if 'gender' in wanted:
+            gender = found['gender']
+            data['gender'] = gender.upper() if gender else ""
         
         # --- ADDRESS COMPONENTS ---
-        data['care_of'] = parts[5] if len(parts) > 5 else ""
-        data['district'] = parts[6] if len(parts) > 6 else ""
-        data['landmark'] = parts[7] if len(parts) > 7 else ""
-        data['house'] = parts[8] if len(parts) > 8 else ""
-        data['location'] = parts[9] if len(parts) > 9 else ""
-        data['pincode'] = parts[10] if len(parts) > 10 else ""
-        data['post_office'] = parts[11] if len(parts) > 11 else ""
-        data['state'] = parts[12] if len(parts) > 12 else ""
-        data['street'] = parts[13] if len(parts) > 13 else ""
-        data['sub_district'] = parts[14] if len(parts) > 14 else ""
-        data['vtc'] = parts[15] if len(parts) > 15 else ""  # Village/Town/City
+        for field, idx in FIELD_INDEX.items():
+            if field in wanted or 'address' in wanted:
+                data[field] = self._decode_part(idx)
         
         # --- FULL ADDRESS ---
-        address_components = [
-            data['house'],
-            data['street'],
-            data['landmark'],
-            data['location'],
-            data['vtc'],
-            data['post_office'],
-            data['sub_district'],
-            data['district'],
-            data['state'],
-            data['pincode']
-        ]
-        data['address'] = ", ".join([c for c in address_components if c and c.strip()])
-        
-        return data
-
-
-def decode(qr_data):
+        if 'address' in wanted:
+            address_components = [data[field] for field in ADDRESS_FIELDS]
+            data['address'] = ", ".join([c for c in address_components if c and c.strip()])
+        
+        # --- LAYOUT PROFILE ---
+        if 'layout_profile' in wanted:
+            profile = self.layout_profile()
+            data['layout_profile'] = profile.id if profile else "unknown"
+        
+        if fields is None:
+            return data
+        return {field: data[field] for field in FIELDS if field in wanted}
+
+
+# Public keys parsed once per process, keyed by certificate identity (see _cert_identity)
+_public_keys = {}
+
+# Verification outcomes keyed by payload hash and certificate identity, so a
+# rescan of the same card skips the RSA work
+_verified = MemoryCache(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL)
+
+
+def _cert_identity(cert_path=None):
+    """
+    Resolved certificate path plus its inode, size and mtime.
+
+    None, AADHAAR_CERT_PATH and an explicit DEFAULT_CERT_PATH all resolve to
+    the same identity, and replacing the file changes it.
+    """
+    path = os.path.realpath(cert_path or os.environ.get('AADHAAR_CERT_PATH') or DEFAULT_CERT_PATH)
+    st = os.stat(path)
+    return path, st.st_ino, st.st_size, st.st_mtime_ns
+
+
+def _parse_public_key(data):
+    # PEM or DER, certificate or bare public key
+    if b'-----BEGIN CERTIFICATE-----' in data:
+        return x509.load_pem_x509_certificate(data).public_key()
+    if b'-----BEGIN' in data:
+        return serialization.load_pem_public_key(data)
+    try:
+        return x509.load_der_x509_certificate(data).public_key()
+    except ValueError:
+        return serialization.load_der_public_key(data)
+
+
+def load_public_key(cert_path=None, identity=None):
+    """
+    Load the Secure QR signing key once per process (and again if the file changes).
+
+    Args:
+        cert_path: Certificate or public key file, defaults to AADHAAR_CERT_PATH
+            or the UIDAI certificate shipped in public/
+        identity: _cert_identity(cert_path), if the caller already has it
+    """
+    identity = identity or _cert_identity(cert_path)
+    key = _public_keys.get(identity)
+    if key is None:
+        if x509 is None:
+            raise RuntimeError("Signature verification needs the 'cryptography' package")
+        with open(identity[0], 'rb') as f:
+            key = _public_keys[identity] = _parse_public_key(f.read())
+    return key
+
+
+def verify_payload(qr_data, cert_path=None, decoder=None, max_output=MAX_DECOMPRESSED_BYTES):
+    """
+    Check the trailing RSA SHA-256 signature of a Secure QR payload.
+
+    Outcomes are cached per payload hash and certificate identity; a decoder
+    for the payload can be passed in to avoid decompressing it again on a miss.
+    """
+    identity = _cert_identity(cert_path)
+    public_key = load_public_key(identity=identity)
+    key = content_key(qr_data.strip(), *map(str, identity))
+    verified = _verified.get(key)
+    if verified is None:
+        if decoder is None:
+            decoder = AadhaarSecureQrDecoder(qr_data.strip(), max_output)
+        verified = decoder.verify_signature(public_key)
+        _verified.set(key, verified)
+    return verified
+
+
+def cache_key(qr_data, fields=None):
+    """Cache key for a payload and field projection; the payload itself is only hashed"""
+    return content_key(qr_data.strip(), ','.join(sorted(fields)) if fields is not None else '*')
+
+
+def open_cache(cache_dir, ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES):
+    """On-disk decode cache shared by CLI invocations"""
+    return SqliteCache(os.path.join(cache_dir, 'aadhaar_decode.sqlite'), max_entries, ttl)
+
+
+def decode_payload(qr_data, fields=None, max_output=MAX_DECOMPRESSED_BYTES, cache=None, media=None,
+                   verify=False, cert_path=None):
+    """
+    Decode one Secure QR payload into a {"success": ..., ...} result dict
+
+    With a cache (MemoryCache or SqliteCache from result_cache), results are
+    looked up by a hash of the payload. Only the extracted fields are stored,
+    never the payload or photo, so '_raw_parts' is dropped from the data and
+    hits carry "cached": true.
+
+    media maps 'photo' and/or 'signature' to a binary stream or file path to
+    write that segment to; the result then lists each segment's offset and
+    length under "media". Media requests always decode the payload.
+
+    With verify=True the signature is checked against the certificate at
+    cert_path (see load_public_key) and reported as "verified".
+    """
     try:
         if not qr_data.strip():
             raise ValueError("Empty data provided")
@@ -198,24 +659,217 @@ def decode(qr_data):
         if not qr_data.strip().isdigit():
             raise ValueError("Data is not a valid Secure QR integer string. Got non-digit characters.")
         
-        decoder = AadhaarSecureQrDecoder(qr_data.strip())
-        decoded_data = decoder.decodeddata()
+        key = None
+        decoder = None
+        if cache is not None and not media:
+            key = cache_key(qr_data, fields)
+            cached = cache.get(key)
+            if cached is not None:
+                result = {"success": True, "data": cached, "cached": True}
+                if verify:
+                    result["verified"] = verify_payload(qr_data, cert_path, max_output=max_output)
+                return result
         
-        print(json.dumps({"success": True, "data": decoded_data}))
+        decoder = AadhaarSecureQrDecoder(qr_data.strip(), max_output)
+        decoded_data = decoder.decodeddata(fields)
+        
+        if key is not None:
+            decoded_data.pop('_raw_parts', None)
+            cache.set(key, decoded_data)
+        
+        result = {"success": True, "data": decoded_data}
+        if verify:
+            result["verified"] = verify_payload(qr_data, cert_path, decoder)
+        if media:
+            result["media"] = {}
+            for name, target in media.items():
+                offset, length = decoder.segment_bounds(name)
+                decoder.write_segment(name, target)
+                result["media"][name] = {"offset": offset, "length": length}
+        return result
         
     except Exception as e:
         import traceback
-        print(json.dumps({
+        return {
             "success": False, 
             "error": str(e),
             "traceback": traceback.format_exc()
-        }))
+        }
 
 
-if __name__ == "__main__":
+def decode(qr_data, fields=None, max_output=MAX_DECOMPRESSED_BYTES, cache=None, media=None,
+           verify=False, cert_path=None):
+    result = decode_payload(qr_data, fields, max_output, cache, media, verify, cert_path)
+    # Raw media written to stdout moves the JSON result to stderr
+    out = sys.stderr if media and '-' in media.values() else sys.stdout
+    out.write(json.dumps(result) + '\n')
+
+
+def _read_batch_items(stream):
+    """
+    Yield (id, payload) for each non-blank input line.
+
+    A line is either a bare Secure QR decimal string, identified by its
+    1-based line number, or a JSON object {"id": ..., "payload": "..."}.
+    """
+    for line_no, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith('{'):
+            try:
+                item = json.loads(line)
+                yield item.get('id', line_no), str(item.get('payload', ''))
+            except (ValueError, AttributeError):
+                yield line_no, ''
+        else:
+            yield line_no, line
+
+
+# Decode cache of the current batch process, opened by _init_batch_worker
+_batch_cache = None
+
+
+def _init_batch_worker(cache_spec, verify=False, cert_path=None):
+    global _batch_cache
+    _batch_cache = open_cache(**cache_spec) if cache_spec else None
+    if _batch_cache is not None:
+        # Pool workers skip atexit; flush the buffered hit/miss counters when the pool joins them
+        multiprocessing.util.Finalize(_batch_cache, _batch_cache.close, exitpriority=10)
+    if verify:
+        # Parse the key once per worker process rather than per payload
+        load_public_key(cert_path)
+
+
+def _decode_batch_item(item, fields=None, max_output=MAX_DECOMPRESSED_BYTES, verify=False, cert_path=None):
+    item_id, payload = item
+    result = decode_payload(payload, fields, max_output, _batch_cache, verify=verify, cert_path=cert_path)
+    result.pop('traceback', None)
+    return {"id": item_id, **result}
+
+
+def _cache_stats(cache_spec):
+    cache = open_cache(**cache_spec)
+    try:
+        return cache.stats()
+    finally:
+        cache.close()
+
+
+def decode_batch(stream, out, fields=None, workers=None, ordered=True, chunksize=16,
+                 max_output=MAX_DECOMPRESSED_BYTES, cache_spec=None, verify=False, cert_path=None):
+    """
+    Decode newline-delimited payloads from stream across a process pool.
+
+    Results are written to out as JSON lines, in input order or, with
+    ordered=False, as they complete (each carries its id either way). A
+    failing item yields a {"success": false} line and does not stop the batch.
+    cache_spec holds open_cache() arguments for a decode cache shared by the
+    worker processes; the summary's cache hits and misses are those of this
+    batch only. With verify=True each worker loads the signing key once and
+    reports "verified" per item.
+
+    Returns:
+        Throughput summary dictionary
+    """
+    workers = workers or os.cpu_count() or 1
+    worker = partial(_decode_batch_item, fields=fields, max_output=max_output,
+                     verify=verify, cert_path=cert_path)
+    items = _read_batch_items(stream)
+    total = succeeded = 0
+    # The cache file's counters span every run that used it; report this batch's share
+    cache_before = _cache_stats(cache_spec) if cache_spec else None
+    started = time.perf_counter()
+
+    def emit(results):
+        nonlocal total, succeeded
+        for result in results:
+            total += 1
+            succeeded += result['success']
+            out.write(json.dumps(result) + '\n')
+            out.flush()
+
+    if workers == 1:
+        _init_batch_worker(cache_spec, verify, cert_path)
+        emit(map(worker, items))
+        if _batch_cache is not None:
+            _batch_cache.close()
+    else:
+        with multiprocessing.Pool(workers, _init_batch_worker, (cache_spec, verify, cert_path)) as pool:
+            imap = pool.imap if ordered else pool.imap_unordered
+            emit(imap(worker, items, chunksize))
+            # Let the workers exit normally so their caches flush
+            pool.close()
+            pool.join()
+
+    elapsed = time.perf_counter() - started
+    summary = {
+        "total": total,
+        "succeeded": succeeded,
+        "failed": total - succeeded,
+        "workers": workers,
+        "elapsed_s": round(elapsed, 3),
+        "per_second": round(total / elapsed, 1) if elapsed else None,
+    }
+    if cache_spec:
+        summary["cache"] = stats_delta(cache_before, _cache_stats(cache_spec))
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Decode an Aadhaar Secure QR payload')
+    parser.add_argument('data', nargs='?', help='Secure QR decimal string (read from stdin if omitted)')
+    parser.add_argument('--fields', '-f',
+                        help=f"Comma-separated fields to extract ({', '.join(FIELDS)})")
+    parser.add_argument('--max-output', type=int, default=MAX_DECOMPRESSED_BYTES,
+                        help='Reject payloads that decompress to more than this many bytes')
+    parser.add_argument('--photo-out', help="Write the JPEG2000 photo to this file ('-' for stdout)")
+    parser.add_argument('--signature-out', help="Write the 256-byte signature to this file ('-' for stdout)")
+    parser.add_argument('--verify', action='store_true', help='Verify the Secure QR digital signature')
+    parser.add_argument('--cert', help='Signing certificate or public key (defaults to AADHAAR_CERT_PATH '
+                                       'or public/uidai_12_06_18_cer.cer)')
+    parser.add_argument('--cache-dir', default=os.environ.get('AADHAAR_CACHE_DIR'),
+                        help='Directory for the on-disk decode cache (disabled if unset)')
+    parser.add_argument('--cache-ttl', type=float, help=f'Cache entry lifetime in seconds (default {CACHE_TTL})')
+    parser.add_argument('--cache-size', type=int, help=f'Maximum cached decodes (default {CACHE_MAX_ENTRIES})')
+    parser.add_argument('--cache-stats', action='store_true', help='Print cache hit/miss counters to stderr')
+    parser.add_argument('--batch', '-b', action='store_true',
+                        help='Decode newline-delimited payloads (or JSON lines with id/payload) as JSON lines')
+    parser.add_argument('--input', '-i', help='Batch input file (defaults to stdin)')
+    parser.add_argument('--workers', '-w', type=int, help='Batch worker processes (defaults to CPU count)')
+    parser.add_argument('--unordered', action='store_true', help='Emit batch results as they complete')
+    parser.add_argument('--chunksize', type=int, default=16, help='Payloads handed to a worker at a time')
+
+    args = parser.parse_args()
+    media = {name: path for name, path in (('photo', args.photo_out), ('signature', args.signature_out)) if path}
+    if list(media.values()).count('-') > 1:
+        parser.error("Only one of --photo-out and --signature-out can write to stdout")
+    fields = [f.strip() for f in args.fields.split(',') if f.strip()] if args.fields else None
+    # The worker keeps its own in-memory cache, so explicit on-disk cache options mean decoding in-process
+    cache_options = args.cache_stats or args.cache_ttl is not None or args.cache_size is not None or (
+        args.cache_dir is not None and args.cache_dir != os.environ.get('AADHAAR_CACHE_DIR'))
+    cache_spec = None
+    if args.cache_dir:
+        cache_spec = {"cache_dir": args.cache_dir,
+                      "ttl": CACHE_TTL if args.cache_ttl is None else args.cache_ttl,
+                      "max_entries": CACHE_MAX_ENTRIES if args.cache_size is None else args.cache_size}
+
+    if args.batch:
+        stream = open(args.input) if args.input else sys.stdin
+        try:
+            summary = decode_batch(stream, sys.stdout, fields, args.workers,
+                                   ordered=not args.unordered, chunksize=args.chunksize,
+                                   max_output=args.max_output, cache_spec=cache_spec,
+                                   verify=args.verify, cert_path=args.cert)
+        finally:
+            if args.input:
+                stream.close()
+        sys.stderr.write(json.dumps({"summary": summary}) + '\n')
+        return 0
+
     # Read from stdin or args
-    if len(sys.argv) > 1:
-        data = sys.argv[1]
+    if args.data:
+        data = args.data
     else:
         try:
             data = sys.stdin.read().strip()
@@ -224,5 +878,26 @@ if __name__ == "__main__":
     
     if not data:
         print(json.dumps({"success": False, "error": "No data provided"}))
-    else:
-        decode(data)
+        return 0
+
+    # Forward to the persistent worker when one is configured
+    if os.environ.get('MEDFLOW_WORKER_SOCKET') and not media and not cache_options:
+        try:
+            from python_worker import call
+            result = call('aadhaar.decode', {"qrPayload": data, "fields": fields, "max_output": args.max_output,
+                                             "verify": args.verify, "cert_path": args.cert})
+        except (OSError, RuntimeError, ValueError):
+            result = None  # Worker not running, draining or failing; decode in-process
+        if result is not None:
+            print(json.dumps(result))
+            return 0
+
+    cache = open_cache(**cache_spec) if cache_spec else None
+    decode(data, fields, args.max_output, cache, media, args.verify, args.cert)
+    if cache is not None and args.cache_stats:
+        sys.stderr.write(json.dumps({"cache": cache.stats()}) + '\n')
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
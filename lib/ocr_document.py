@@ -0,0 +1,278 @@
+"""
+Streaming multi-page document OCR
+
+Spools a base64 (or raw) PDF/TIFF/image to a temporary file without holding
+it in memory, then rasterizes or splits pages one at a time and OCRs them
+concurrently through ocr_handwriting.OcrService. At most `window` pages are
+rasterized or in flight at once, so memory stays flat however long the
+document is.
+
+Output is NDJSON: one {"page": n, ...result} line per page as it completes
+(not necessarily in order), then a final {"done": true, ...} line whose
+"text" is the merged text in page order. If the document cannot be read the
+final line is {"done": true, "success": false, "error": ...} instead.
+
+PDFs are rasterized with PyMuPDF when installed, otherwise with poppler's
+pdftoppm; TIFFs need Pillow.
+"""
+
+import io
+import re
+import sys
+import json
+import shutil
+import asyncio
+import binascii
+import tempfile
+import subprocess
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:  # pdftoppm is used instead
+    fitz = None
+
+from ocr_preprocess import Image
+
+if Image is not None:
+    from PIL import ImageSequence
+
+SPOOL_CHUNK = 64 * 1024
+DEFAULT_WINDOW = 4
+DEFAULT_DPI = 200
+PAGE_SEPARATOR = '\n\f\n'
+
+_WHITESPACE = re.compile(rb'\s+')
+
+
+def spool_base64(stream, target):
+    """
+    Decode base64 text from a binary stream into a file, chunk by chunk.
+
+    A leading data: URL prefix and any whitespace are skipped.
+
+    Returns:
+        Number of decoded bytes written
+    """
+    written = 0
+    pending = b''
+    first = True
+    while True:
+        chunk = stream.read(SPOOL_CHUNK)
+        if not chunk:
+            break
+        if first:
+            chunk = chunk.lstrip()
+            if chunk.startswith(b'data:'):
+                # The prefix is short, but may straddle a chunk boundary
+                while b',' not in chunk:
+                    more = stream.read(SPOOL_CHUNK)
+                    if not more:
+                        raise ValueError("Invalid base64: data URL without payload")
+                    chunk += more
+                chunk = chunk.split(b',', 1)[1]
+            first = False
+        pending += _WHITESPACE.sub(b'', chunk)
+        usable = len(pending) - len(pending) % 4
+        if usable:
+            try:
+                data = binascii.a2b_base64(pending[:usable])
+            except binascii.Error as e:
+                raise ValueError(f"Invalid base64: {e}")
+            target.write(data)
+            written += len(data)
+            pending = pending[usable:]
+    if pending:
+        raise ValueError("Invalid base64: truncated input")
+    return written
+
+
+def detect_format(path):
+    with open(path, 'rb') as f:
+        head = f.read(8)
+    if head.startswith(b'%PDF'):
+        return 'pdf'
+    if head[:4] in (b'II*\x00', b'MM\x00*'):
+        return 'tiff'
+    return 'image'
+
+
+def _pdf_page_count(path):
+    output = subprocess.run(['pdfinfo', path], capture_output=True, text=True, check=True).stdout
+    match = re.search(r'^Pages:\s+(\d+)', output, re.MULTILINE)
+    if not match:
+        raise ValueError("Could not read the PDF page count")
+    return int(match.group(1))
+
+
+def iter_pages(path, fmt=None, dpi=DEFAULT_DPI):
+    """
+    Yield (page number, encoded page image) one page at a time.
+
+    Only the current page is ever rasterized; callers pace the generator.
+    """
+    fmt = fmt or detect_format(path)
+
+    if fmt == 'image':
+        with open(path, 'rb') as f:
+            yield 1, f.read()
+        return
+
+    if fmt == 'tiff':
+        if Image is None:
+            raise RuntimeError("Pillow is required for TIFF documents")
+        with Image.open(path) as tiff:
+            for number, frame in enumerate(ImageSequence.Iterator(tiff), start=1):
+                out = io.BytesIO()
+                frame.convert('L').save(out, 'PNG')
+                yield number, out.getvalue()
+        return
+
+    if fitz is not None:
+        with fitz.open(path) as doc:
+            for number, page in enumerate(doc, start=1):
+                yield number, page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY).tobytes('png')
+        return
+
+    if not (shutil.which('pdftoppm') and shutil.which('pdfinfo')):
+        raise RuntimeError("PDF documents need PyMuPDF or poppler-utils (pdftoppm)")
+    for number in range(1, _pdf_page_count(path) + 1):
+        page = subprocess.run(
+            ['pdftoppm', '-f', str(number), '-l', str(number), '-r', str(dpi), '-gray', '-png', path],
+            capture_output=True, check=True
+        ).stdout
+        yield number, page
+
+
+class _MergedText:
+    """Collects page texts in page order, keeping only out-of-order pages in memory"""
+
+    def __init__(self):
+        self.file = tempfile.TemporaryFile(mode='w+', encoding='utf-8')
+        self.next_page = 1
+        self._waiting = {}
+
+    def add(self, number, text):
+        """Queue a page's text; returns how many pages were written in order as a result"""
+        self._waiting[number] = text
+        written = 0
+        while self.next_page in self._waiting:
+            if self.next_page > 1:
+                self.file.write(PAGE_SEPARATOR)
+            self.file.write(self._waiting.pop(self.next_page))
+            self.next_page += 1
+            written += 1
+        return written
+
+    def write_json_string(self, out):
+        """Write the merged text as a JSON string literal without loading it whole"""
+        self.file.seek(0)
+        out.write('"')
+        while True:
+            chunk = self.file.read(SPOOL_CHUNK)
+            if not chunk:
+                break
+            out.write(json.dumps(chunk)[1:-1])
+        out.write('"')
+        self.file.close()
+
+
+async def ocr_document(path, out, service, window=DEFAULT_WINDOW, dpi=DEFAULT_DPI, preset=None,
+                       structured=False, packed=False, pages=None):
+    """
+    OCR every page of a document, writing NDJSON page results to `out`.
+
+    Args:
+        path: Spooled document file
+        out: Text stream for the NDJSON lines
+        service: OcrService the pages are submitted to
+        window: Maximum pages rasterized, in flight or waiting for an earlier page at once
+        pages: Page iterator to use instead of iter_pages(path) (for tests)
+
+    Returns:
+        Summary dict, also written as the final line
+    """
+    loop = asyncio.get_running_loop()
+    slots = asyncio.Semaphore(max(window, 1))
+    merged = _MergedText()
+    failed = []
+    tasks = set()
+    pages = pages or iter_pages(path, dpi=dpi)
+
+    def emit(line):
+        out.write(json.dumps(line, separators=(',', ':')) + '\n')
+        out.flush()
+
+    async def run(number, image_bytes):
+        try:
+            result = await service.recognize_image(image_bytes, preset, structured=structured, packed=packed)
+        except Exception as e:
+            result = {"success": False, "error": str(e)}
+        finally:
+            del image_bytes
+        if not result.get("success"):
+            failed.append(number)
+        # A page keeps its slot until its text is merged, so a slow page holds
+        # back at most `window` later ones rather than the rest of the document
+        for _ in range(merged.add(number, result.get("text", ""))):
+            slots.release()
+        emit({"page": number, **result})
+
+    count = 0
+    while True:
+        await slots.acquire()
+        page = await loop.run_in_executor(None, next, pages, None)
+        if page is None:
+            slots.release()
+            break
+        count += 1
+        task = loop.create_task(run(*page))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    if tasks:
+        await asyncio.wait(list(tasks))
+
+    summary = {"done": True, "pages": count, "failed": sorted(failed)}
+    prefix = json.dumps(summary, separators=(',', ':'))[:-1]
+    out.write(prefix + ',"text":')
+    merged.write_json_string(out)
+    out.write('}\n')
+    out.flush()
+    return summary
+
+
+async def run_document(source, out, binary=False, window=DEFAULT_WINDOW, dpi=DEFAULT_DPI, preset=None,
+                       structured=False, packed=False, cache=None, deadline=None, clients=2):
+    """Spool `source` (base64 text, or raw bytes with binary=True) and OCR it page by page"""
+    from ocr_handwriting import OcrService, ClientPool, DEFAULT_DEADLINE
+
+    with tempfile.NamedTemporaryFile(suffix='.doc') as spool:
+        if binary:
+            shutil.copyfileobj(source, spool, SPOOL_CHUNK)
+        else:
+            spool_base64(source, spool)
+        spool.flush()
+
+        service = OcrService(ClientPool(clients), cache=cache, deadline=deadline or DEFAULT_DEADLINE)
+        try:
+            return await ocr_document(spool.name, out, service, window, dpi, preset, structured, packed)
+        finally:
+            await service.close()
+
+
+def main(args, cache=None):
+    """Entry point for ocr_handwriting.py --document"""
+    source = None
+    try:
+        source = open(args.input, 'rb') if args.input else sys.stdin.buffer
+        asyncio.run(run_document(source, sys.stdout, bool(args.input), args.window, args.dpi, args.preset,
+                                 args.structured, args.packed, cache, args.deadline, args.clients))
+    except Exception as e:
+        import traceback
+        sys.stderr.write(traceback.format_exc())
+        # Page lines already written stand; this takes the place of the summary line
+        sys.stdout.write(json.dumps({"done": True, "success": False, "error": str(e)}) + '\n')
+        sys.stdout.flush()
+    finally:
+        if args.input and source is not None:
+            source.close()
@@ -1,6 +1,29 @@
 #!/usr/bin/env python3
 """
 Handwriting OCR using Google Cloud Vision API
+
+One-shot mode reads a base64 image on stdin and prints one JSON result.
+Service mode (--serve) keeps a small pool of authenticated clients alive,
+reads {"id", "image"} JSON lines on stdin and streams {"id", ...result}
+lines back as images finish, grouping concurrent images into
+batch_annotate_images calls. With a cache directory (--cache-dir or
+$OCR_CACHE_DIR) results are kept in SQLite, keyed by image content hash, so
+re-submitted sheets are not sent to Vision again. Backend calls run under a
+deadline with retries, optional hedging and a circuit breaker (see
+ocr_resilience); OCR_BACKEND=fake swaps Vision for a local fake backend and
+VISION_API_ENDPOINT=http://host:port sends requests to a REST stand-in such as
+scripts/vision_stub.py with anonymous credentials.
+--structured adds the page/block/paragraph/line/word hierarchy as columnar
+arrays with per-word and per-line confidences (see ocr_structure).
+--document OCRs multi-page PDFs/TIFFs page by page (see ocr_document).
+
+Usage:
+    python3 lib/ocr_handwriting.py < image.b64
+    python3 lib/ocr_handwriting.py --serve --clients 2 < images.jsonl
+    python3 lib/ocr_handwriting.py --preset fast < image.b64
+    python3 lib/ocr_handwriting.py --cache-dir .cache --cache-stats < image.b64
+    python3 lib/ocr_handwriting.py --structured --packed < image.b64
+    python3 lib/ocr_handwriting.py --document --input referral.pdf --window 4
 """
 
 import sys
@@ -8,66 +31,585 @@ import json
 import base64
 import tempfile
 import os
-from google.cloud import vision
-from google.oauth2 import service_account
+import asyncio
+import argparse
+import itertools
+import threading
+
+try:
+    from google.cloud import vision
+    from google.oauth2 import service_account
+except ImportError:  # Forwarding to the Python worker does not need the SDK
+    vision = None
+    service_account = None
+
+from ocr_preprocess import preprocess, PRESETS, DEFAULT_PRESET
+from result_cache import MemoryCache, SqliteCache, TieredCache, content_key
+from ocr_resilience import ResilientCaller, FakeVisionBackend, check_response
+from ocr_structure import flatten, summarize, encode, decode
+from vision_rest import RestVisionClient
+
+# Path to your service account key file
+# Assuming it's in the project root, relative to where this script is run (usually project root)
+KEY_FILE = "industrial-cat-485320-h3-007121c04b6c.json"
+
+# Vision accepts up to 16 images per batch_annotate_images request and about
+# 10 MB of JSON, so raw image bytes are capped below that once base64 encoded
+BATCH_MAX_IMAGES = 16
+BATCH_MAX_BYTES = 7 * 1024 * 1024
+
+# How long the batcher waits for more images before sending a partial batch
+BATCH_WINDOW = 0.05
+
+# Vision feature requested for every image, part of the cache key
+OCR_SETTINGS = 'DOCUMENT_TEXT_DETECTION'
+
+CACHE_TTL = 7 * 24 * 60 * 60
+CACHE_MAX_ENTRIES = 5000
+# Recent results also kept in memory, so repeat hits skip SQLite
+CACHE_MEMORY_ENTRIES = 256
+# Hit rates go to stderr every this many cache lookups
+CACHE_LOG_EVERY = 100
+
+_lookups = itertools.count(1)
+
+# Seconds a single OCR request may take, retries included
+DEFAULT_DEADLINE = float(os.environ.get('OCR_DEADLINE', '20'))
+
+# 'fake' serves results from ocr_resilience.FakeVisionBackend instead of Vision
+FAKE_BACKEND = os.environ.get('OCR_BACKEND') == 'fake'
+
+# Alternative Vision endpoint (e.g. http://127.0.0.1:8089), called over REST without credentials
+VISION_ENDPOINT = os.environ.get('VISION_API_ENDPOINT')
+
+# Local backends work without the SDK
+_SDK_REQUIRED = not (FAKE_BACKEND or VISION_ENDPOINT)
+
+
+class ClientPool:
+    """
+    A few long-lived ImageAnnotatorClients sharing one set of credentials.
+
+    Clients are created on first use and handed out round-robin; each keeps
+    its own channel, so TLS handshakes happen once per client, not per image.
+    """
+
+    def __init__(self, size=1, key_path=None):
+        self.size = max(size, 1)
+        self.key_path = os.path.abspath(key_path or KEY_FILE)
+        self._clients = []
+        self._cycle = None
+        self._lock = threading.Lock()
+
+    def _create(self):
+        if FAKE_BACKEND:
+            return [FakeVisionBackend() for _ in range(self.size)]
+        if VISION_ENDPOINT:
+            if vision is None:
+                return [RestVisionClient(VISION_ENDPOINT) for _ in range(self.size)]
+            from google.auth.credentials import AnonymousCredentials
+            return [vision.ImageAnnotatorClient(credentials=AnonymousCredentials(), transport='rest',
+                                                client_options={"api_endpoint": VISION_ENDPOINT})
+                    for _ in range(self.size)]
+        if vision is None:
+            raise RuntimeError("google-cloud-vision is not installed")
+        if not os.path.exists(self.key_path):
+            raise FileNotFoundError(f"Credentials file not found at {self.key_path}")
+        credentials = service_account.Credentials.from_service_account_file(self.key_path)
+        return [vision.ImageAnnotatorClient(credentials=credentials) for _ in range(self.size)]
+
+    def get(self):
+        with self._lock:
+            if self._cycle is None:
+                self._clients = self._create()
+                self._cycle = itertools.cycle(self._clients)
+            return next(self._cycle)
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def get_client():
+    """Process-wide cached client, created on first use"""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = ClientPool(1)
+    return _default_pool.get()
+
+
+_caller = None
+_caller_lock = threading.Lock()
+
+
+def get_caller():
+    """Process-wide ResilientCaller, so the breaker and latency window are shared"""
+    global _caller
+    with _caller_lock:
+        if _caller is None:
+            _caller = ResilientCaller(hedge=os.environ.get('OCR_HEDGE') == '1')
+    return _caller
+
+
+def _vision_image(image_bytes):
+    # The fake backend ignores its input and RestVisionClient takes bytes, so both run without the SDK
+    return vision.Image(content=image_bytes) if vision is not None else image_bytes
+
+
+def decode_image(input_data):
+    """
+    Decode a base64 (or data: URL) encoded image.
+
+    Returns:
+        (image_bytes, None) on success, (None, error message) otherwise
+    """
+    input_data = input_data.strip()
+
+    if not input_data:
+        return None, "No image data provided"
+
+    if input_data.startswith("data:"):
+        input_data = input_data.split(",", 1)[1] if "," in input_data else input_data
 
-def main():
     try:
-        # Read input from stdin
-        input_data = sys.stdin.read().strip()
-        
-        if not input_data:
-            print(json.dumps({"success": False, "error": "No image data provided"}))
-            return
-        
-        if input_data.startswith("data:"):
-            input_data = input_data.split(",", 1)[1] if "," in input_data else input_data
-        
+        return base64.b64decode(input_data), None
+    except Exception as e:
+        return None, f"Invalid base64: {str(e)}"
+
+
+def raw_cache_key(image_bytes, preset=None):
+    """Key for an image as received; hits skip preprocessing entirely"""
+    return content_key('raw', image_bytes, preset or DEFAULT_PRESET, OCR_SETTINGS)
+
+
+def processed_cache_key(image_bytes):
+    """Key for the bytes actually sent to Vision, shared across presets"""
+    return content_key('processed', image_bytes, OCR_SETTINGS)
+
+
+def open_cache(cache_dir, ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES):
+    """On-disk OCR result cache shared by CLI invocations and workers"""
+    disk = SqliteCache(os.path.join(cache_dir, 'ocr_results.sqlite'), max_entries, ttl)
+    return TieredCache(MemoryCache(CACHE_MEMORY_ENTRIES, ttl), disk)
+
+
+def default_cache():
+    """Cache in $OCR_CACHE_DIR, or None when it is not set"""
+    cache_dir = os.environ.get('OCR_CACHE_DIR')
+    return open_cache(cache_dir) if cache_dir else None
+
+
+def _cache_get(cache, key, structured=False):
+    value = cache.get(key)
+    if next(_lookups) % CACHE_LOG_EVERY == 0:
+        sys.stderr.write(json.dumps({"ocr_cache": cache.stats()}) + '\n')
+    if value is None or (structured and "structure" not in value):
+        # Stored without the structure; the fresh result replaces it
+        return None
+    return dict(value, cached=True)
+
+
+def _cache_set(cache, keys, result):
+    # Only successful recognitions are worth keeping
+    if result.get("success"):
+        value = {k: v for k, v in result.items() if k != 'cached'}
+        for key in keys:
+            cache.set(key, value)
+
+
+def _result(response, structured=False):
+    """
+    Convert one AnnotateImageResponse into the OCR result dictionary.
+
+    confidence is the mean word confidence in percent; review_lines lists the
+    lines whose weakest word falls below ocr_structure.REVIEW_THRESHOLD. With
+    structured the columns are kept under "structure" in packed form, which is
+    also how the cache stores them; shape() unpacks or drops them.
+    """
+    if response.error.message:
+        raise Exception(f'{response.error.message}')
+
+    full_text = response.full_text_annotation.text
+
+    # Extract lines if needed, or just split full_text
+    lines = full_text.split('\n')
+
+    columns = flatten(response.full_text_annotation)
+    confidence, review = summarize(columns)
+
+    result = {
+        "success": True,
+        "text": full_text,
+        "confidence": confidence,
+        "lines": lines,
+        "review_lines": review
+    }
+    if structured:
+        result["structure"] = encode(columns, packed=True)
+    return result
+
+
+def shape(result, structured=False, packed=False):
+    """Drop the packed columnar structure, or rebuild the JSON lists when unpacked was asked for"""
+    if "structure" not in result:
+        return result
+    result = dict(result)
+    columns = result.pop("structure")
+    if structured:
+        result["structure"] = columns if packed else encode(decode(columns))
+    return result
+
+
+def recognize(input_data, client=None, preset=None, cache=None, bypass_cache=False, deadline=None,
+              structured=False, packed=False):
+    """
+    Run handwriting OCR on a base64 (or data: URL) encoded image.
+
+    Args:
+        input_data: Base64 image data
+        client: ImageAnnotatorClient to use (defaults to the cached client)
+        preset: Preprocessing preset (see ocr_preprocess.PRESETS), 'none' to skip
+        cache: SqliteCache (see open_cache) to look results up in and store them to
+        bypass_cache: Skip the lookup but still store the fresh result
+        deadline: Seconds allowed for the Vision call, retries included
+        structured: Include the columnar page/line/word structure
+        packed: Encode the structure's numeric columns as base64 typed arrays
+
+    Returns:
+        Result dictionary with success, text, confidence, lines, review_lines and
+        preprocessing; cache hits carry "cached": true
+    """
+    return shape(_recognize(input_data, client, preset, cache, bypass_cache, deadline, structured),
+                 structured, packed)
+
+
+def _recognize(input_data, client, preset, cache, bypass_cache, deadline, structured):
+    image_bytes, error = decode_image(input_data)
+    if error:
+        return {"success": False, "error": error}
+
+    keys = []
+    if cache is not None:
+        keys.append(raw_cache_key(image_bytes, preset))
+        if not bypass_cache:
+            cached = _cache_get(cache, keys[0], structured)
+            if cached is not None:
+                return cached
+
+    if vision is None and _SDK_REQUIRED:
+        return {"success": False, "error": "google-cloud-vision is not installed"}
+
+    try:
+        client = client or get_client()
+    except FileNotFoundError as e:
+        return {"success": False, "error": str(e)}
+
+    image_bytes, preprocessing = preprocess(image_bytes, preset)
+
+    if cache is not None:
+        keys.append(processed_cache_key(image_bytes))
+        if not bypass_cache:
+            cached = _cache_get(cache, keys[1], structured)
+            if cached is not None:
+                _cache_set(cache, keys[:1], cached)
+                return cached
+
+    try:
+        image = _vision_image(image_bytes)
+
+        # Use document_text_detection for dense text/handwriting; the client's
+        # own retries are off so the deadline covers every attempt
+        response = get_caller().call(
+            lambda timeout: check_response(client.document_text_detection(image=image, timeout=timeout, retry=None)),
+            deadline or DEFAULT_DEADLINE
+        )
+        result = _result(response, structured)
+        result["preprocessing"] = preprocessing
+        if cache is not None:
+            _cache_set(cache, keys, result)
+        return result
+
+    except Exception as e:
+        raise Exception(f"Google Cloud Vision API Error: {str(e)}")
+
+
+def annotate_batch(images, client=None, deadline=None):
+    """
+    Run document text detection on several decoded images in one request.
+
+    Args:
+        images: List of image bytes, at most BATCH_MAX_IMAGES
+        client: ImageAnnotatorClient to use (defaults to the cached client)
+        deadline: Seconds allowed for the request, retries included
+
+    Returns:
+        One result dictionary per image, in order, each with its packed
+        structure (OcrService drops it for requests that did not ask)
+    """
+    client = client or get_client()
+    if vision is not None:
+        feature = vision.Feature(type_=vision.Feature.Type.DOCUMENT_TEXT_DETECTION)
+        requests = [
+            vision.AnnotateImageRequest(image=vision.Image(content=image_bytes), features=[feature])
+            for image_bytes in images
+        ]
+    else:
+        requests = list(images)
+    response = get_caller().call(
+        lambda timeout: client.batch_annotate_images(requests=requests, timeout=timeout, retry=None),
+        deadline or DEFAULT_DEADLINE
+    )
+
+    results = []
+    for item in response.responses:
         try:
-            image_bytes = base64.b64decode(input_data)
+            results.append(_result(item, structured=True))
         except Exception as e:
-            print(json.dumps({"success": False, "error": f"Invalid base64: {str(e)}"}))
-            return
-        
-        # Path to your service account key file
-        # Assuming it's in the project root, relative to where this script is run (usually project root)
-        key_path = os.path.abspath("industrial-cat-485320-h3-007121c04b6c.json")
-        
-        if not os.path.exists(key_path):
-             print(json.dumps({"success": False, "error": f"Credentials file not found at {key_path}"}))
-             return
+            results.append({"success": False, "error": f"Google Cloud Vision API Error: {str(e)}"})
+    return results
+
+
+class OcrService:
+    """
+    Accepts images concurrently and annotates them in batches.
+
+    Images submitted within BATCH_WINDOW of each other are grouped into one
+    batch_annotate_images call (bounded by BATCH_MAX_IMAGES/BATCH_MAX_BYTES).
+    Up to one batch per pooled client is in flight at a time. Cache hits are
+    answered without joining a batch.
+    """
+
+    def __init__(self, pool=None, window=BATCH_WINDOW, annotate=annotate_batch, cache=None,
+                 deadline=DEFAULT_DEADLINE):
+        self.pool = pool or ClientPool(2)
+        self.window = window
+        self.annotate = annotate
+        self.cache = cache
+        self.deadline = deadline
+        self._queue = None
+        self._slots = None
+        self._batcher = None
+        self._inflight = set()
+
+    def _start(self):
+        if self._batcher is None:
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.pool.size)
+            self._batcher = asyncio.get_running_loop().create_task(self._run())
+
+    async def recognize(self, input_data, preset=None, bypass_cache=False, structured=False, packed=False):
+        """Recognize one base64 image, batched with whatever else is pending"""
+        image_bytes, error = decode_image(input_data)
+        if error:
+            return {"success": False, "error": error}
+        return shape(await self._recognize(image_bytes, preset, bypass_cache, structured), structured, packed)
 
+    async def recognize_image(self, image_bytes, preset=None, bypass_cache=False, structured=False, packed=False):
+        """Recognize already decoded image bytes, e.g. a document page"""
+        return shape(await self._recognize(image_bytes, preset, bypass_cache, structured), structured, packed)
+
+    async def _recognize(self, image_bytes, preset, bypass_cache, structured):
+        cache = self.cache
+        keys = []
+        if cache is not None:
+            keys.append(raw_cache_key(image_bytes, preset))
+            if not bypass_cache:
+                cached = _cache_get(cache, keys[0], structured)
+                if cached is not None:
+                    return cached
+
+        if vision is None and _SDK_REQUIRED and self.annotate is annotate_batch:
+            return {"success": False, "error": "google-cloud-vision is not installed"}
+
+        loop = asyncio.get_running_loop()
+        image_bytes, preprocessing = await loop.run_in_executor(None, preprocess, image_bytes, preset)
+
+        if cache is not None:
+            keys.append(processed_cache_key(image_bytes))
+            if not bypass_cache:
+                cached = _cache_get(cache, keys[1], structured)
+                if cached is not None:
+                    _cache_set(cache, keys[:1], cached)
+                    return cached
+
+        self._start()
+        future = loop.create_future()
+        await self._queue.put((image_bytes, future))
+        result = dict(await future)
+        if not structured:
+            result.pop("structure", None)
+        if result.get("success"):
+            result["preprocessing"] = preprocessing
+            if cache is not None:
+                _cache_set(cache, keys, result)
+        return result
+
+    async def _collect(self):
+        """Wait for one image, then gather more until the batch or window is full"""
+        batch = [await self._queue.get()]
+        size = len(batch[0][0])
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.window
+        while len(batch) < BATCH_MAX_IMAGES:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            if size + len(item[0]) > BATCH_MAX_BYTES:
+                # Too big for this request, it opens the next one
+                self._queue.put_nowait(item)
+                break
+            batch.append(item)
+            size += len(item[0])
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            await self._slots.acquire()
+            task = asyncio.get_running_loop().create_task(self._send(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _send(self, batch):
+        loop = asyncio.get_running_loop()
+        results = []
+        try:
+            client = await loop.run_in_executor(None, self.pool.get)
+            results = await loop.run_in_executor(None, self.annotate, [image for image, _ in batch], client,
+                                                 self.deadline)
+            if len(results) != len(batch):
+                # Responses pair with images by position; with some missing none can be trusted
+                raise RuntimeError(f"Vision returned {len(results)} responses for {len(batch)} images")
+        except Exception as e:
+            results = [{"success": False, "error": str(e)}] * len(batch)
+        finally:
+            self._slots.release()
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+            # Cancelled mid-request: nobody is left waiting on this batch
+            for _, future in batch:
+                if not future.done():
+                    future.set_result({"success": False, "error": "OCR batch was cancelled"})
+
+    async def close(self):
+        if self._batcher is not None:
+            self._batcher.cancel()
+            self._batcher = None
+        if self._inflight:
+            await asyncio.wait(list(self._inflight))
+
+
+async def serve(stream_in, stream_out, clients=2, window=BATCH_WINDOW, preset=None, cache=None,
+                bypass_cache=False, deadline=DEFAULT_DEADLINE, structured=False, packed=False):
+    """
+    Read {"id", "image"} JSON lines and write {"id", ...result} lines as each
+    image finishes. Results are not in input order.
+    """
+    loop = asyncio.get_running_loop()
+    service = OcrService(ClientPool(clients), window, cache=cache, deadline=deadline)
+    tasks = set()
+
+    async def handle(line):
         try:
-            credentials = service_account.Credentials.from_service_account_file(key_path)
-            client = vision.ImageAnnotatorClient(credentials=credentials)
-            
-            image = vision.Image(content=image_bytes)
-            
-            # Use document_text_detection for dense text/handwriting
-            response = client.document_text_detection(image=image)
-            
-            if response.error.message:
-                raise Exception(f'{response.error.message}')
-                
-            full_text = response.full_text_annotation.text
-            
-            # Extract lines if needed, or just split full_text
-            lines = full_text.split('\n')
-            
-            # Confidence is not a single value in GCV, but we can average it or just return a placeholder
-            # Pages -> Blocks -> Paragraphs -> Words -> Symbols (each has confidence)
-            # For simplicity, we'll assume high confidence if successful
-            
-            print(json.dumps({
-                "success": True,
-                "text": full_text,
-                "confidence": 99.0, 
-                "lines": lines
-            }))
-            
+            item = json.loads(line)
+            request_id = item.get('id')
+            result = await service.recognize(item.get('image', ''), item.get('preset', preset),
+                                             item.get('bypass_cache', bypass_cache),
+                                             item.get('structured', structured), packed)
         except Exception as e:
-            raise Exception(f"Google Cloud Vision API Error: {str(e)}")
-                
+            request_id = None
+            result = {"success": False, "error": str(e)}
+        stream_out.write(json.dumps({"id": request_id, **result}, separators=(',', ':')) + '\n')
+        stream_out.flush()
+
+    while True:
+        line = await loop.run_in_executor(None, stream_in.readline)
+        if not line:
+            break
+        if not line.strip():
+            continue
+        task = loop.create_task(handle(line))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    if tasks:
+        await asyncio.wait(list(tasks))
+    await service.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Handwriting OCR with Google Cloud Vision')
+    parser.add_argument('--serve', action='store_true',
+                        help='Service mode: {"id", "image"} JSON lines in, result lines out')
+    parser.add_argument('--document', action='store_true',
+                        help='Document mode: multi-page PDF/TIFF in, one NDJSON line per page out')
+    parser.add_argument('--input', '-i', help='Raw document file for --document (default: base64 on stdin)')
+    parser.add_argument('--window', type=int, default=4, help='Pages rasterized or in flight at once in --document')
+    parser.add_argument('--dpi', type=int, default=200, help='PDF rasterization resolution in --document')
+    parser.add_argument('--clients', type=int, default=2, help='Pooled Vision clients in service and document mode')
+    parser.add_argument('--batch-window', type=float, default=BATCH_WINDOW,
+                        help='Seconds to wait for more images before sending a batch')
+    parser.add_argument('--preset', choices=list(PRESETS) + ['none'],
+                        help='Image preprocessing preset (default: $OCR_PREPROCESS or none)')
+    parser.add_argument('--cache-dir', default=os.environ.get('OCR_CACHE_DIR'),
+                        help='Directory for the OCR result cache (default: $OCR_CACHE_DIR, off if unset)')
+    parser.add_argument('--cache-ttl', type=float, default=CACHE_TTL, help='Cache entry lifetime in seconds')
+    parser.add_argument('--cache-size', type=int, default=CACHE_MAX_ENTRIES, help='Maximum cached results')
+    parser.add_argument('--no-cache', action='store_true', help='Bypass cache lookups (fresh results are still stored)')
+    parser.add_argument('--cache-stats', action='store_true', help='Print cache hit/miss counters to stderr')
+    parser.add_argument('--deadline', type=float, default=DEFAULT_DEADLINE,
+                        help='Seconds allowed per image, retries included (default: $OCR_DEADLINE or 20)')
+    parser.add_argument('--structured', action='store_true',
+                        help='Include columnar page/line/word structure with confidences')
+    parser.add_argument('--packed', action='store_true',
+                        help='Encode structure columns as base64 little-endian typed arrays')
+    args = parser.parse_args()
+
+    cache = open_cache(args.cache_dir, args.cache_ttl, args.cache_size) if args.cache_dir else None
+
+    if args.document:
+        import ocr_document
+        ocr_document.main(args, cache)
+        if cache is not None and args.cache_stats:
+            sys.stderr.write(json.dumps({"ocr_cache": cache.stats()}) + '\n')
+        return
+
+    if args.serve:
+        asyncio.run(serve(sys.stdin, sys.stdout, args.clients, args.batch_window, args.preset,
+                          cache, args.no_cache, args.deadline, args.structured, args.packed))
+        if cache is not None and args.cache_stats:
+            sys.stderr.write(json.dumps({"ocr_cache": cache.stats()}) + '\n')
+        return
+
+    try:
+        # Read input from stdin
+        input_data = sys.stdin.read()
+
+        # Forward to the persistent worker when one is configured
+        if os.environ.get('MEDFLOW_WORKER_SOCKET'):
+            try:
+                from python_worker import call
+                params = {"image": input_data, "preset": args.preset, "bypass_cache": args.no_cache,
+                          "structured": args.structured, "packed": args.packed}
+                result = call('ocr.handwriting', params, timeout=120.0)
+            except (OSError, RuntimeError, ValueError):
+                result = None  # Worker not running, draining or failing; recognize in-process
+            if result is not None:
+                print(json.dumps(result, separators=(',', ':')))
+                return
+
+        result = recognize(input_data, preset=args.preset, cache=cache, bypass_cache=args.no_cache,
+                           deadline=args.deadline, structured=args.structured, packed=args.packed)
+        print(json.dumps(result, separators=(',', ':')))
+        if cache is not None and args.cache_stats:
+            sys.stderr.write(json.dumps({"ocr_cache": cache.stats()}) + '\n')
+
     except Exception as e:
         import traceback
         sys.stderr.write(traceback.format_exc())
@@ -0,0 +1,155 @@
+"""
+Image preprocessing ahead of handwriting OCR
+
+Phone photos of prescriptions arrive at 4-12 MB, far more than document
+text detection needs. preprocess() can shrink them before upload: EXIF
+rotation, grayscale, downscale to a long edge (or target DPI), optional
+deskew, optional crop to the written area and a compact re-encode. It is
+off unless a preset is requested or $OCR_PREPROCESS is set. Pillow is
+optional; without it images are passed through unchanged.
+"""
+
+import io
+import os
+from collections import namedtuple
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Preprocessing is skipped without Pillow
+    Image = None
+    ImageOps = None
+
+
+Preset = namedtuple('Preset', 'long_edge grayscale deskew crop format quality')
+
+# long_edge in pixels; Vision reads handwriting well from about 1600 px up.
+# Only 'fast' crops: notes scribbled in the margins can fall outside the ink box.
+PRESETS = {
+    'fast': Preset(1600, True, False, True, 'JPEG', 75),
+    'balanced': Preset(2048, True, False, False, 'JPEG', 85),
+    'quality': Preset(3072, True, True, False, 'JPEG', 92),
+}
+
+# Preprocessing changes what Vision sees, so callers opt in per request or with $OCR_PREPROCESS
+DEFAULT_PRESET = os.environ.get('OCR_PREPROCESS', 'none')
+
+# Pixels darker than this count as ink when cropping and deskewing
+INK_THRESHOLD = 160
+
+# Deskew searches +/- MAX_SKEW degrees in SKEW_STEP steps on a small copy
+MAX_SKEW = 5.0
+SKEW_STEP = 0.5
+SKEW_SAMPLE_EDGE = 800
+
+
+def _ink_mask(gray):
+    """White-on-black mask of the dark (written) pixels"""
+    return gray.point(lambda p: 255 if p < INK_THRESHOLD else 0)
+
+
+def _row_variance(mask):
+    """Variance of the row means; text lines aligned with rows maximise it"""
+    rows = list(mask.resize((1, mask.height), Image.BOX).getdata())
+    mean = sum(rows) / len(rows)
+    return sum((r - mean) ** 2 for r in rows) / len(rows)
+
+
+def estimate_skew(gray):
+    """Rotation in degrees that best aligns text lines with the image rows"""
+    sample = gray.copy()
+    sample.thumbnail((SKEW_SAMPLE_EDGE, SKEW_SAMPLE_EDGE))
+    mask = _ink_mask(sample)
+
+    best_angle, best_score = 0.0, _row_variance(mask)
+    steps = int(MAX_SKEW / SKEW_STEP)
+    for i in range(-steps, steps + 1):
+        angle = i * SKEW_STEP
+        if angle == 0:
+            continue
+        score = _row_variance(mask.rotate(angle, resample=Image.NEAREST, fillcolor=0))
+        if score > best_score:
+            best_angle, best_score = angle, score
+    return best_angle
+
+
+def crop_to_content(image, margin=0.02):
+    """Crop to the bounding box of the ink plus a margin; keep tiny crops uncut"""
+    gray = image if image.mode == 'L' else image.convert('L')
+    bbox = _ink_mask(gray).getbbox()
+    if not bbox:
+        return image
+
+    left, top, right, bottom = bbox
+    # A box this small is a speck of noise, not the note
+    if (right - left) * (bottom - top) < 0.1 * image.width * image.height:
+        return image
+
+    pad_x, pad_y = int(image.width * margin), int(image.height * margin)
+    return image.crop((
+        max(left - pad_x, 0), max(top - pad_y, 0),
+        min(right + pad_x, image.width), min(bottom + pad_y, image.height),
+    ))
+
+
+def preprocess(image_bytes, preset=None):
+    """
+    Shrink an image for OCR upload.
+
+    Args:
+        image_bytes: Encoded image as received
+        preset: Name in PRESETS, or 'none' to skip (defaults to DEFAULT_PRESET)
+
+    Returns:
+        (bytes to upload, info dict with preset, bytes_before, bytes_after, ...)
+    """
+    preset = preset or DEFAULT_PRESET
+    info = {"preset": preset, "bytes_before": len(image_bytes), "bytes_after": len(image_bytes)}
+
+    if preset == 'none':
+        return image_bytes, info
+    if preset not in PRESETS:
+        raise ValueError(f"Unknown preprocessing preset: {preset}")
+    if Image is None:
+        info["skipped"] = "Pillow is not installed"
+        return image_bytes, info
+
+    settings = PRESETS[preset]
+    try:
+        image = Image.open(io.BytesIO(image_bytes))
+        image = ImageOps.exif_transpose(image)
+        info["original_size"] = list(image.size)
+
+        if settings.grayscale:
+            image = image.convert('L')
+        elif image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+
+        if max(image.size) > settings.long_edge:
+            image.thumbnail((settings.long_edge, settings.long_edge), Image.LANCZOS, reducing_gap=3.0)
+
+        if settings.deskew:
+            gray = image if image.mode == 'L' else image.convert('L')
+            angle = estimate_skew(gray)
+            if angle:
+                fill = 255 if image.mode == 'L' else (255, 255, 255)
+                image = image.rotate(angle, resample=Image.BICUBIC, expand=True, fillcolor=fill)
+            info["skew"] = angle
+
+        if settings.crop:
+            image = crop_to_content(image)
+
+        out = io.BytesIO()
+        image.save(out, settings.format, quality=settings.quality, optimize=True)
+        processed = out.getvalue()
+    except Exception as e:
+        # Unreadable by Pillow; let Vision have a go at the original
+        info["skipped"] = f"Preprocessing failed: {e}"
+        return image_bytes, info
+
+    info["size"] = list(image.size)
+    if len(processed) >= len(image_bytes):
+        info["skipped"] = "Original is already smaller"
+        return image_bytes, info
+
+    info["bytes_after"] = len(processed)
+    return processed, info
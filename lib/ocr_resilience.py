@@ -0,0 +1,309 @@
+"""
+Resilience layer for the OCR backend
+
+ResilientCaller wraps a blocking backend call with a per-request deadline,
+jittered exponential retries on retryable errors, an optional hedged second
+request once an attempt outlives the observed p95 latency, and a circuit
+breaker that fails fast while the backend is unhealthy.
+
+FakeVisionBackend stands in for vision.ImageAnnotatorClient with injected
+latency and errors, so all of this can be exercised without credentials
+(OCR_BACKEND=fake in ocr_handwriting.py).
+"""
+
+import os
+import time
+import random
+import threading
+from collections import deque
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+# gRPC status names and HTTP codes worth another attempt
+RETRYABLE_STATUS = frozenset(['UNAVAILABLE', 'DEADLINE_EXCEEDED', 'INTERNAL', 'RESOURCE_EXHAUSTED', 'ABORTED'])
+RETRYABLE_HTTP = frozenset([429, 500, 502, 503, 504])
+# google.rpc.Code values of the same statuses, as found in response.error.code
+RETRYABLE_RPC_CODES = frozenset([4, 8, 10, 13, 14])
+
+
+class BackendError(Exception):
+    """Error reported by the backend, with its gRPC status name"""
+
+    def __init__(self, status, message=''):
+        super().__init__(f"{status}: {message}" if message else status)
+        self.status = status
+
+
+class DeadlineExceededError(BackendError):
+    def __init__(self, message='Request deadline exceeded'):
+        super().__init__('DEADLINE_EXCEEDED', message)
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling the backend while the breaker is open"""
+
+
+def is_retryable(exc):
+    """True for transient errors: unavailable, throttled, internal, timed out"""
+    if isinstance(exc, BackendError):
+        return exc.status in RETRYABLE_STATUS
+    # google.api_core.exceptions carry both a gRPC status and an HTTP code
+    status = getattr(exc, 'grpc_status_code', None)
+    if status is not None and getattr(status, 'name', None) in RETRYABLE_STATUS:
+        return True
+    code = getattr(exc, 'code', None)
+    return isinstance(code, int) and code in RETRYABLE_HTTP
+
+
+def check_response(response):
+    """Raise a retryable BackendError for transient errors embedded in a response"""
+    error = getattr(response, 'error', None)
+    if error is not None and error.message and error.code in RETRYABLE_RPC_CODES:
+        raise BackendError('UNAVAILABLE', error.message)
+    return response
+
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive failures and rejects calls for
+    reset_timeout seconds, then lets one trial call through (half-open); its
+    outcome closes or re-opens the breaker.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Raise CircuitOpenError unless a call may go to the backend now"""
+        with self._lock:
+            if self.state == 'closed':
+                return
+            if self.state == 'open' and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = 'half-open'
+                self._trial_running = False
+            if self.state == 'half-open' and not self._trial_running:
+                self._trial_running = True
+                return
+            raise CircuitOpenError("OCR backend circuit is open, failing fast")
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half-open' or self.failures >= self.failure_threshold:
+                self.state = 'open'
+                self._opened_at = time.monotonic()
+                self._trial_running = False
+
+
+class LatencyTracker:
+    """Sliding window of recent call latencies"""
+
+    def __init__(self, window=200, min_samples=20):
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self, q):
+        """The q-quantile of the window, or None until min_samples are in"""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+class ResilientCaller:
+    """
+    Runs fn(timeout) under a deadline with retries, hedging and a breaker.
+
+    fn receives the seconds left before the deadline and should pass them on
+    as its own timeout. Attempts run on a small thread pool; an attempt that
+    overruns the deadline is abandoned, not interrupted.
+    """
+
+    def __init__(self, max_attempts=4, base_delay=0.2, max_delay=3.0, hedge=False, hedge_quantile=0.95,
+                 breaker=None, latency=None, workers=8):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.breaker = breaker or CircuitBreaker()
+        self.latency = latency or LatencyTracker()
+        self.hedged = 0
+        self.retries = 0
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ocr-backend')
+
+    def backoff(self, attempt):
+        """Full-jitter exponential backoff before retry number `attempt` (0-based)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def _timed(self, fn, timeout):
+        start = time.monotonic()
+        result = fn(timeout)
+        self.latency.add(time.monotonic() - start)
+        return result
+
+    def _attempt(self, fn, deadline):
+        """
+        One attempt, plus a hedged duplicate if it runs past the p95 latency.
+
+        The first success wins; the other request is cancelled if it has not
+        started yet, otherwise abandoned.
+        """
+        remaining = deadline - time.monotonic()
+        futures = {self._pool.submit(self._timed, fn, remaining)}
+
+        hedge_after = self.latency.quantile(self.hedge_quantile) if self.hedge else None
+        if hedge_after is not None and hedge_after < remaining:
+            done, _ = wait(futures, timeout=hedge_after)
+            if not done:
+                self.hedged += 1
+                futures.add(self._pool.submit(self._timed, fn, deadline - time.monotonic()))
+
+        error = None
+        while futures:
+            done, futures = wait(futures, timeout=max(deadline - time.monotonic(), 0), return_when=FIRST_COMPLETED)
+            if not done:
+                raise DeadlineExceededError()
+            for future in done:
+                if future.exception() is None:
+                    for loser in futures:
+                        loser.cancel()
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def call(self, fn, deadline_s):
+        """
+        Call fn until it succeeds, a non-retryable error occurs, attempts run
+        out or the deadline passes.
+
+        Raises:
+            CircuitOpenError: If the breaker is open
+            DeadlineExceededError: If deadline_s passes first
+            Exception: The last error from fn
+        """
+        deadline = time.monotonic() + deadline_s
+        for attempt in range(self.max_attempts):
+            self.breaker.allow()
+            try:
+                result = self._attempt(fn, deadline)
+            except Exception as e:
+                if not is_retryable(e):
+                    # The request was bad, the backend is fine
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                delay = self.backoff(attempt)
+                if attempt + 1 == self.max_attempts or time.monotonic() + delay >= deadline:
+                    raise
+                self.retries += 1
+                time.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return result
+        raise DeadlineExceededError()
+
+    def stats(self):
+        return {
+            "circuit": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "retries": self.retries,
+            "hedged": self.hedged,
+            "p95_ms": round(self.latency.quantile(0.95) * 1000, 1) if self.latency.quantile(0.95) else None,
+        }
+
+
+class FakeVisionBackend:
+    """
+    Local stand-in for ImageAnnotatorClient with injected latency and errors.
+
+    Each call sleeps latency (+/- jitter) seconds, or slow_latency with
+    probability slow_rate, and fails with status error_status with
+    probability error_rate. Defaults come from OCR_FAKE_* environment
+    variables so a whole CLI or worker can run against it.
+    """
+
+    def __init__(self, latency=None, jitter=None, error_rate=None, error_status='UNAVAILABLE',
+                 slow_rate=None, slow_latency=None, text='Paracetamol 500 mg\nTwice daily', seed=None):
+        env = os.environ.get
+        self.latency = latency if latency is not None else float(env('OCR_FAKE_LATENCY', '0.05'))
+        self.jitter = jitter if jitter is not None else float(env('OCR_FAKE_JITTER', '0.01'))
+        self.error_rate = error_rate if error_rate is not None else float(env('OCR_FAKE_ERROR_RATE', '0'))
+        self.slow_rate = slow_rate if slow_rate is not None else float(env('OCR_FAKE_SLOW_RATE', '0'))
+        self.slow_latency = slow_latency if slow_latency is not None else float(env('OCR_FAKE_SLOW_LATENCY', '2'))
+        self.error_status = error_status
+        self.text = text
+        self.calls = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _respond(self, timeout):
+        with self._lock:
+            self.calls += 1
+            slow = self._rng.random() < self.slow_rate
+            fail = self._rng.random() < self.error_rate
+            delay = self.slow_latency if slow else max(self.latency + self._rng.uniform(-self.jitter, self.jitter), 0)
+        if timeout is not None and delay > timeout:
+            time.sleep(max(timeout, 0))
+            raise DeadlineExceededError()
+        time.sleep(delay)
+        if fail:
+            raise BackendError(self.error_status, 'injected failure')
+        with self._lock:
+            annotation = self._annotation()
+        return SimpleNamespace(error=SimpleNamespace(code=0, message=''), full_text_annotation=annotation)
+
+    def _annotation(self):
+        """One page, one block/paragraph per text line, words with random confidences"""
+        def poly(x0, y0, x1, y1):
+            return SimpleNamespace(vertices=[SimpleNamespace(x=x, y=y) for x, y in
+                                             ((x0, y0), (x1, y0), (x1, y1), (x0, y1))])
+
+        def symbol(ch, brk):
+            return SimpleNamespace(text=ch, confidence=0.9, property=SimpleNamespace(
+                detected_break=SimpleNamespace(type_=brk)))
+
+        blocks = []
+        for row, line in enumerate(self.text.split('\n')):
+            words, x, y = [], 20, 40 + row * 60
+            tokens = line.split()
+            for i, token in enumerate(tokens):
+                brk = 5 if i == len(tokens) - 1 else 1  # LINE_BREAK / SPACE
+                width = 18 * len(token)
+                words.append(SimpleNamespace(
+                    confidence=round(self._rng.uniform(0.55, 0.99), 3),
+                    bounding_box=poly(x, y, x + width, y + 40),
+                    symbols=[symbol(ch, brk if j == len(token) - 1 else 0) for j, ch in enumerate(token)],
+                ))
+                x += width + 16
+            box = poly(20, y, max(x - 16, 20), y + 40)
+            paragraph = SimpleNamespace(confidence=0.9, bounding_box=box, words=words)
+            blocks.append(SimpleNamespace(confidence=0.9, bounding_box=box, paragraphs=[paragraph]))
+        page = SimpleNamespace(width=1200, height=1600, confidence=0.9, blocks=blocks)
+        return SimpleNamespace(text=self.text, pages=[page])
+
+    def document_text_detection(self, image=None, timeout=None, retry=None, **kwargs):
+        return self._respond(timeout)
+
+    def batch_annotate_images(self, requests=(), timeout=None, retry=None, **kwargs):
+        first = self._respond(timeout)
+        return SimpleNamespace(responses=[first for _ in requests])
@@ -0,0 +1,208 @@
+"""
+Columnar structure for Vision document text annotations
+
+flatten() walks the page -> block -> paragraph -> word -> symbol hierarchy
+once and returns parallel arrays per level (text, bounding box, confidence
+and parent indices). Lines are cut where a word's last symbol carries a
+line-ending detected_break. Per-line text, box and mean/min confidence are
+then aggregated over contiguous word ranges with numpy reduceat, or a
+single pure-Python pass when numpy is not installed.
+
+encode() ships the columns as compact JSON; with packed=True numeric columns
+become base64 little-endian typed arrays (Float32Array/Int32Array in Node).
+decode() turns packed columns back into lists.
+"""
+
+import sys
+import base64
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # Aggregates fall back to pure Python
+    np = None
+
+
+# TextAnnotation.DetectedBreak.BreakType values that end a line
+EOL_SURE_SPACE = 3
+HYPHEN = 4
+LINE_BREAK = 5
+_LINE_ENDS = frozenset([EOL_SURE_SPACE, HYPHEN, LINE_BREAK])
+_SPACED = frozenset([1, 2, EOL_SURE_SPACE])  # SPACE, SURE_SPACE, EOL_SURE_SPACE
+
+# Lines whose weakest word is below this are flagged for review
+REVIEW_THRESHOLD = 0.8
+
+# Column typecodes for packed encoding
+_TYPECODES = {'conf': 'f', 'mean_conf': 'f', 'min_conf': 'f', 'box': 'i', 'page': 'i', 'block': 'i',
+              'paragraph': 'i', 'line': 'i', 'start': 'i', 'count': 'i', 'width': 'i', 'height': 'i'}
+
+
+def _box(bounding_box, out):
+    """Append x0, y0, x1, y1 of a bounding poly to out"""
+    vertices = bounding_box.vertices if bounding_box is not None else ()
+    if not vertices:
+        out.extend((0, 0, 0, 0))
+        return
+    xs = [v.x for v in vertices]
+    ys = [v.y for v in vertices]
+    out.extend((min(xs), min(ys), max(xs), max(ys)))
+
+
+def _break_type(symbol):
+    prop = getattr(symbol, 'property', None)
+    detected = getattr(prop, 'detected_break', None) if prop is not None else None
+    return int(getattr(detected, 'type_', 0) or 0) if detected is not None else 0
+
+
+def flatten(annotation):
+    """
+    Flatten a full_text_annotation into columns.
+
+    Returns:
+        {"pages": {...}, "blocks": {...}, "paragraphs": {...}, "words": {...}}
+        where every level holds parallel lists and box is flat [x0, y0, x1, y1, ...]
+    """
+    pages = {"width": [], "height": [], "conf": []}
+    blocks = {"page": [], "conf": [], "box": []}
+    paragraphs = {"block": [], "conf": [], "box": []}
+    words = {"text": [], "conf": [], "box": [], "paragraph": [], "line": []}
+    # Line boundaries are recorded here and aggregated afterwards
+    line_starts = []
+    line_seps = []
+
+    line_open = False
+    for page in getattr(annotation, 'pages', ()) or ():
+        pages["width"].append(page.width)
+        pages["height"].append(page.height)
+        pages["conf"].append(page.confidence)
+        page_index = len(pages["width"]) - 1
+        for block in page.blocks:
+            blocks["page"].append(page_index)
+            blocks["conf"].append(block.confidence)
+            _box(block.bounding_box, blocks["box"])
+            block_index = len(blocks["page"]) - 1
+            for paragraph in block.paragraphs:
+                paragraphs["block"].append(block_index)
+                paragraphs["conf"].append(paragraph.confidence)
+                _box(paragraph.bounding_box, paragraphs["box"])
+                paragraph_index = len(paragraphs["block"]) - 1
+                for word in paragraph.words:
+                    symbols = word.symbols
+                    if not line_open:
+                        line_starts.append(len(words["text"]))
+                        line_seps.append([])
+                        line_open = True
+                    words["text"].append(''.join(s.text for s in symbols))
+                    words["conf"].append(word.confidence)
+                    _box(word.bounding_box, words["box"])
+                    words["paragraph"].append(paragraph_index)
+                    words["line"].append(len(line_starts) - 1)
+                    brk = _break_type(symbols[-1]) if symbols else 0
+                    line_seps[-1].append(' ' if brk in _SPACED else ('-' if brk == HYPHEN else ''))
+                    if brk in _LINE_ENDS:
+                        line_open = False
+                # Paragraphs never share a line
+                line_open = False
+
+    columns = {"pages": pages, "blocks": blocks, "paragraphs": paragraphs, "words": words}
+    columns["lines"] = aggregate_lines(words, line_starts, line_seps)
+    return columns
+
+
+def aggregate_lines(words, starts, seps):
+    """Per-line text, box, word count and mean/min confidence from contiguous word ranges"""
+    n_words = len(words["text"])
+    counts = [end - start for start, end in zip(starts, starts[1:] + [n_words])]
+    texts = []
+    for start, count, line_seps in zip(starts, counts, seps):
+        parts = []
+        for text, sep in zip(words["text"][start:start + count], line_seps):
+            parts.append(text)
+            parts.append(sep)
+        texts.append(''.join(parts).rstrip())
+
+    lines = {"text": texts, "start": list(starts), "count": counts}
+    if not starts:
+        lines.update({"mean_conf": [], "min_conf": [], "box": []})
+        return lines
+
+    if np is not None:
+        conf = np.asarray(words["conf"], dtype=np.float64)
+        box = np.asarray(words["box"], dtype=np.int64).reshape(-1, 4)
+        idx = np.asarray(starts, dtype=np.intp)
+        mean = np.add.reduceat(conf, idx) / np.asarray(counts, dtype=np.float64)
+        low = np.minimum.reduceat(conf, idx)
+        line_box = np.concatenate([
+            np.minimum.reduceat(box[:, :2], idx, axis=0),
+            np.maximum.reduceat(box[:, 2:], idx, axis=0),
+        ], axis=1)
+        lines["mean_conf"] = mean.tolist()
+        lines["min_conf"] = low.tolist()
+        lines["box"] = line_box.ravel().tolist()
+        return lines
+
+    conf = words["conf"]
+    box = words["box"]
+    means, mins, boxes = [], [], []
+    for start, count in zip(starts, counts):
+        span = conf[start:start + count]
+        means.append(sum(span) / count)
+        mins.append(min(span))
+        b = box[start * 4:(start + count) * 4]
+        boxes.extend((min(b[0::4]), min(b[1::4]), max(b[2::4]), max(b[3::4])))
+    lines.update({"mean_conf": means, "min_conf": mins, "box": boxes})
+    return lines
+
+
+def summarize(columns, threshold=REVIEW_THRESHOLD):
+    """Overall confidence (0-100, mean over words) and the lines needing review"""
+    conf = columns["words"]["conf"]
+    overall = (sum(conf) / len(conf) * 100) if conf else 0.0
+    review = [i for i, low in enumerate(columns["lines"]["min_conf"]) if low < threshold]
+    return round(overall, 1), review
+
+
+def _pack(values, typecode):
+    packed = array(typecode, values)
+    if sys.byteorder != 'little':
+        packed.byteswap()
+    return {"dtype": {'f': 'float32', 'i': 'int32'}[typecode], "b64": base64.b64encode(packed.tobytes()).decode()}
+
+
+def _unpack(column):
+    values = array({'float32': 'f', 'int32': 'i'}[column["dtype"]], base64.b64decode(column["b64"]))
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values.tolist()
+
+
+def encode(columns, packed=False, precision=3):
+    """
+    Make columns compact for transport.
+
+    Confidences are rounded to `precision` decimals. With packed=True every
+    numeric column becomes {"dtype", "b64"} over little-endian raw values.
+    """
+    out = {}
+    for level, table in columns.items():
+        encoded = {}
+        for name, values in table.items():
+            typecode = _TYPECODES.get(name)
+            if typecode is None:
+                encoded[name] = values
+            elif packed:
+                encoded[name] = _pack(values, typecode)
+            elif typecode == 'f':
+                encoded[name] = [round(v, precision) for v in values]
+            else:
+                encoded[name] = values
+        out[level] = encoded
+    return out
+
+
+def decode(encoded):
+    """Columns from encode() output, packed or not, with numeric columns as lists"""
+    return {level: {name: _unpack(values) if isinstance(values, dict) and "b64" in values else values
+                    for name, values in table.items()}
+            for level, table in encoded.items()}
@@ -0,0 +1,116 @@
+import net from 'net';
+
+// Client for the persistent Python helper worker (lib/python_worker.py).
+// Requests are multiplexed over one long-lived Unix socket connection using
+// the worker's JSON-lines protocol. When MEDFLOW_WORKER_SOCKET is unset or the
+// worker is unreachable, callPythonWorker resolves to null and callers fall
+// back to spawning the Python script directly.
+
+const SOCKET_PATH = process.env.MEDFLOW_WORKER_SOCKET;
+
+type Pending = {
+    resolve: (value: unknown) => void;
+    reject: (error: Error) => void;
+    timer: NodeJS.Timeout;
+};
+
+let connection: net.Socket | null = null;
+let connecting: Promise<net.Socket> | null = null;
+let nextId = 1;
+const pending = new Map<number, Pending>();
+
+function failPending(error: Error) {
+    for (const [id, request] of pending) {
+        clearTimeout(request.timer);
+        request.reject(error);
+        pending.delete(id);
+    }
+}
+
+function connect(socketPath: string): Promise<net.Socket> {
+    if (connection && !connection.destroyed) return Promise.resolve(connection);
+    if (connecting) return connecting;
+
+    connecting = new Promise<net.Socket>((resolve, reject) => {
+        const socket = net.createConnection(socketPath);
+        let buffer = '';
+
+        socket.setEncoding('utf8');
+        socket.once('connect', () => {
+            connection = socket;
+            connecting = null;
+            resolve(socket);
+        });
+        socket.on('data', (chunk: string) => {
+            buffer += chunk;
+            let newline;
+            while ((newline = buffer.indexOf('\n')) !== -1) {
+                const line = buffer.slice(0, newline);
+                buffer = buffer.slice(newline + 1);
+                if (!line.trim()) continue;
+                try {
+                    const response = JSON.parse(line);
+                    const request = pending.get(response.id);
+                    if (!request) continue;
+                    pending.delete(response.id);
+                    clearTimeout(request.timer);
+                    if (response.ok) {
+                        request.resolve(response.result);
+                    } else {
+                        request.reject(new Error(response.error || 'Python worker request failed'));
+                    }
+                } catch (e) {
+                    console.error('Invalid response from Python worker:', e);
+                }
+            }
+        });
+        socket.on('error', (err) => {
+            if (connecting) {
+                connecting = null;
+                reject(err);
+            }
+        });
+        socket.on('close', () => {
+            if (connection === socket) connection = null;
+            failPending(new Error('Python worker connection closed'));
+        });
+    });
+
+    return connecting;
+}
+
+// Environment for a script spawned as the fallback: without the socket, so the
+// script does the work itself instead of forwarding to the worker that just failed
+export function scriptEnv(): NodeJS.ProcessEnv {
+    const env = { ...process.env };
+    delete env.MEDFLOW_WORKER_SOCKET;
+    return env;
+}
+
+// Call an operation on the Python worker, e.g. callPythonWorker('aadhaar.decode', { qrPayload }).
+// Returns null when no worker is configured or reachable.
+export async function callPythonWorker<T = unknown>(
+    op: string,
+    params: Record<string, unknown>,
+    timeoutMs = 30000
+): Promise<T | null> {
+    if (!SOCKET_PATH) return null;
+
+    let socket: net.Socket;
+    try {
+        socket = await connect(SOCKET_PATH);
+    } catch {
+        return null;
+    }
+
+    const id = nextId++;
+    return new Promise<T>((resolve, reject) => {
+        const timer = setTimeout(() => {
+            pending.delete(id);
+            reject(new Error(`Python worker timed out on ${op}`));
+        }, timeoutMs);
+
+        pending.set(id, { resolve: resolve as (value: unknown) => void, reject, timer });
+        socket.write(JSON.stringify({ id, op, params }) + '\n');
+    });
+}
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+Persistent Python worker for the Aadhaar, barcode and OCR helpers
+
+Hosts decode_aadhaar.decode_payload, generate_barcode/validate_barcode and
+ocr_handwriting.OcrService in one long-running asyncio process, so API routes
+stop paying interpreter startup and import cost on every request.
+
+Protocol: JSON lines over a Unix socket, many requests per connection.
+    request:  {"id": 1, "op": "aadhaar.decode", "params": {"qrPayload": "..."}}
+    response: {"id": 1, "ok": true, "result": {...}}
+              {"id": 1, "ok": false, "error": "..."}
+
+Usage:
+    python3 lib/python_worker.py --socket /tmp/medflow-python-worker.sock
+    python3 lib/python_worker.py --health
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import signal
+import asyncio
+import argparse
+
+LIB_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, LIB_DIR)
+sys.path.insert(0, os.path.join(LIB_DIR, '..', 'scripts'))
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from result_cache import MemoryCache
+
+
+DEFAULT_SOCKET = '/tmp/medflow-python-worker.sock'
+SOCKET_ENV = 'MEDFLOW_WORKER_SOCKET'
+
+# OCR requests carry whole base64 images on one line
+MAX_LINE_BYTES = 64 * 1024 * 1024
+
+
+def _aadhaar_decode(params):
+    from decode_aadhaar import decode_payload, MAX_DECOMPRESSED_BYTES
+    return decode_payload(params.get('qrPayload', ''), params.get('fields'),
+                          int(params.get('max_output') or MAX_DECOMPRESSED_BYTES),
+                          verify=bool(params.get('verify')), cert_path=params.get('cert_path'))
+
+
+def _aadhaar_cache_key(params):
+    if params.get('verify'):
+        return None  # Verification outcomes are cached by the decode processes
+    from decode_aadhaar import cache_key, MAX_DECOMPRESSED_BYTES
+    if params.get('max_output') not in (None, MAX_DECOMPRESSED_BYTES):
+        return None  # A stricter limit must reject payloads a default-limit decode accepted
+    return cache_key(params.get('qrPayload', ''), params.get('fields'))
+
+
+def _barcode_generate(params):
+    from generate_barcode import generate_barcode, BarcodeBatch, index_records
+    lab_code = params.get('lab_code', 'LAB').upper()
+    if params.get('sequence') is None:
+        # Leased blocks save a SQLite round-trip per barcode; a restart only leaves a gap
+        from barcode_sequence import get_allocator
+        result = BarcodeBatch(allocator=get_allocator(block_size=16)).generate(
+            lab_code, params['patient_id'], params['test_code'])
+    else:
+        result = generate_barcode(
+            lab_code=lab_code,
+            patient_id=params['patient_id'],
+            test_code=params['test_code'],
+            sequence=int(params['sequence'])
+        )
+    if os.environ.get('BARCODE_INDEX_DIR'):
+        index_records([result])
+    return result
+
+
+def _barcode_validate(params):
+    from generate_barcode import validate_barcode
+    return {"barcode": params['barcode'], "is_valid": validate_barcode(params['barcode'])}
+
+
+_ocr_service = None
+
+
+async def _ocr_handwriting(params):
+    # Concurrent requests share pooled Vision clients and batched API calls
+    global _ocr_service
+    from ocr_handwriting import OcrService, default_cache
+    if _ocr_service is None:
+        _ocr_service = OcrService(cache=default_cache())
+    try:
+        return await _ocr_service.recognize(params.get('image', ''), params.get('preset'),
+                                            bool(params.get('bypass_cache')), bool(params.get('structured')),
+                                            bool(params.get('packed')))
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+# op -> (handler, where it runs, default concurrency limit)
+# 'process' is for CPU-bound work, 'thread' for blocking I/O, 'async' awaits a
+# coroutine handler on the event loop, None runs inline
+OPERATIONS = {
+    'aadhaar.decode': (_aadhaar_decode, 'process', 32),
+    'barcode.generate': (_barcode_generate, 'thread', 64),
+    'barcode.validate': (_barcode_validate, None, 64),
+    'ocr.handwriting': (_ocr_handwriting, 'async', 32),
+}
+
+# Operations whose successful {"success": true, "data": ...} results are kept
+# in the worker's in-memory LRU, keyed by a hash of the request (None skips it)
+CACHE_KEYS = {
+    'aadhaar.decode': _aadhaar_cache_key,
+}
+
+
+class PythonWorker:
+    """asyncio Unix socket server dispatching JSON-lines requests to OPERATIONS"""
+
+    def __init__(self, socket_path=DEFAULT_SOCKET, limits=None, workers=None, drain_timeout=30.0,
+                 cache=None):
+        self.socket_path = socket_path
+        self.limits = {op: spec[2] for op, spec in OPERATIONS.items()}
+        self.limits.update(limits or {})
+        self.workers = workers or os.cpu_count() or 1
+        self.drain_timeout = drain_timeout
+        self.cache = cache
+        self.started_at = time.time()
+        self.draining = False
+        self.in_flight = {op: 0 for op in OPERATIONS}
+        self.completed = 0
+        self._semaphores = {}
+        self._tasks = set()
+        self._server = None
+        self._stopped = None
+        self._pools = {}
+
+    def health(self):
+        return {
+            "status": "draining" if self.draining else "ok",
+            "pid": os.getpid(),
+            "uptime_s": round(time.time() - self.started_at, 1),
+            "in_flight": dict(self.in_flight),
+            "completed": self.completed,
+            "limits": dict(self.limits),
+            "cache": self.cache.stats() if self.cache is not None else None,
+        }
+
+    async def _run(self, op, params):
+        key = None
+        if self.cache is not None and op in CACHE_KEYS:
+            key = CACHE_KEYS[op](params)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return {"success": True, "data": cached, "cached": True}
+
+        result = await self._execute(op, params)
+
+        if key is not None and result.get('success'):
+            # Keep only the extracted fields, never raw parts of the payload
+            result['data'].pop('_raw_parts', None)
+            self.cache.set(key, result['data'])
+        return result
+
+    async def _execute(self, op, params):
+        handler, where, _ = OPERATIONS[op]
+        async with self._semaphores[op]:
+            self.in_flight[op] += 1
+            try:
+                if where is None:
+                    return handler(params)
+                if where == 'async':
+                    return await handler(params)
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self._pools[where], handler, params)
+            finally:
+                self.in_flight[op] -= 1
+                self.completed += 1
+
+    async def _dispatch(self, line, writer, write_lock):
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get('id')
+            op = request.get('op')
+            if op == 'health':
+                response = {"id": request_id, "ok": True, "result": self.health()}
+            elif op not in OPERATIONS:
+                response = {"id": request_id, "ok": False, "error": f"Unknown operation: {op}"}
+            elif self.draining:
+                response = {"id": request_id, "ok": False, "error": "Worker is draining"}
+            else:
+                result = await self._run(op, request.get('params') or {})
+                response = {"id": request_id, "ok": True, "result": result}
+        except Exception as e:
+            response = {"id": request_id, "ok": False, "error": str(e)}
+
+        async with write_lock:
+            writer.write((json.dumps(response, separators=(',', ':')) + '\n').encode())
+            await writer.drain()
+
+    async def _handle_client(self, reader, writer):
+        write_lock = asyncio.Lock()
+        tasks = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                task = asyncio.create_task(self._dispatch(line, writer, write_lock))
+                for group in (tasks, self._tasks):
+                    group.add(task)
+                    task.add_done_callback(group.discard)
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            # Let this connection's requests finish before closing it
+            if tasks:
+                await asyncio.wait(list(tasks))
+            writer.close()
+
+    def _remove_stale_socket(self):
+        if not os.path.exists(self.socket_path):
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.socket_path)
+        except OSError:
+            os.unlink(self.socket_path)
+        else:
+            raise RuntimeError(f"A worker is already listening on {self.socket_path}")
+        finally:
+            probe.close()
+
+    def begin_drain(self):
+        """Stop accepting connections and shut down once in-flight work is done"""
+        if self.draining:
+            return
+        self.draining = True
+        if self._server is not None:
+            self._server.close()
+        self._stopped.set()
+
+    async def serve(self):
+        loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+        self._semaphores = {op: asyncio.Semaphore(limit) for op, limit in self.limits.items()}
+        thread_limits = [self.limits[op] for op, spec in OPERATIONS.items() if spec[1] == 'thread']
+        self._pools = {
+            'process': ProcessPoolExecutor(max_workers=self.workers),
+            'thread': ThreadPoolExecutor(max_workers=max(thread_limits or [1])),
+        }
+
+        self._remove_stale_socket()
+        self._server = await asyncio.start_unix_server(
+            self._handle_client, path=self.socket_path, limit=MAX_LINE_BYTES
+        )
+        os.chmod(self.socket_path, 0o660)
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, self.begin_drain)
+
+        sys.stderr.write(json.dumps({"listening": self.socket_path, "pid": os.getpid()}) + '\n')
+        await self._stopped.wait()
+
+        # Graceful drain: finish accepted requests, then release the pools
+        pending = [t for t in self._tasks if not t.done()]
+        if pending:
+            await asyncio.wait(pending, timeout=self.drain_timeout)
+        for pool in self._pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        sys.stderr.write(json.dumps({"stopped": True, "completed": self.completed}) + '\n')
+
+
+def call(op, params=None, socket_path=None, timeout=30.0):
+    """
+    Send one request to a running worker and return its result.
+
+    Raises:
+        OSError: If no worker is reachable on the socket
+        RuntimeError: If the worker reports an error for the request (e.g. while draining)
+        ValueError: If the reply is not valid JSON, e.g. cut short
+    """
+    socket_path = socket_path or os.environ.get(SOCKET_ENV) or DEFAULT_SOCKET
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+        conn.settimeout(timeout)
+        conn.connect(socket_path)
+        conn.sendall((json.dumps({"id": 1, "op": op, "params": params or {}}) + '\n').encode())
+        with conn.makefile('rb') as stream:
+            line = stream.readline(MAX_LINE_BYTES)
+    if not line:
+        raise ConnectionError("Worker closed the connection")
+    response = json.loads(line)
+    if not response.get('ok'):
+        raise RuntimeError(response.get('error', 'Worker request failed'))
+    return response['result']
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the persistent Python helper worker')
+    parser.add_argument('--socket', '-s', default=os.environ.get(SOCKET_ENV, DEFAULT_SOCKET),
+                        help='Unix socket path')
+    parser.add_argument('--workers', '-w', type=int, help='Processes for CPU-bound work (defaults to CPU count)')
+    parser.add_argument('--limit', action='append', default=[], metavar='OP=N',
+                        help='Concurrency limit for an operation, e.g. ocr.handwriting=4')
+    parser.add_argument('--drain-timeout', type=float, default=30.0,
+                        help='Seconds to wait for in-flight requests on shutdown')
+    parser.add_argument('--cache-size', type=int, default=4096,
+                        help='Entries in the in-memory result cache (0 disables it)')
+    parser.add_argument('--cache-ttl', type=float, default=12 * 60 * 60, help='Cache entry lifetime in seconds')
+    parser.add_argument('--health', action='store_true', help='Query a running worker and exit')
+
+    args = parser.parse_args()
+
+    if args.health:
+        try:
+            print(json.dumps(call('health', socket_path=args.socket, timeout=5.0)))
+            return 0
+        except (OSError, RuntimeError) as e:
+            print(json.dumps({"status": "down", "error": str(e)}))
+            return 1
+
+    limits = {}
+    for spec in args.limit:
+        op, _, value = spec.partition('=')
+        if op not in OPERATIONS or not value.isdigit():
+            parser.error(f"Invalid --limit {spec!r}")
+        limits[op] = int(value)
+
+    cache = MemoryCache(args.cache_size, args.cache_ttl) if args.cache_size > 0 else None
+    worker = PythonWorker(args.socket, limits, args.workers, args.drain_timeout, cache)
+    asyncio.run(worker.serve())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
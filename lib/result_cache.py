@@ -0,0 +1,218 @@
+"""
+Result caches for the Python helpers
+
+MemoryCache is an in-process LRU for long-lived processes such as the Python
+worker. SqliteCache persists results between CLI invocations. TieredCache
+puts a MemoryCache in front of a SqliteCache for microsecond hits. All expire
+entries after a TTL, evict the least recently used entries beyond
+max_entries and count hits and misses. Values must be JSON-serialisable.
+"""
+
+import os
+import json
+import time
+import atexit
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+def content_key(*parts) -> str:
+    """SHA-256 hex digest over the given str/bytes parts (length-prefixed)"""
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode()
+        digest.update(len(part).to_bytes(8, 'big'))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+def _stats(hits: int, misses: int, entries: int) -> dict:
+    lookups = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "entries": entries,
+        "hit_rate": round(hits / lookups, 4) if lookups else None,
+    }
+
+
+def stats_delta(before: dict, after: dict) -> dict:
+    """Hits and misses counted between two stats() snapshots; entries is taken from after"""
+    return _stats(after["hits"] - before["hits"], after["misses"] - before["misses"], after["entries"])
+
+
+class MemoryCache:
+    """Thread-safe in-memory LRU cache with a per-entry TTL"""
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        """Return the cached value, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return _stats(self.hits, self.misses, len(self._entries))
+
+
+class SqliteCache:
+    """
+    On-disk cache in a SQLite file, safe to share between processes.
+
+    Hit and miss counters are stored alongside the entries, so stats() covers
+    every process that used the file, not just this one. So that a hit stays a
+    plain read, counters and access times are kept in memory and written in one
+    transaction every flush_interval seconds, on set(), stats() and close().
+    """
+
+    def __init__(self, path: str, max_entries: int = 10000, ttl: float = 86400.0, flush_interval: float = 5.0):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=10.0, isolation_level=None, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._pending = {'hits': 0, 'misses': 0}
+        self._touched = {}  # key -> last access time not yet written
+        self._flushed_at = time.monotonic()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+                " expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed_at)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        # Long-lived processes exit without calling close(); don't lose their counts
+        atexit.register(self.flush)
+
+    def _flush_locked(self) -> None:
+        if self._conn is None or not (self._pending['hits'] or self._pending['misses'] or self._touched):
+            return
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.executemany(
+                "INSERT INTO counters (name, value) VALUES (?, ?)"
+                " ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                [(name, count) for name, count in self._pending.items() if count]
+            )
+            self._conn.executemany(
+                "UPDATE cache SET accessed_at = MAX(accessed_at, ?) WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in self._touched.items()]
+            )
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._pending = {'hits': 0, 'misses': 0}
+        self._touched = {}
+        self._flushed_at = time.monotonic()
+
+    def flush(self) -> None:
+        """Write buffered hit/miss counters and access times to the file"""
+        with self._lock:
+            self._flush_locked()
+
+    def get(self, key: str):
+        """Return the cached value, or None on a miss"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None or row[1] < now:
+                if row is not None:
+                    self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self._pending['misses'] += 1
+            else:
+                self._touched[key] = now
+                self._pending['hits'] += 1
+            if time.monotonic() - self._flushed_at >= self.flush_interval:
+                self._flush_locked()
+        return None if row is None or row[1] < now else json.loads(row[0])
+
+    def set(self, key: str, value) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now + self.ttl, now)
+            )
+            self._touched.pop(key, None)
+            self._flush_locked()  # Writing anyway; apply pending access times before evicting
+            self._conn.execute("DELETE FROM cache WHERE expires_at < ?", (now,))
+            excess = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0] - self.max_entries
+            if excess > 0:
+                self._conn.execute(
+                    "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed_at LIMIT ?)",
+                    (excess,)
+                )
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._flush_locked()
+            counters = dict(self._conn.execute("SELECT name, value FROM counters").fetchall())
+            entries = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        return _stats(counters.get('hits', 0), counters.get('misses', 0), entries)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is None:
+                return
+            self._flush_locked()
+            self._conn.close()
+            self._conn = None
+        atexit.unregister(self.flush)
+
+
+class TieredCache:
+    """A small in-memory LRU in front of a slower shared cache"""
+
+    def __init__(self, front, back):
+        self.front = front
+        self.back = back
+
+    def get(self, key: str):
+        """Return the cached value, or None on a miss; back hits are promoted"""
+        value = self.front.get(key)
+        if value is None:
+            value = self.back.get(key)
+            if value is not None:
+                self.front.set(key, value)
+        return value
+
+    def set(self, key: str, value) -> None:
+        self.front.set(key, value)
+        self.back.set(key, value)
+
+    def stats(self) -> dict:
+        return {"memory": self.front.stats(), "disk": self.back.stats()}
+
+    def close(self) -> None:
+        self.back.close()
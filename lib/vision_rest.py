@@ -0,0 +1,136 @@
+"""
+Minimal REST client for the Vision images:annotate endpoint
+
+Used when VISION_API_ENDPOINT points ocr_handwriting.py at a local stand-in
+(scripts/vision_stub.py) and google-cloud-vision is not installed. It offers
+the two ImageAnnotatorClient methods the OCR code calls and returns objects
+shaped like the SDK's messages: snake_case attributes, proto3 defaults for
+missing fields and detected_break.type_.
+"""
+
+import re
+import json
+import base64
+import socket
+import threading
+import http.client
+from urllib.parse import urlsplit
+
+from ocr_resilience import BackendError, DeadlineExceededError
+
+
+# HTTP status -> gRPC status name, for errors without a "status" field
+_HTTP_STATUS = {
+    400: 'INVALID_ARGUMENT', 401: 'UNAUTHENTICATED', 403: 'PERMISSION_DENIED', 404: 'NOT_FOUND',
+    429: 'RESOURCE_EXHAUSTED', 500: 'INTERNAL', 503: 'UNAVAILABLE', 504: 'DEADLINE_EXCEEDED',
+}
+
+# proto3 omits zero values, empty strings and empty lists from JSON
+_LIST_FIELDS = frozenset(['responses', 'pages', 'blocks', 'paragraphs', 'words', 'symbols', 'vertices'])
+_TEXT_FIELDS = frozenset(['text', 'message'])
+
+# REST JSON spells enums by name; the OCR code compares DetectedBreak.BreakType numbers
+_BREAK_TYPES = {'UNKNOWN': 0, 'SPACE': 1, 'SURE_SPACE': 2, 'EOL_SURE_SPACE': 3, 'HYPHEN': 4, 'LINE_BREAK': 5}
+
+_CAMEL = re.compile(r'(?<!^)(?=[A-Z])')
+
+
+class Message:
+    """Attribute view of a JSON message that answers missing fields with proto3 defaults"""
+
+    def __init__(self, fields):
+        self.__dict__.update(fields)
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        if name in _LIST_FIELDS:
+            return []
+        if name in _TEXT_FIELDS:
+            return ''
+        if name in ('error', 'full_text_annotation', 'property', 'detected_break', 'bounding_box'):
+            return _EMPTY
+        return 0
+
+
+_EMPTY = Message({})
+
+
+def to_message(value):
+    """Convert decoded JSON (camelCase) into Message objects (snake_case)"""
+    if isinstance(value, dict):
+        fields = {}
+        for key, item in value.items():
+            name = _CAMEL.sub('_', key).lower()
+            if name == 'type':
+                name = 'type_'
+                item = _BREAK_TYPES.get(item, item)
+            fields[name] = to_message(item)
+        return Message(fields)
+    if isinstance(value, list):
+        return [to_message(item) for item in value]
+    return value
+
+
+def _image_content(image):
+    """Raw bytes from bytes or an SDK vision.Image"""
+    return image if isinstance(image, (bytes, bytearray)) else image.content
+
+
+class RestVisionClient:
+    """Keep-alive HTTP client for POST {endpoint}/v1/images:annotate, one connection per thread"""
+
+    def __init__(self, endpoint):
+        parts = urlsplit(endpoint if '://' in endpoint else f"https://{endpoint}")
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port
+        self.path = (parts.path.rstrip('/') or '') + '/v1/images:annotate'
+        self._local = threading.local()
+
+    def _connection(self, timeout):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            cls = http.client.HTTPSConnection if self.scheme == 'https' else http.client.HTTPConnection
+            conn = cls(self.host, self.port)
+            self._local.conn = conn
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+        return conn
+
+    def annotate(self, images, timeout=None):
+        body = json.dumps({"requests": [
+            {"image": {"content": base64.b64encode(_image_content(image)).decode()},
+             "features": [{"type": "DOCUMENT_TEXT_DETECTION"}]}
+            for image in images
+        ]})
+        conn = self._connection(timeout)
+        try:
+            conn.request('POST', self.path, body, {"Content-Type": "application/json"})
+            response = conn.getresponse()
+            payload = response.read()
+        except socket.timeout:
+            conn.close()
+            self._local.conn = None
+            raise DeadlineExceededError()
+        except (OSError, http.client.HTTPException) as e:
+            conn.close()
+            self._local.conn = None
+            raise BackendError('UNAVAILABLE', str(e))
+
+        if response.status != 200:
+            try:
+                error = json.loads(payload).get('error', {})
+            except ValueError:
+                error = {}
+            status = error.get('status') or _HTTP_STATUS.get(response.status, 'UNKNOWN')
+            raise BackendError(status, error.get('message', f"HTTP {response.status}"))
+        return to_message(json.loads(payload))
+
+    def document_text_detection(self, image=None, timeout=None, retry=None, **kwargs):
+        return self.annotate([image], timeout).responses[0]
+
+    def batch_annotate_images(self, requests=(), timeout=None, retry=None, **kwargs):
+        images = [request if isinstance(request, (bytes, bytearray)) else request.image for request in requests]
+        return self.annotate(images, timeout)
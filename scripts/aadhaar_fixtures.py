@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Synthetic Aadhaar Secure QR fixtures
+
+Builds Secure QR V2-like payloads: the text fields joined by 0xFF, a fake
+JPEG2000 photo of configurable size, optional email/mobile hashes and a
+trailing 256-byte signature, compressed with gzip or zlib and encoded as a
+base-10 string. Layout variants and corrupt inputs exercise the decoder's
+fallback and error paths. With the 'cryptography' package the signature can
+be made with a locally generated key pair for --verify runs.
+
+Usage:
+    python3 scripts/aadhaar_fixtures.py --count 100 > payloads.txt
+    python3 scripts/aadhaar_fixtures.py --layout shuffled --photo-bytes 4000 --jsonl
+    python3 scripts/aadhaar_fixtures.py --sign-key-out /tmp/qr_pub.pem --count 10
+"""
+
+import sys
+import gzip
+import zlib
+import json
+import random
+import hashlib
+import argparse
+from contextlib import contextmanager
+
+try:
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa, padding
+except ImportError:  # Only needed for signed fixtures
+    rsa = None
+
+LAYOUTS = ['v2', 'v2-legacy', 'shuffled', 'truncated']
+CORRUPTIONS = ['non-digit', 'empty', 'bad-gzip', 'truncated-stream', 'oversized']
+COMPRESSIONS = ['gzip', 'zlib', 'raw']
+
+# JPEG2000 signature box, so the photo segment looks like the real thing
+JP2_HEADER = b'\x00\x00\x00\x0cjP  \r\n\x87\n'
+
+NAMES = ['Ravi Kumar', 'Priya Sharma', 'Anil Verma', 'Sunita Devi', 'Mohammed Irfan', 'Lakshmi Iyer']
+PLACES = [
+    ('Pune', 'Maharashtra', '411038'),
+    ('Lucknow', 'Uttar Pradesh', '226001'),
+    ('Chennai', 'Tamil Nadu', '600004'),
+    ('Patna', 'Bihar', '800001'),
+]
+
+
+@contextmanager
+def _unlimited_int_digits():
+    """Lift the 3.11+ int/str conversion limit while building payloads, and only then"""
+    if not hasattr(sys, 'get_int_max_str_digits'):
+        yield
+        return
+    previous = sys.get_int_max_str_digits()
+    sys.set_int_max_str_digits(0)
+    try:
+        yield
+    finally:
+        sys.set_int_max_str_digits(previous)
+
+
+def _digits(data: bytes) -> str:
+    """Bytes as the decimal string a Secure QR carries"""
+    with _unlimited_int_digits():
+        return str(int.from_bytes(data, 'big'))
+
+
+def sample_fields(rng: random.Random) -> list:
+    """The 16 text fields in decoder (v2) order"""
+    city, state, pincode = rng.choice(PLACES)
+    return [
+        str(rng.randint(0, 3)),                                  # 0: email/mobile flags
+        ''.join(rng.choice('0123456789') for _ in range(12)),   # 1: reference ID
+        rng.choice(NAMES),                                       # 2: name
+        f"{rng.randint(1, 28):02d}-{rng.randint(1, 12):02d}-{rng.randint(1940, 2015)}",  # 3: DOB
+        rng.choice(['M', 'F', 'T']),                             # 4: gender
+        f"S/O {rng.choice(NAMES)}",                              # 5: care of
+        city,                                                    # 6: district
+        'Near Temple',                                           # 7: landmark
+        str(rng.randint(1, 999)),                                # 8: house
+        'Main Road',                                             # 9: location
+        pincode,                                                 # 10: pincode
+        city,                                                    # 11: post office
+        state,                                                   # 12: state
+        'MG Road',                                               # 13: street
+        city,                                                    # 14: sub district
+        city,                                                    # 15: VTC
+    ]
+
+
+def arrange(fields: list, layout: str, rng: random.Random) -> list:
+    """Reorder the text fields for a layout variant"""
+    if layout == 'v2':
+        return list(fields)
+    if layout == 'v2-legacy':
+        # Reference ID after the address, its old slot left empty
+        return [fields[0], ''] + fields[2:] + [fields[1]]
+    if layout == 'shuffled':
+        shuffled = list(fields)
+        rng.shuffle(shuffled)
+        return shuffled
+    if layout == 'truncated':
+        return fields[:rng.randint(3, 10)]
+    raise ValueError(f"Unknown layout: {layout}")
+
+
+def generate_key():
+    """Locally generated RSA-2048 key pair for signed fixtures"""
+    if rsa is None:
+        raise RuntimeError("Signed fixtures need the 'cryptography' package")
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+def public_key_pem(private_key) -> bytes:
+    return private_key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+
+
+def build_raw(fields: list, photo_bytes: int, rng: random.Random, private_key=None) -> bytes:
+    """Decompressed Secure QR data: fields, photo, contact hashes and signature"""
+    photo = JP2_HEADER + rng.randbytes(max(photo_bytes - len(JP2_HEADER), 0))
+    body = b'\xff'.join(f.encode() for f in fields) + b'\xff' + photo
+
+    flags = fields[0] if fields and fields[0] in ('0', '1', '2', '3') else '0'
+    if int(flags) & 1:
+        body += hashlib.sha256(b'patient@example.com').digest()
+    if int(flags) & 2:
+        body += hashlib.sha256(b'9876543210').digest()
+
+    if private_key is not None:
+        signature = private_key.sign(body, padding.PKCS1v15(), hashes.SHA256())
+    else:
+        signature = rng.randbytes(256)
+    return body + signature
+
+
+def encode(raw: bytes, compression: str = 'gzip') -> str:
+    """Compress and encode decompressed data as a Secure QR decimal string"""
+    if compression == 'gzip':
+        data = gzip.compress(raw)
+    elif compression == 'zlib':
+        data = zlib.compress(raw)
+    elif compression == 'raw':
+        # A leading zero byte would vanish in the integer round trip
+        data = raw if raw[:1] != b'\x00' else b'\x01' + raw
+    else:
+        raise ValueError(f"Unknown compression: {compression}")
+    return _digits(data)
+
+
+def corrupt(kind: str, rng: random.Random) -> str:
+    """A payload that should fail (or be rejected) cleanly"""
+    if kind == 'non-digit':
+        return encode(build_raw(sample_fields(rng), 500, rng))[:200] + 'ABC'
+    if kind == 'empty':
+        return ''
+    if kind == 'bad-gzip':
+        return _digits(b'\x1f\x8b\x08\x00' + rng.randbytes(600))
+    if kind == 'truncated-stream':
+        data = gzip.compress(build_raw(sample_fields(rng), 2000, rng))
+        return _digits(data[:len(data) // 2])
+    if kind == 'oversized':
+        # Decompression bomb: tiny payload, megabytes of output
+        return _digits(gzip.compress(b'\xff' * 16 + b'\x00' * (8 * 1024 * 1024)))
+    raise ValueError(f"Unknown corruption: {kind}")
+
+
+def build_payload(layout: str = 'v2', photo_bytes: int = 2000, compression: str = 'gzip',
+                  seed: int = 0, private_key=None) -> str:
+    """One synthetic Secure QR payload as a decimal string"""
+    rng = random.Random(seed)
+    fields = arrange(sample_fields(rng), layout, rng)
+    return encode(build_raw(fields, photo_bytes, rng, private_key), compression)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate synthetic Aadhaar Secure QR payloads')
+    parser.add_argument('--count', '-n', type=int, default=1, help='Number of payloads')
+    parser.add_argument('--layout', '-l', choices=LAYOUTS, default='v2', help='Field layout variant')
+    parser.add_argument('--photo-bytes', '-p', type=int, default=2000, help='Size of the fake photo')
+    parser.add_argument('--compression', '-c', choices=COMPRESSIONS, default='gzip')
+    parser.add_argument('--corrupt', choices=CORRUPTIONS, help='Emit corrupt payloads of this kind')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the first payload')
+    parser.add_argument('--sign-key-out', help='Sign with a fresh key pair and write its public key (PEM) here')
+    parser.add_argument('--jsonl', action='store_true', help='Emit {"id", "payload"} JSON lines')
+
+    args = parser.parse_args()
+
+    private_key = None
+    if args.sign_key_out:
+        private_key = generate_key()
+        with open(args.sign_key_out, 'wb') as f:
+            f.write(public_key_pem(private_key))
+
+    for i in range(args.count):
+        seed = args.seed + i
+        if args.corrupt:
+            payload = corrupt(args.corrupt, random.Random(seed))
+        else:
+            payload = build_payload(args.layout, args.photo_bytes, args.compression, seed, private_key)
+        if args.jsonl:
+            print(json.dumps({"id": f"fixture-{seed}", "payload": payload}))
+        else:
+            print(payload)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
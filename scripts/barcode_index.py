@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""
+Index of issued lab barcodes
+
+Every barcode generate_barcode.py issues with --index (or $BARCODE_INDEX_DIR)
+is stored as a fixed-width 32-byte record - lab code, date, sequence, time,
+patient, test code, check digit and verification hash - so questions such as
+"which LAB tubes were issued on 261017 with sequences 100-250" and "which
+sequences are missing" are answered without touching the database.
+
+Two files live in the index directory:
+    issued.idx  records sorted by (lab, date, sequence), memory-mapped for
+                reads and searched by bisection
+    issued.log  new records appended in issue order; once it holds
+                COMPACT_EVERY records it is merged into issued.idx, which is
+                rewritten and atomically replaced
+
+Writers serialize on an flock; readers pick up appends and compactions on
+their next query. Readers take no lock: a refresh that raced a compaction
+re-reads until the sorted file stays put, and ignores a log whose records
+the sorted file already holds (it is about to be truncated).
+
+Usage:
+    python3 scripts/barcode_index.py --range LAB:261017 --from 100 --to 250
+    python3 scripts/barcode_index.py --prefix LAB-26101708
+    python3 scripts/barcode_index.py --gaps LAB:261017
+    python3 scripts/barcode_index.py --get LAB-261017083012-123456-CBC-0042-7
+    python3 scripts/generate_barcode.py --bulk < orders.jsonl | python3 scripts/barcode_index.py --add
+"""
+
+import os
+import sys
+import json
+import mmap
+import fcntl
+import struct
+import heapq
+import bisect
+import argparse
+from contextlib import contextmanager
+from collections import namedtuple
+
+DEFAULT_DIR = os.environ.get('BARCODE_INDEX_DIR') or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'barcode_index')
+
+# lab, date (YYMMDD), sequence, time (HHMMSS), patient, test, check digit, pad, verification hash
+RECORD = struct.Struct('<4sIIII4s1s3xI')
+HEADER = struct.Struct('<4sHHQ')  # magic, version, record size, record count
+MAGIC = b'MFBI'
+VERSION = 1
+
+# Log records merged into the sorted file at a time
+COMPACT_EVERY = 4096
+
+Issued = namedtuple('Issued', 'lab_code date sequence time patient_id test_code check_digit verification_hash')
+
+
+def parse_barcode(barcode: str):
+    """
+    Split a LAB-YYMMDDHHMMSS-PPPPPP-TEST-SEQ-C barcode into components.
+
+    Returns:
+        Issued with date, time, patient_id and sequence as ints (hash 0), or
+        None when the barcode does not have that shape
+    """
+    parts = barcode.split('-')
+    if len(parts) != 6:
+        return None
+    lab, stamp, patient, test, sequence, check = parts
+    if (len(stamp) != 12 or not stamp.isdigit() or not patient.isdigit() or not sequence.isdigit()
+            or len(check) != 1 or not 0 < len(lab) <= 4 or not 0 < len(test) <= 4
+            or not (lab + test).isascii()):
+        return None
+    return Issued(lab, int(stamp[:6]), int(sequence), int(stamp[6:]), int(patient), test, check, 0)
+
+
+def format_barcode(record: Issued) -> str:
+    return (f"{record.lab_code}-{record.date:06d}{record.time:06d}-{record.patient_id:06d}-"
+            f"{record.test_code}-{record.sequence:04d}-{record.check_digit}")
+
+
+def _pack(record: Issued) -> bytes:
+    return RECORD.pack(record.lab_code.encode(), record.date, record.sequence, record.time, record.patient_id,
+                       record.test_code.encode(), record.check_digit.encode(), record.verification_hash)
+
+
+def _unpack(buffer, offset: int) -> Issued:
+    lab, date, sequence, time, patient, test, check, vhash = RECORD.unpack_from(buffer, offset)
+    return Issued(lab.rstrip(b'\0').decode(), date, sequence, time, patient, test.rstrip(b'\0').decode(),
+                  check.decode(), vhash)
+
+
+def _sort_key(record: Issued):
+    return (record.lab_code, record.date, record.sequence)
+
+
+class _Keys:
+    """Sequence view of the (lab, date, sequence) keys in a mapped file, for bisect"""
+
+    def __init__(self, buffer, count):
+        self._buffer = buffer
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, i):
+        lab, date, sequence = struct.unpack_from('<4sII', self._buffer, HEADER.size + i * RECORD.size)
+        return (lab.rstrip(b'\0').decode(), date, sequence)
+
+
+class BarcodeIndex:
+    """Sorted, memory-mapped index of issued barcodes plus an append log"""
+
+    def __init__(self, directory: str = DEFAULT_DIR, compact_every: int = COMPACT_EVERY):
+        self.directory = directory
+        self.compact_every = compact_every
+        self.idx_path = os.path.join(directory, 'issued.idx')
+        self.log_path = os.path.join(directory, 'issued.log')
+        self._lock_path = os.path.join(directory, 'issued.lock')
+        os.makedirs(directory, exist_ok=True)
+        self._map = None
+        self._count = 0
+        self._idx_id = None
+        self._log_size = -1
+        self._log = []
+        self._log_keys = []
+        with self._locked():
+            if not os.path.exists(self.idx_path):
+                self._write_sorted([], 0)
+
+    @contextmanager
+    def _locked(self):
+        """Exclusive lock shared by every writer of this directory"""
+        with open(self._lock_path, 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _write_sorted(self, records, count):
+        tmp = self.idx_path + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, RECORD.size, count))
+            for record in records:
+                f.write(_pack(record))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.idx_path)
+
+    def refresh(self) -> None:
+        """Re-map the sorted file after a compaction and reload new log records"""
+        while True:
+            stat = os.stat(self.idx_path)
+            if (stat.st_ino, stat.st_mtime_ns) != self._idx_id:
+                with open(self.idx_path, 'rb') as f:
+                    mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                magic, version, size, count = HEADER.unpack_from(mapped, 0)
+                if magic != MAGIC or version != VERSION or size != RECORD.size:
+                    mapped.close()
+                    raise ValueError(f"{self.idx_path} is not a version {VERSION} barcode index")
+                if self._map is not None:
+                    self._map.close()
+                self._map, self._count = mapped, count
+                self._idx_id = (stat.st_ino, stat.st_mtime_ns)
+                self._log_size = -1
+
+            try:
+                log_size = os.path.getsize(self.log_path)
+            except FileNotFoundError:
+                log_size = 0
+            log_size -= log_size % RECORD.size  # Ignore a record still being written
+            if log_size != self._log_size:
+                records = []
+                if log_size:
+                    with open(self.log_path, 'rb') as f:
+                        data = f.read(log_size)  # Short if a compaction truncated it meanwhile
+                    records = [_unpack(data, offset)
+                               for offset in range(0, len(data) - len(data) % RECORD.size, RECORD.size)]
+                if records and self._absorbed(records):
+                    # Compacted into the file mapped above but not truncated yet; look again next time
+                    records, log_size = [], -1
+                records.sort(key=_sort_key)
+                self._log = records
+                self._log_keys = [_sort_key(r) for r in records]
+                self._log_size = log_size
+
+            # A compaction between mapping and reading the log may have emptied it
+            stat = os.stat(self.idx_path)
+            if (stat.st_ino, stat.st_mtime_ns) == self._idx_id:
+                return
+
+    def _absorbed(self, records) -> bool:
+        """
+        True if every record, in log order, is already in the mapped file.
+
+        A log that has been merged is wholly contained in the sorted file, and
+        otherwise its first record normally is not, so this usually stops
+        after one lookup.
+        """
+        keys = _Keys(self._map, self._count)
+        for record in records:
+            key = _sort_key(record)
+            i = bisect.bisect_left(keys, key)
+            while i < self._count and keys[i] == key:
+                if _unpack(self._map, HEADER.size + i * RECORD.size) == record:
+                    break
+                i += 1
+            else:
+                return False
+        return True
+
+    def add(self, records) -> int:
+        """
+        Append issued barcodes (barcode strings, generate_barcode() records or Issued).
+
+        Returns:
+            Number of records added; unparseable barcodes are skipped
+        """
+        packed = []
+        for record in records:
+            issued = self._coerce(record)
+            if issued is not None:
+                packed.append(_pack(issued))
+        if not packed:
+            return 0
+        with self._locked():
+            with open(self.log_path, 'ab') as f:
+                f.write(b''.join(packed))
+            if os.path.getsize(self.log_path) // RECORD.size >= self.compact_every:
+                self._compact_locked()
+        return len(packed)
+
+    @staticmethod
+    def _coerce(record):
+        if isinstance(record, Issued):
+            return record
+        if isinstance(record, dict):
+            issued = parse_barcode(record.get("barcode", ""))
+            vhash = record.get("verification_hash")
+            if issued is not None and vhash:
+                try:
+                    issued = issued._replace(verification_hash=int(vhash, 16))
+                except ValueError:
+                    pass
+            return issued
+        return parse_barcode(str(record))
+
+    def compact(self) -> int:
+        """Merge the log into the sorted file; returns the total record count"""
+        with self._locked():
+            return self._compact_locked()
+
+    def _compact_locked(self):
+        self.refresh()
+        total = self._count + len(self._log)
+        # Both runs are sorted; stream the merge instead of loading the file
+        self._write_sorted(heapq.merge(self._iter_sorted(0, self._count), self._log, key=_sort_key), total)
+        open(self.log_path, 'wb').close()
+        self.refresh()
+        return total
+
+    def _iter_sorted(self, start, stop):
+        for i in range(start, stop):
+            yield _unpack(self._map, HEADER.size + i * RECORD.size)
+
+    def __len__(self):
+        self.refresh()
+        return self._count + len(self._log)
+
+    def range(self, lab_code: str, date_from: int, date_to: int = None, seq_from: int = 0,
+              seq_to: int = 2 ** 32 - 1) -> list:
+        """
+        Issued records for lab_code with date in [date_from, date_to] and, on
+        each date, sequence in [seq_from, seq_to], sorted by (date, sequence).
+        """
+        self.refresh()
+        date_to = date_from if date_to is None else date_to
+        low, high = (lab_code, date_from, seq_from), (lab_code, date_to, seq_to)
+        keys = _Keys(self._map, self._count)
+        start, stop = bisect.bisect_left(keys, low), bisect.bisect_right(keys, high)
+        found = [r for r in self._iter_sorted(start, stop) if seq_from <= r.sequence <= seq_to]
+
+        fresh = self._log[bisect.bisect_left(self._log_keys, low):bisect.bisect_right(self._log_keys, high)]
+        if fresh:
+            found.extend(r for r in fresh if seq_from <= r.sequence <= seq_to)
+            found.sort(key=_sort_key)
+        return found
+
+    def prefix(self, prefix: str) -> list:
+        """Issued barcodes starting with prefix, which must include the lab code and '-'"""
+        lab, sep, rest = prefix.partition('-')
+        if not sep:
+            raise ValueError("Prefix must include the lab code and '-', e.g. LAB-2610")
+        digits = rest[:6]
+        if not digits.isdigit() and digits:
+            return []
+        # Date digits given so far bound the date range, e.g. '2610' -> 261000-261099
+        pad = 6 - len(digits)
+        date_from = int(digits + '0' * pad) if digits else 0
+        date_to = int(digits + '9' * pad) if digits else 999999
+        return [r for r in self.range(lab, date_from, date_to) if format_barcode(r).startswith(prefix)]
+
+    def get(self, barcode: str):
+        """The indexed record for barcode, or None"""
+        issued = parse_barcode(barcode)
+        if issued is None:
+            return None
+        for record in self.range(issued.lab_code, issued.date, seq_from=issued.sequence, seq_to=issued.sequence):
+            if format_barcode(record) == barcode:
+                return record
+        return None
+
+    def gaps(self, lab_code: str, date: int, seq_from: int = 1, seq_to: int = None) -> list:
+        """
+        Sequence ranges never issued for lab_code on date, between seq_from and
+        seq_to (default: the highest issued). Leased-but-unused allocator
+        blocks also show up here.
+
+        Returns:
+            List of (first missing, last missing) pairs
+        """
+        issued = sorted({r.sequence for r in self.range(lab_code, date, seq_from=seq_from,
+                                                        seq_to=seq_to if seq_to is not None else 2 ** 32 - 1)})
+        if seq_to is None:
+            seq_to = issued[-1] if issued else seq_from - 1
+        missing = []
+        expected = seq_from
+        for sequence in issued + [seq_to + 1]:
+            if sequence > expected:
+                missing.append((expected, min(sequence - 1, seq_to)))
+            expected = max(expected, sequence + 1)
+        return missing
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+
+def _lab_date(value):
+    lab, _, date = value.partition(':')
+    if not date.isdigit() or len(date) != 6:
+        raise ValueError(f"Expected LAB:YYMMDD, got {value}")
+    return lab.upper(), int(date)
+
+
+def _record_json(record):
+    return {"barcode": format_barcode(record), **record._asdict()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Query or update the issued-barcode index')
+    parser.add_argument('--dir', default=DEFAULT_DIR, help='Index directory (default: $BARCODE_INDEX_DIR or data/)')
+    parser.add_argument('--range', metavar='LAB:YYMMDD', help='Records issued for a lab on a date')
+    parser.add_argument('--from', dest='seq_from', type=int, default=0, help='First sequence for --range')
+    parser.add_argument('--to', dest='seq_to', type=int, help='Last sequence for --range/--gaps')
+    parser.add_argument('--prefix', help='Records whose barcode starts with this prefix')
+    parser.add_argument('--gaps', metavar='LAB:YYMMDD', help='Missing sequence ranges for a lab on a date')
+    parser.add_argument('--get', metavar='BARCODE', help='Look up one barcode')
+    parser.add_argument('--add', action='store_true', help='Index barcodes or --bulk JSON lines from stdin')
+    parser.add_argument('--compact', action='store_true', help='Merge the append log into the sorted file')
+
+    args = parser.parse_args()
+    try:
+        index = BarcodeIndex(args.dir)
+        if args.add:
+            def records():
+                for line in sys.stdin:
+                    line = line.strip()
+                    if line:
+                        yield json.loads(line) if line.startswith('{') else line
+            result = {"added": index.add(records()), "total": len(index)}
+        elif args.compact:
+            result = {"total": index.compact()}
+        elif args.range:
+            lab, date = _lab_date(args.range)
+            seq_to = args.seq_to if args.seq_to is not None else 2 ** 32 - 1
+            result = [_record_json(r) for r in index.range(lab, date, seq_from=args.seq_from, seq_to=seq_to)]
+        elif args.prefix:
+            result = [_record_json(r) for r in index.prefix(args.prefix)]
+        elif args.gaps:
+            lab, date = _lab_date(args.gaps)
+            result = {"lab_code": lab, "date": date,
+                      "missing": index.gaps(lab, date, max(args.seq_from, 1), args.seq_to)}
+        elif args.get:
+            record = index.get(args.get)
+            result = _record_json(record) if record else None
+        else:
+            result = {"total": len(index), "directory": os.path.abspath(args.dir)}
+        index.close()
+    except (OSError, ValueError) as e:
+        print(json.dumps({"success": False, "error": str(e)}))
+        return 1
+
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Daily barcode sequence allocator
+
+Sequences are counted per (lab code, day) in a SQLite file shared by every
+process that generates barcodes. Each allocation is a single upsert, so
+concurrent allocators never hand out the same number, and committed values
+survive crashes (WAL with synchronous=FULL). A new day starts again at 1.
+
+Allocators can lease blocks: next() reserves block_size sequences in one
+round-trip and hands them out locally. Numbers left in a block when the
+process exits or the day changes are skipped, never reused, so sequences are
+unique but may have gaps.
+
+Usage:
+    python3 scripts/barcode_sequence.py --lab-code LAB
+    python3 scripts/barcode_sequence.py --lab-code RAD --count 50
+    python3 scripts/barcode_sequence.py --current --lab-code LAB
+    python3 scripts/barcode_sequence.py --prune-days 30
+"""
+
+import os
+import sys
+import json
+import sqlite3
+import argparse
+import threading
+from datetime import date, timedelta
+
+DEFAULT_DB = os.environ.get('BARCODE_SEQUENCE_DB') or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'barcode_sequences.sqlite')
+
+# Days of counters kept; older rows are pruned now and then
+RETENTION_DAYS = 30
+
+
+def _day(day=None) -> str:
+    if day is None:
+        return date.today().isoformat()
+    return day.isoformat() if isinstance(day, date) else str(day)
+
+
+class SequenceAllocator:
+    """
+    Durable per-(lab code, day) counters, safe across threads and processes.
+
+    Args:
+        path: SQLite file, created if missing
+        block_size: Sequences reserved per round-trip by next()
+    """
+
+    def __init__(self, path: str = DEFAULT_DB, block_size: int = 1, retention_days: int = RETENTION_DAYS):
+        self.path = path
+        self.block_size = max(block_size, 1)
+        self.retention_days = retention_days
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30.0, isolation_level=None, check_same_thread=False)
+        self._lock = threading.Lock()
+        # (lab code, day) -> [next, last] of the current lease
+        self._leases = {}
+        self._pruned_day = None
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=FULL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sequences ("
+                " lab_code TEXT NOT NULL, day TEXT NOT NULL, value INTEGER NOT NULL,"
+                " PRIMARY KEY (lab_code, day))"
+            )
+
+    def _reserve(self, lab_code: str, day: str, count: int) -> int:
+        """Atomically add count to the counter; returns the new last value (lock held)"""
+        if self._pruned_day != day:
+            self._pruned_day = day
+            cutoff = (date.fromisoformat(day) - timedelta(days=self.retention_days)).isoformat()
+            self._conn.execute("DELETE FROM sequences WHERE day < ?", (cutoff,))
+        return self._conn.execute(
+            "INSERT INTO sequences (lab_code, day, value) VALUES (?, ?, ?)"
+            " ON CONFLICT(lab_code, day) DO UPDATE SET value = value + excluded.value"
+            " RETURNING value",
+            (lab_code, day, count)
+        ).fetchall()[0][0]  # Drain the cursor so the write commits and releases the lock
+
+    def allocate(self, lab_code: str, count: int = 1, day=None) -> range:
+        """
+        Reserve `count` consecutive sequences in one round-trip.
+
+        Returns:
+            range of the reserved sequence numbers
+        """
+        if count < 1:
+            raise ValueError("count must be at least 1")
+        day = _day(day)
+        with self._lock:
+            last = self._reserve(lab_code, day, count)
+        return range(last - count + 1, last + 1)
+
+    def next(self, lab_code: str, day=None) -> int:
+        """Next sequence for lab_code today, from the local lease when one is left"""
+        day = _day(day)
+        key = (lab_code, day)
+        with self._lock:
+            lease = self._leases.get(key)
+            if lease is None or lease[0] > lease[1]:
+                # Leases from earlier days are abandoned
+                self._leases = {k: v for k, v in self._leases.items() if k[1] == day}
+                last = self._reserve(lab_code, day, self.block_size)
+                lease = self._leases[key] = [last - self.block_size + 1, last]
+            sequence = lease[0]
+            lease[0] += 1
+        return sequence
+
+    def current(self, lab_code: str, day=None) -> int:
+        """Highest sequence handed out (or leased) for lab_code on day, 0 if none"""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM sequences WHERE lab_code = ? AND day = ?",
+                                     (lab_code, _day(day))).fetchone()
+        return row[0] if row else 0
+
+    def prune(self, keep_days: int) -> int:
+        """Delete counters older than keep_days; returns the number of rows removed"""
+        cutoff = (date.today() - timedelta(days=keep_days)).isoformat()
+        with self._lock:
+            return self._conn.execute("DELETE FROM sequences WHERE day < ?", (cutoff,)).rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_default_allocator = None
+_default_allocator_lock = threading.Lock()
+
+
+def get_allocator(block_size: int = 1) -> SequenceAllocator:
+    """Process-wide allocator on DEFAULT_DB, created on first use"""
+    global _default_allocator
+    with _default_allocator_lock:
+        if _default_allocator is None:
+            _default_allocator = SequenceAllocator(DEFAULT_DB, block_size)
+    return _default_allocator
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Allocate daily lab barcode sequences')
+    parser.add_argument('--lab-code', '-l', default='LAB', help='Lab code (LAB or RAD)')
+    parser.add_argument('--count', '-n', type=int, default=1, help='Consecutive sequences to reserve')
+    parser.add_argument('--day', help='Day as YYYY-MM-DD (default: today)')
+    parser.add_argument('--db', default=DEFAULT_DB, help='SQLite file (default: $BARCODE_SEQUENCE_DB or data/)')
+    parser.add_argument('--current', action='store_true', help='Show the last allocated sequence instead')
+    parser.add_argument('--prune-days', type=int, help='Delete counters older than this many days')
+
+    args = parser.parse_args()
+    lab_code = args.lab_code.upper()
+    try:
+        allocator = SequenceAllocator(args.db)
+        if args.prune_days is not None:
+            result = {"pruned": allocator.prune(args.prune_days)}
+        elif args.current:
+            result = {"lab_code": lab_code, "day": _day(args.day), "current": allocator.current(lab_code, args.day)}
+        else:
+            reserved = allocator.allocate(lab_code, args.count, args.day)
+            result = {"lab_code": lab_code, "day": _day(args.day), "first": reserved.start, "last": reserved[-1]}
+        allocator.close()
+    except (sqlite3.Error, ValueError) as e:
+        print(json.dumps({"success": False, "error": str(e)}))
+        return 1
+
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Aadhaar Secure QR decoder benchmarks
+
+Compares the divide-and-conquer base-10 conversion in lib/decode_aadhaar.py
+against plain int() over payload sizes typical of photo-bearing cards, and
+the single-pass field classifier against the previous per-field rescans on
+well-formed and shuffled layouts. Per-stage timings (integer parse,
+decompression, splitting, text decoding, field extraction) are taken on
+synthetic payloads from scripts/aadhaar_fixtures.py across photo sizes.
+
+Usage:
+    python3 scripts/bench_aadhaar.py
+    python3 scripts/bench_aadhaar.py --sizes 1000,5000,20000 --repeat 5
+    python3 scripts/bench_aadhaar.py --output bench.json
+    python3 scripts/bench_aadhaar.py --baseline bench.json --tolerance 0.25
+"""
+
+import os
+import sys
+import json
+import re
+import time
+import random
+import argparse
+import platform
+import statistics
+import timeit
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(SCRIPTS_DIR, '..', 'lib'))
+sys.path.insert(0, SCRIPTS_DIR)
+
+from decode_aadhaar import base10_to_bytes, AadhaarSecureQrDecoder  # noqa: E402
+from aadhaar_fixtures import build_payload  # noqa: E402
+
+DEFAULT_SIZES = [1000, 2000, 5000, 10000, 15000, 20000]
+DEFAULT_PHOTO_SIZES = [0, 1000, 2500, 5000, 10000]
+STAGES = ['int_parse', 'decompress', 'split', 'decode', 'extract', 'total', 'projected']
+IDENTITY_FIELDS = ['reference_id', 'name', 'dob', 'gender']
+
+
+def builtin_to_bytes(digits: str) -> bytes:
+    """Reference conversion through int(str), as the decoder used to do it"""
+    value = int(digits)
+    return value.to_bytes((value.bit_length() + 7) // 8, byteorder='big')
+
+
+def legacy_fields(parts: list) -> dict:
+    """Field extraction as decodeddata() did it before the single-pass classifier"""
+    data = {}
+
+    ref_id = ""
+    if len(parts) > 1 and parts[1].isdigit() and len(parts[1]) >= 4:
+        ref_id = parts[1]
+    elif len(parts) > 16 and parts[16].isdigit() and len(parts[16]) >= 4:
+        ref_id = parts[16]
+    else:
+        for part in parts:
+            if part.isdigit() and len(part) >= 8:
+                ref_id = part
+                break
+    data['reference_id'] = ref_id
+
+    name = parts[2] if len(parts) > 2 else ""
+    if not re.match(r'^[A-Za-z\s]+$', name):
+        for part in parts[2:10]:
+            if re.match(r'^[A-Za-z][A-Za-z\s]{2,}$', part):
+                name = part
+                break
+    data['name'] = name
+
+    dob = ""
+    dob_raw = parts[3] if len(parts) > 3 else ""
+    date_match = re.search(r'(\d{2})[-/](\d{2})[-/](\d{4})', dob_raw)
+    if date_match:
+        dob = f"{date_match.group(1)}-{date_match.group(2)}-{date_match.group(3)}"
+    elif re.match(r'^\d{8}$', dob_raw):
+        dob = f"{dob_raw[:2]}-{dob_raw[2:4]}-{dob_raw[4:]}"
+    elif re.match(r'^\d{4}-\d{2}-\d{2}$', dob_raw):
+        dob = dob_raw
+    else:
+        for part in parts:
+            date_match = re.search(r'(\d{2})[-/](\d{2})[-/](\d{4})', part)
+            if date_match:
+                dob = f"{date_match.group(1)}-{date_match.group(2)}-{date_match.group(3)}"
+                break
+            if re.match(r'^\d{8}$', part):
+                dob = f"{part[:2]}-{part[2:4]}-{part[4:]}"
+                break
+    data['dob'] = dob
+
+    gender = parts[4] if len(parts) > 4 else ""
+    if gender not in ['M', 'F', 'MALE', 'FEMALE', 'T', 'TRANSGENDER']:
+        for part in parts:
+            if part.upper() in ['M', 'F', 'MALE', 'FEMALE', 'T', 'TRANSGENDER']:
+                gender = part
+                break
+    data['gender'] = gender.upper() if gender else ""
+    return data
+
+
+def legacy_decode(digits: str) -> dict:
+    """Same decoder front end, but every part decoded and scanned once per field"""
+    decoder = AadhaarSecureQrDecoder(digits)
+    return legacy_fields(list(decoder.get_all_parts().values()))
+
+
+def classifier_decode(digits: str) -> dict:
+    return AadhaarSecureQrDecoder(digits).decodeddata(IDENTITY_FIELDS)
+
+
+def bench_classifier(repeat: int) -> list:
+    if hasattr(sys, 'set_int_max_str_digits'):
+        sys.set_int_max_str_digits(0)
+
+    results = []
+    for label, layout in (('well-formed', 'v2'), ('shuffled', 'shuffled')):
+        digits = build_payload(layout, photo_bytes=256, compression='zlib')
+        legacy = legacy_decode(digits)
+        current = classifier_decode(digits)
+        results.append({
+            "layout": label,
+            "legacy_ms": round(best_of(legacy_decode, digits, repeat), 3),
+            "classifier_ms": round(best_of(classifier_decode, digits, repeat), 3),
+            "same_output": legacy == {k: current[k] for k in legacy},
+        })
+    return results
+
+
+def random_digits(size: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    return str(rng.randint(1, 9)) + ''.join(rng.choice('0123456789') for _ in range(size - 1))
+
+
+def best_of(func, arg, repeat: int) -> float:
+    """Best wall time in milliseconds over `repeat` runs"""
+    return min(timeit.repeat(lambda: func(arg), number=1, repeat=repeat)) * 1000
+
+
+def bench_base10(sizes, repeat: int) -> list:
+    # int(str) refuses long strings on 3.11+, lift the limit for the baseline
+    if hasattr(sys, 'set_int_max_str_digits'):
+        sys.set_int_max_str_digits(0)
+
+    results = []
+    for size in sizes:
+        digits = random_digits(size)
+        assert base10_to_bytes(digits) == builtin_to_bytes(digits)
+        builtin_ms = best_of(builtin_to_bytes, digits, repeat)
+        chunked_ms = best_of(base10_to_bytes, digits, repeat)
+        results.append({
+            "digits": size,
+            "builtin_ms": round(builtin_ms, 3),
+            "chunked_ms": round(chunked_ms, 3),
+            "speedup": round(builtin_ms / chunked_ms, 2) if chunked_ms else None,
+        })
+    return results
+
+
+def stage_run(digits: str) -> dict:
+    """Wall time in milliseconds of each decoder stage on a fresh decoder"""
+    clock = time.perf_counter
+    t0 = clock()
+    base10_to_bytes(digits)
+    t1 = clock()
+    # The constructor parses the integer again and inflates the first chunk
+    decoder = AadhaarSecureQrDecoder(digits)
+    t2 = clock()
+    decoder._finish()
+    t3 = clock()
+    count = decoder.part_count()
+    t4 = clock()
+    for idx in range(min(count, 16)):
+        decoder._decode_part(idx)
+    t5 = clock()
+    decoder.decodeddata()
+    t6 = clock()
+    AadhaarSecureQrDecoder(digits).decodeddata()
+    t7 = clock()
+    AadhaarSecureQrDecoder(digits).decodeddata(IDENTITY_FIELDS)
+    t8 = clock()
+
+    int_parse = t1 - t0
+    timings = {
+        'int_parse': int_parse,
+        'decompress': max(t2 - t1 - int_parse, 0.0) + (t3 - t2),
+        'split': t4 - t3,
+        'decode': t5 - t4,
+        'extract': t6 - t5,
+        'total': t7 - t6,
+        'projected': t8 - t7,
+    }
+    return {stage: value * 1000 for stage, value in timings.items()}
+
+
+def bench_stages(photo_sizes, repeat: int, layout: str = 'v2') -> list:
+    """Median and best per-stage timings for each photo size"""
+    if hasattr(sys, 'set_int_max_str_digits'):
+        sys.set_int_max_str_digits(0)
+
+    results = []
+    for photo_bytes in photo_sizes:
+        digits = build_payload(layout, photo_bytes=photo_bytes)
+        stage_run(digits)  # warm up caches and regex compilation
+        runs = [stage_run(digits) for _ in range(repeat)]
+        row = {"photo_bytes": photo_bytes, "digits": len(digits), "layout": layout}
+        for stage in STAGES:
+            samples = [run[stage] for run in runs]
+            row[stage] = {
+                "median_ms": round(statistics.median(samples), 4),
+                "best_ms": round(min(samples), 4),
+            }
+        results.append(row)
+    return results
+
+
+def compare_stages(current: list, baseline: list, tolerance: float) -> list:
+    """Stages whose median grew by more than `tolerance` against the baseline"""
+    previous = {(row['layout'], row['photo_bytes']): row for row in baseline}
+    regressions = []
+    for row in current:
+        old = previous.get((row['layout'], row['photo_bytes']))
+        if old is None:
+            continue
+        for stage in STAGES:
+            if stage not in old:
+                continue
+            before, after = old[stage]['median_ms'], row[stage]['median_ms']
+            # Sub-microsecond stages are all noise
+            if after > before * (1 + tolerance) and after - before > 0.001:
+                regressions.append({
+                    "photo_bytes": row['photo_bytes'],
+                    "stage": stage,
+                    "baseline_ms": before,
+                    "current_ms": after,
+                    "change": round(after / before - 1, 3) if before else None,
+                })
+    return regressions
+
+
+def environment() -> dict:
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "system": platform.system(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the Aadhaar Secure QR decoder')
+    parser.add_argument('--sizes', default=','.join(str(s) for s in DEFAULT_SIZES),
+                        help='Comma-separated payload sizes in decimal digits')
+    parser.add_argument('--repeat', '-r', type=int, default=5, help='Runs per measurement (best is kept)')
+    parser.add_argument('--photo-sizes', default=','.join(str(s) for s in DEFAULT_PHOTO_SIZES),
+                        help='Comma-separated photo sizes in bytes for the per-stage timings')
+    parser.add_argument('--layout', default='v2', choices=['v2', 'v2-legacy', 'shuffled'],
+                        help='Fixture layout for the per-stage timings')
+    parser.add_argument('--stage-repeat', type=int, default=50, help='Runs per stage measurement (median is kept)')
+    parser.add_argument('--json', action='store_true', help='Emit machine-readable JSON')
+    parser.add_argument('--output', '-o', help='Also write the JSON results to this file')
+    parser.add_argument('--baseline', help='JSON results of an earlier run to compare stage medians against')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed relative slowdown of a stage median before it counts as a regression')
+
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+    photo_sizes = [int(s) for s in args.photo_sizes.split(',') if s.strip()]
+
+    results = bench_base10(sizes, args.repeat)
+    classifier = bench_classifier(args.repeat)
+    stages = bench_stages(photo_sizes, args.stage_repeat, args.layout)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare_stages(stages, json.load(f).get('stages', []), args.tolerance)
+
+    report = {
+        "environment": environment(),
+        "base10_to_bytes": results,
+        "classifier": classifier,
+        "stages": stages,
+    }
+    if args.baseline:
+        report["regressions"] = regressions
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{'digits':>8} {'int() ms':>10} {'chunked ms':>11} {'speedup':>8}")
+        for row in results:
+            print(f"{row['digits']:>8} {row['builtin_ms']:>10.3f} {row['chunked_ms']:>11.3f} {row['speedup']:>7}x")
+        print()
+        print(f"{'layout':>12} {'legacy ms':>10} {'classifier ms':>14} {'same':>5}")
+        for row in classifier:
+            print(f"{row['layout']:>12} {row['legacy_ms']:>10.3f} {row['classifier_ms']:>14.3f} {str(row['same_output']):>5}")
+        print()
+        print(f"{'photo':>6} {'digits':>7} " + ' '.join(f"{stage:>10}" for stage in STAGES) + "  (median ms)")
+        for row in stages:
+            cells = ' '.join(f"{row[stage]['median_ms']:>10.4f}" for stage in STAGES)
+            print(f"{row['photo_bytes']:>6} {row['digits']:>7} {cells}")
+        for item in regressions:
+            print(f"REGRESSION {item['stage']} @ {item['photo_bytes']} B photo: "
+                  f"{item['baseline_ms']:.4f} -> {item['current_ms']:.4f} ms", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Barcode validation and reconciliation benchmark
+
+Generates a shift's worth of scans (with corrupted, duplicated and
+previous-day tubes mixed in) and compares the original per-call validation
+(split, rebuild the base, calculate_check_digit) with the table-driven
+validate_barcode() and with batched reconcile(), which also parses
+components and flags duplicates and out-of-day scans.
+
+Usage:
+    python3 scripts/bench_barcode.py
+    python3 scripts/bench_barcode.py --scans 100000 --repeat 5 --json
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import statistics
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from generate_barcode import (  # noqa: E402
+    BarcodeBatch, calculate_check_digit, validate_barcode, reconcile, np,
+)
+
+
+def legacy_validate(barcode: str) -> bool:
+    """validate_barcode() as it was: split, rebuild the base, per-call check digit"""
+    try:
+        parts = barcode.split("-")
+        if len(parts) != 6:
+            return False
+        return calculate_check_digit("".join(parts[:-1])) == parts[-1]
+    except Exception:
+        return False
+
+
+def synthetic_scans(count: int, seed: int = 0, day: datetime = None):
+    """Scans from one shift: ~1% corrupted, ~1% scanned twice, ~0.5% from yesterday"""
+    rng = random.Random(seed)
+    day = day or datetime(2026, 1, 15, 7, 0, 0)
+    batches = {lab: BarcodeBatch() for lab in ('LAB', 'RAD')}
+    scans = []
+    for i in range(count):
+        lab = 'LAB' if rng.random() < 0.8 else 'RAD'
+        stamp = day + timedelta(seconds=i * 3)
+        if rng.random() < 0.005:
+            stamp -= timedelta(days=1)
+        barcode = batches[lab].generate(lab, f"UHID-{rng.randint(1, 999999)}", rng.choice(['CBC', 'LFT', 'TSH']),
+                                        timestamp=stamp)["barcode"]
+        roll = rng.random()
+        if roll < 0.01:
+            pos = rng.randrange(len(barcode))
+            barcode = barcode[:pos] + rng.choice('0123456789') + barcode[pos + 1:]
+        elif roll < 0.02 and scans:
+            barcode = rng.choice(scans)
+        scans.append(barcode)
+    return scans, day.strftime('%y%m%d')
+
+
+def timed(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark barcode validation and reconciliation')
+    parser.add_argument('--scans', '-n', type=int, default=20000, help='Scanned barcodes per run')
+    parser.add_argument('--repeat', '-r', type=int, default=3, help='Runs per method (median is kept)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for the synthetic scans')
+    parser.add_argument('--json', action='store_true', help='Emit machine-readable JSON')
+
+    args = parser.parse_args()
+    scans, day = synthetic_scans(args.scans, args.seed)
+    lines = [barcode + '\n' for barcode in scans]
+
+    legacy_s, legacy_valid = timed(lambda: sum(map(legacy_validate, scans)), args.repeat)
+    table_s, table_valid = timed(lambda: sum(map(validate_barcode, scans)), args.repeat)
+    reconcile_s, summary = timed(lambda: reconcile(lines, io.StringIO(), day), args.repeat)
+    if legacy_valid != table_valid:
+        print(f"Mismatch: legacy found {legacy_valid} valid, table-driven {table_valid}", file=sys.stderr)
+        return 1
+
+    rows = [
+        {"method": "legacy validate_barcode", "seconds": legacy_s},
+        {"method": "table validate_barcode", "seconds": table_s},
+        {"method": "reconcile" + (" (numpy)" if np is not None else ""), "seconds": reconcile_s},
+    ]
+    for row in rows:
+        row["us_per_scan"] = round(row["seconds"] / args.scans * 1e6, 2)
+        row["speedup"] = round(legacy_s / row["seconds"], 2) if row["seconds"] else None
+        row["seconds"] = round(row["seconds"], 4)
+
+    if args.json:
+        print(json.dumps({"scans": args.scans, "results": rows, "summary": summary}, indent=2))
+    else:
+        print(f"{args.scans} scans, {summary['valid']} valid, issues: {summary['issues']}")
+        print(f"{'method':>26} {'seconds':>9} {'us/scan':>8} {'speedup':>8}")
+        for row in rows:
+            print(f"{row['method']:>26} {row['seconds']:>9.4f} {row['us_per_scan']:>8.2f} {row['speedup']:>7}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
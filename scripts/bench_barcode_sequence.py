@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Barcode sequence allocator contention benchmark
+
+Starts --processes processes with --threads threads each, all drawing
+sequences for the same lab code and day from one SQLite file through
+scripts/barcode_sequence.py, and checks that no sequence was handed out
+twice. Repeated for each lease block size to show how leasing cuts
+round-trips.
+
+Usage:
+    python3 scripts/bench_barcode_sequence.py
+    python3 scripts/bench_barcode_sequence.py --processes 16 --threads 8 --per-thread 200 --block-sizes 1,32
+    python3 scripts/bench_barcode_sequence.py --json
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+import argparse
+import multiprocessing
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from barcode_sequence import SequenceAllocator  # noqa: E402
+
+DAY = '2026-01-01'
+
+
+def _worker(db_path, block_size, threads, per_thread, start_at, queue):
+    allocator = SequenceAllocator(db_path, block_size)
+    # Line up with the other processes so they really contend
+    time.sleep(max(start_at - time.time(), 0))
+
+    def draw(_):
+        return [allocator.next('LAB', DAY) for _ in range(per_thread)]
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        sequences = [s for batch in pool.map(draw, range(threads)) for s in batch]
+    allocator.close()
+    queue.put(sequences)
+
+
+def bench(processes, threads, per_thread, block_size):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'sequences.sqlite')
+        SequenceAllocator(db_path).close()  # Create the schema up front
+        queue = multiprocessing.Queue()
+        start_at = time.time() + 0.5
+        procs = [multiprocessing.Process(target=_worker, args=(db_path, block_size, threads, per_thread,
+                                                              start_at, queue))
+                 for _ in range(processes)]
+        for proc in procs:
+            proc.start()
+        sequences = []
+        for _ in procs:
+            sequences.extend(queue.get())
+        elapsed = time.time() - start_at
+        for proc in procs:
+            proc.join()
+        allocator = SequenceAllocator(db_path)
+        leased = allocator.current('LAB', DAY)
+        allocator.close()
+
+    duplicates = sum(n - 1 for n in Counter(sequences).values() if n > 1)
+    return {
+        "block_size": block_size,
+        "allocations": len(sequences),
+        "duplicates": duplicates,
+        "leased": leased,
+        "gaps": leased - len(set(sequences)),
+        "seconds": round(elapsed, 3),
+        "per_second": round(len(sequences) / elapsed) if elapsed > 0 else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark concurrent barcode sequence allocation')
+    parser.add_argument('--processes', '-p', type=int, default=8, help='Allocator processes')
+    parser.add_argument('--threads', '-t', type=int, default=4, help='Threads per process')
+    parser.add_argument('--per-thread', '-n', type=int, default=100, help='Sequences drawn per thread')
+    parser.add_argument('--block-sizes', default='1,16,64', help='Comma-separated lease block sizes')
+    parser.add_argument('--json', action='store_true', help='Emit machine-readable JSON')
+
+    args = parser.parse_args()
+    block_sizes = [int(b) for b in args.block_sizes.split(',') if b.strip()]
+    rows = [bench(args.processes, args.threads, args.per_thread, b) for b in block_sizes]
+
+    if args.json:
+        print(json.dumps({"processes": args.processes, "threads": args.threads,
+                          "per_thread": args.per_thread, "results": rows}, indent=2))
+    else:
+        print(f"{args.processes} processes x {args.threads} threads x {args.per_thread} sequences")
+        print(f"{'block':>6} {'allocs':>8} {'dupes':>6} {'gaps':>6} {'seconds':>8} {'per sec':>9}")
+        for row in rows:
+            print(f"{row['block_size']:>6} {row['allocations']:>8} {row['duplicates']:>6} {row['gaps']:>6} "
+                  f"{row['seconds']:>8.3f} {row['per_second'] or 0:>9}")
+    return 1 if any(row["duplicates"] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
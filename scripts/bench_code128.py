@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Code128 label rendering benchmark
+
+Renders a morning's batch of lab barcodes (same lab codes and date, varying
+patients, tests and sequences) as SVG, PNG and one PDF label sheet, and
+reports labels per second with the segment cache warm and with it cleared
+before every label.
+
+Usage:
+    python3 scripts/bench_code128.py
+    python3 scripts/bench_code128.py --labels 5000 --repeat 5 --json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import statistics
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from generate_barcode import BarcodeBatch, label_caption  # noqa: E402
+from code128 import render_svg, render_png, render_pdf_sheet, encode_segment  # noqa: E402
+
+
+def morning_batch(count, seed=0):
+    rng = random.Random(seed)
+    start = datetime(2026, 1, 15, 7, 0, 0)
+    batches = {lab: BarcodeBatch() for lab in ('LAB', 'RAD')}
+    labels = []
+    for i in range(count):
+        lab = 'LAB' if rng.random() < 0.8 else 'RAD'
+        record = batches[lab].generate(lab, f"UHID-{rng.randint(1, 999999)}", rng.choice(['CBC', 'LFT', 'TSH', 'KFT']),
+                                       timestamp=start + timedelta(seconds=i * 2))
+        labels.append((record["barcode"], label_caption(record)))
+    return labels
+
+
+def per_label(fn, labels, cold):
+    def run():
+        for text, caption in labels:
+            if cold:
+                encode_segment.cache_clear()
+            fn(text, caption)
+    return run
+
+
+def timed(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        encode_segment.cache_clear()
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark Code128 label rendering')
+    parser.add_argument('--labels', '-n', type=int, default=2000, help='Labels per run')
+    parser.add_argument('--repeat', '-r', type=int, default=3, help='Runs per format (median is kept)')
+    parser.add_argument('--json', action='store_true', help='Emit machine-readable JSON')
+
+    args = parser.parse_args()
+    labels = morning_batch(args.labels)
+
+    cases = [
+        ("svg", lambda text, caption: render_svg(text, caption=caption)),
+        ("png", lambda text, caption: render_png(text)),
+    ]
+    rows = []
+    for name, fn in cases:
+        for cold in (True, False):
+            seconds = timed(per_label(fn, labels, cold), args.repeat)
+            rows.append({"format": name, "cache": "cold" if cold else "warm", "seconds": seconds})
+    seconds = timed(lambda: render_pdf_sheet(labels), args.repeat)
+    rows.append({"format": "pdf sheet", "cache": "warm", "seconds": seconds})
+
+    for row in rows:
+        row["labels_per_second"] = round(args.labels / row["seconds"]) if row["seconds"] else None
+        row["seconds"] = round(row["seconds"], 4)
+    info = encode_segment.cache_info()
+
+    if args.json:
+        print(json.dumps({"labels": args.labels, "results": rows,
+                          "segment_cache": {"hits": info.hits, "misses": info.misses}}, indent=2))
+    else:
+        print(f"{args.labels} labels; last run's segment cache: {info.hits} hits, {info.misses} misses")
+        print(f"{'format':>10} {'cache':>6} {'seconds':>9} {'labels/s':>9}")
+        for row in rows:
+            print(f"{row['format']:>10} {row['cache']:>6} {row['seconds']:>9.4f} {row['labels_per_second']:>9}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
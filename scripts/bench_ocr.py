@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+OCR preprocessing benchmark
+
+For each preset in lib/ocr_preprocess.py, measures how much smaller the
+upload gets and what preprocessing costs. End-to-end latency is the
+preprocessing time plus the base64 upload at --uplink-mbps. With --live it
+also includes a real document_text_detection call, which needs credentials.
+Without image arguments a synthetic phone-sized photo of a handwritten note
+is generated. Requires Pillow.
+
+Usage:
+    python3 scripts/bench_ocr.py
+    python3 scripts/bench_ocr.py photo1.jpg photo2.jpg --uplink-mbps 5 --json
+    python3 scripts/bench_ocr.py note.jpg --live
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import random
+import base64
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib'))
+
+from ocr_preprocess import preprocess, PRESETS, Image  # noqa: E402
+
+if Image is not None:
+    from PIL import ImageDraw, ImageFilter
+
+
+def synthetic_note(width: int = 4032, height: int = 3024, seed: int = 0) -> bytes:
+    """A slightly rotated, noisy 12 MP 'photo' of scribbled lines, as JPEG"""
+    rng = random.Random(seed)
+    image = Image.new('RGB', (width, height), (214, 205, 190))
+    draw = ImageDraw.Draw(image)
+    # Paper in the middle, table around it
+    draw.rectangle((width // 8, height // 10, width * 7 // 8, height * 9 // 10), fill=(246, 244, 238))
+    y = height // 6
+    while y < height * 5 // 6:
+        x = width // 6
+        while x < width * 5 // 6:
+            word = rng.randint(60, 260)
+            points = [(x + i * 12, y + rng.randint(-14, 14)) for i in range(word // 12)]
+            draw.line(points, fill=(30, 40, 90), width=7)
+            x += word + rng.randint(30, 70)
+        y += rng.randint(110, 150)
+    image = image.rotate(2.5, resample=Image.BICUBIC, fillcolor=(214, 205, 190))
+    noise = Image.effect_noise((width, height), 18).convert('RGB')
+    image = Image.blend(image, noise, 0.08).filter(ImageFilter.GaussianBlur(1))
+    out = io.BytesIO()
+    image.save(out, 'JPEG', quality=95)
+    return out.getvalue()
+
+
+def upload_ms(size: int, uplink_mbps: float) -> float:
+    """Time to send `size` bytes as base64 at the given uplink rate"""
+    encoded = (size + 2) // 3 * 4
+    return encoded * 8 / (uplink_mbps * 1_000_000) * 1000
+
+
+def vision_ms(image_bytes: bytes) -> float:
+    from ocr_handwriting import recognize
+    encoded = base64.b64encode(image_bytes).decode()
+    recognize(encoded, preset='none')  # warm up the cached client
+    start = time.perf_counter()
+    recognize(encoded, preset='none')
+    return (time.perf_counter() - start) * 1000
+
+
+def bench_image(name: str, image_bytes: bytes, repeat: int, uplink_mbps: float, live: bool) -> list:
+    rows = []
+    for preset in ['none'] + list(PRESETS):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            processed, info = preprocess(image_bytes, preset)
+            timings.append((time.perf_counter() - start) * 1000)
+
+        prep_ms = statistics.median(timings)
+        row = {
+            "image": name,
+            "preset": preset,
+            "bytes_before": info["bytes_before"],
+            "bytes_after": info["bytes_after"],
+            "reduction": round(1 - info["bytes_after"] / info["bytes_before"], 3),
+            "size": info.get("size"),
+            "preprocess_ms": round(prep_ms, 1),
+            "upload_ms": round(upload_ms(len(processed), uplink_mbps), 1),
+        }
+        if live:
+            row["vision_ms"] = round(vision_ms(processed), 1)
+        row["end_to_end_ms"] = round(prep_ms + row["upload_ms"] + row.get("vision_ms", 0.0), 1)
+        rows.append(row)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark OCR image preprocessing presets')
+    parser.add_argument('images', nargs='*', help='Sample images (defaults to a synthetic 12 MP photo)')
+    parser.add_argument('--repeat', '-r', type=int, default=3, help='Preprocessing runs per preset (median is kept)')
+    parser.add_argument('--uplink-mbps', type=float, default=10.0, help='Upload bandwidth used for the latency model')
+    parser.add_argument('--live', action='store_true', help='Include a real Vision call per preset')
+    parser.add_argument('--json', action='store_true', help='Emit machine-readable JSON')
+
+    args = parser.parse_args()
+    if Image is None:
+        print("Pillow is required: pip install Pillow", file=sys.stderr)
+        return 1
+
+    samples = []
+    for path in args.images:
+        with open(path, 'rb') as f:
+            samples.append((os.path.basename(path), f.read()))
+    if not samples:
+        samples.append(('synthetic-12mp.jpg', synthetic_note()))
+
+    rows = []
+    for name, image_bytes in samples:
+        rows.extend(bench_image(name, image_bytes, args.repeat, args.uplink_mbps, args.live))
+
+    if args.json:
+        print(json.dumps({"uplink_mbps": args.uplink_mbps, "results": rows}, indent=2))
+    else:
+        print(f"{'image':>20} {'preset':>9} {'before KB':>10} {'after KB':>9} {'saved':>6} "
+              f"{'prep ms':>8} {'upload ms':>10} {'total ms':>9}")
+        for row in rows:
+            print(f"{row['image'][:20]:>20} {row['preset']:>9} {row['bytes_before'] / 1024:>10.0f} "
+                  f"{row['bytes_after'] / 1024:>9.0f} {row['reduction']:>6.0%} {row['preprocess_ms']:>8.1f} "
+                  f"{row['upload_ms']:>10.1f} {row['end_to_end_ms']:>9.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
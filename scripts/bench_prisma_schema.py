@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Prisma schema parse benchmark
+
+Builds multi-thousand-line schemas by repeating the blocks of
+prisma/schema.prisma under new names (with a run of duplicates pasted in, as
+in the incident the fix scripts cleaned up, plus one conflicting redefinition
+and one dangling relation) and times:
+
+- legacy: locating every block with the old find_line_index_startswith scan
+  plus its closing brace, as the fix scripts did per lookup
+- parse: the single-pass block parser
+- members: parse plus field/attribute parsing of every block
+- transforms: parse, dedupe + ClaimCommunication insert, one rewrite
+- check: parse plus check_schema.check(); fails unless it finds exactly the
+  injected duplicates, conflict and dangling relation
+
+The legacy scan is quadratic, so it is skipped above --legacy-max lines.
+
+Usage:
+    python3 scripts/bench_prisma_schema.py
+    python3 scripts/bench_prisma_schema.py --lines 5000,20000,100000 --repeat 5 --json
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from prisma_schema import DEFAULT_SCHEMA, load, parse, apply  # noqa: E402
+from fix_schema import TRANSFORMS  # noqa: E402
+from check_schema import check  # noqa: E402
+
+DUPLICATE_RUN = 12
+
+DANGLING_MODEL = """
+model BenchDangling {
+  id      String @id
+  ghostId String
+  ghost   Ghost  @relation(fields: [ghostId], references: [id])
+}
+"""
+
+
+def find_line_index_startswith(lines, start_str, start_from=0):
+    """clean_schema.py's original lookup helper"""
+    for i in range(start_from, len(lines)):
+        if lines[i].strip().startswith(start_str):
+            return i
+    return -1
+
+
+def legacy_locate(text, headers):
+    """Find every block and its closing brace by rescanning the lines per lookup"""
+    lines = text.splitlines(keepends=True)
+    spans = []
+    for header in headers:
+        start = find_line_index_startswith(lines, header)
+        end = start
+        while lines[end].strip() != '}':
+            end += 1
+        spans.append((start, end))
+    return spans
+
+
+def synthetic_schema(base, target_lines, duplicate_run=DUPLICATE_RUN):
+    """base's blocks, then copies renamed Name_1, Name_2, ... until target_lines, plus the injected issues"""
+    blocks = [b for b in base.blocks if b.kind in ('model', 'enum')]
+    parts = [base.text[:blocks[0].start]]
+    lines = parts[0].count('\n')
+    copy = 0
+    while lines < target_lines:
+        for block in blocks:
+            text = block.text
+            if copy:
+                text = re.sub(rf'\b{block.kind} {block.name} \{{', f'{block.kind} {block.name}_{copy} {{', text,
+                              count=1)
+            parts.append(text + '\n')
+            lines += text.count('\n') + 1
+            if lines >= target_lines:
+                break
+        copy += 1
+    parts.extend(parts[1:1 + duplicate_run])
+    parts.append(parts[1].replace('{\n', '{\n  benchConflict Int?\n', 1))
+    parts.append(DANGLING_MODEL)
+    text = ''.join(parts)
+    return text, [f"{b.kind} {b.name} " for b in parse(text).blocks]
+
+
+def timed(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark Prisma schema parsing')
+    parser.add_argument('--lines', default='2000,10000,50000', help='Comma-separated schema sizes in lines')
+    parser.add_argument('--legacy-max', type=int, default=10000, help='Largest schema to run the legacy scan on')
+    parser.add_argument('--repeat', '-r', type=int, default=3, help='Runs per method (median is kept)')
+    parser.add_argument('--schema', default=DEFAULT_SCHEMA, help='Schema whose blocks are repeated')
+    parser.add_argument('--json', action='store_true', help='Emit machine-readable JSON')
+
+    args = parser.parse_args()
+    base = load(args.schema)
+
+    rows = []
+    for target in (int(n) for n in args.lines.split(',')):
+        text, headers = synthetic_schema(base, target)
+        legacy_s = None
+        if target <= args.legacy_max:
+            legacy_s, _ = timed(lambda: legacy_locate(text, headers), args.repeat)
+        parse_s, schema = timed(lambda: parse(text), args.repeat)
+        members_s, _ = timed(lambda: [b.members for b in parse(text).blocks], args.repeat)
+        transform_s, (_, changes) = timed(lambda: apply(parse(text), TRANSFORMS), args.repeat)
+        check_s, report = timed(lambda: check(parse(text)), args.repeat)
+        found = {key: len(issues) for key, issues in report.items()}
+        if found != {"duplicates": DUPLICATE_RUN, "conflicts": 1, "dangling": 1}:
+            print(f"check() missed injected issues at {target} lines: {found}", file=sys.stderr)
+            return 1
+        rows.append({
+            "lines": schema.line_count,
+            "blocks": len(schema.blocks),
+            "edits": len(changes),
+            "legacy_ms": round(legacy_s * 1000, 2) if legacy_s is not None else None,
+            "parse_ms": round(parse_s * 1000, 2),
+            "members_ms": round(members_s * 1000, 2),
+            "transform_ms": round(transform_s * 1000, 2),
+            "check_ms": round(check_s * 1000, 2),
+            "lines_per_second": round(schema.line_count / parse_s) if parse_s else None,
+        })
+
+    if args.json:
+        print(json.dumps({"results": rows}, indent=2))
+    else:
+        print(f"{'lines':>7} {'blocks':>7} {'edits':>6} {'legacy ms':>10} {'parse ms':>9} {'members ms':>11} "
+              f"{'transform ms':>13} {'check ms':>9} {'lines/s':>10}")
+        for row in rows:
+            legacy = f"{row['legacy_ms']:>10.2f}" if row['legacy_ms'] is not None else f"{'-':>10}"
+            print(f"{row['lines']:>7} {row['blocks']:>7} {row['edits']:>6} {legacy} "
+                  f"{row['parse_ms']:>9.2f} {row['members_ms']:>11.2f} {row['transform_ms']:>13.2f} "
+                  f"{row['check_ms']:>9.2f} {row['lines_per_second']:>10}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Duplicate and conflict detector for prisma/schema.prisma
+
+Walks the parsed schema once, hashing blocks that share a name (kind plus
+body with comments and whitespace normalized), and reports:
+
+- duplicates: a block name defined again with an identical body
+- conflicts: a block name defined again with a different body
+- dangling: relation fields whose target model does not exist, or whose
+  @relation(fields/references) name fields missing on either side
+
+Exits 1 when anything is found so it can guard schema edits (e.g. before
+prisma generate). --fix removes exact duplicates and leaves conflicts for
+a human to resolve.
+
+Usage:
+    python3 scripts/check_schema.py [schema]
+    python3 scripts/check_schema.py --json
+    python3 scripts/check_schema.py --fix
+"""
+
+import os
+import re
+import sys
+import json
+import hashlib
+import argparse
+import contextlib
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from prisma_schema import DEFAULT_SCHEMA, Dedupe, load, run_transforms  # noqa: E402
+
+SCALAR_TYPES = frozenset(['String', 'Boolean', 'Int', 'BigInt', 'Float', 'Decimal', 'DateTime', 'Json', 'Bytes'])
+
+_RELATION_LIST = re.compile(r'\b(fields|references)\s*:\s*\[([^\]]*)\]')
+
+
+def block_digest(block):
+    """Hash of a block's kind and normalized body; equal digests mean interchangeable definitions"""
+    return hashlib.blake2b(f"{block.kind}\n{block.normalized()}".encode(), digest_size=16).hexdigest()
+
+
+def base_type(type_):
+    """Field type without ? / [] modifiers; None for Unsupported("...")"""
+    if type_ is None or type_.startswith('Unsupported('):
+        return None
+    return type_.rstrip('?').removesuffix('[]')
+
+
+def _relation_lists(args):
+    lists = {}
+    for key, names in _RELATION_LIST.findall(args or ''):
+        lists[key] = [n.strip() for n in names.split(',') if n.strip()]
+    return lists
+
+
+def check(schema):
+    """
+    Scan a parsed schema for duplicate, conflicting and dangling definitions.
+
+    Returns:
+        Dict with duplicates, conflicts and dangling lists
+    """
+    report = {"duplicates": [], "conflicts": [], "dangling": []}
+    # Only names the index has seen more than once can collide, so only those blocks are hashed
+    for name, blocks in schema.duplicates().items():
+        original = blocks[0]
+        original_digest = block_digest(original)
+        for block in blocks[1:]:
+            issue = {"kind": block.kind, "name": name, "line": block.line, "first_line": original.line}
+            if block_digest(block) == original_digest:
+                report["duplicates"].append(issue)
+            else:
+                report["conflicts"].append(issue)
+    report["duplicates"].sort(key=lambda issue: issue["line"])
+    report["conflicts"].sort(key=lambda issue: issue["line"])
+
+    first = {name: blocks[0] for name, blocks in schema.index.items()}
+    for block in first.values():
+        if block.kind not in ('model', 'view', 'type'):
+            continue
+        fields = block.fields
+        own_fields = {f.name for f in fields}
+        for field in fields:
+            target = base_type(field.type)
+            if target is None or target in SCALAR_TYPES:
+                continue
+            relation = next((a for a in field.attributes if a.name == '@relation'), None)
+            issue = {"model": block.name, "field": field.name, "target": target, "line": field.line}
+            if target not in first:
+                report["dangling"].append(dict(issue, reason="unknown type"))
+                continue
+            if relation is None:
+                continue
+            lists = _relation_lists(relation.args)
+            target_fields = {f.name for f in first[target].fields}
+            missing = [n for n in lists.get("fields", []) if n not in own_fields]
+            if missing:
+                report["dangling"].append(dict(issue, reason=f"fields not on {block.name}: {', '.join(missing)}"))
+            missing = [n for n in lists.get("references", []) if n not in target_fields]
+            if missing:
+                report["dangling"].append(dict(issue, reason=f"references not on {target}: {', '.join(missing)}"))
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Find duplicate, conflicting and dangling schema definitions')
+    parser.add_argument('schema', nargs='?', default=DEFAULT_SCHEMA, help='Schema file')
+    parser.add_argument('--fix', action='store_true', help='Remove exact duplicate blocks (conflicts are kept)')
+    parser.add_argument('--json', action='store_true', help='Emit machine-readable JSON')
+
+    args = parser.parse_args()
+    if args.fix:
+        # Keep stdout parseable in --json mode
+        with contextlib.redirect_stdout(sys.stderr if args.json else sys.stdout):
+            status = run_transforms([Dedupe(identical_only=True)], args.schema)
+        if status:
+            return status
+
+    try:
+        schema = load(args.schema)
+    except (OSError, ValueError) as e:
+        print(json.dumps({"success": False, "error": str(e)}) if args.json else f"Error: {e}", file=sys.stderr)
+        return 1
+    report = check(schema)
+    found = sum(len(issues) for issues in report.values())
+
+    if args.json:
+        print(json.dumps(dict(report, success=not found), indent=2))
+    else:
+        for issue in report["duplicates"]:
+            print(f"duplicate {issue['kind']} {issue['name']} at line {issue['line']} "
+                  f"(identical to line {issue['first_line']})")
+        for issue in report["conflicts"]:
+            print(f"conflict {issue['kind']} {issue['name']} at line {issue['line']} "
+                  f"(differs from line {issue['first_line']})")
+        for issue in report["dangling"]:
+            print(f"dangling {issue['model']}.{issue['field']} -> {issue['target']} at line {issue['line']}: "
+                  f"{issue['reason']}")
+        print(f"{len(schema.blocks)} blocks checked, {found} issue(s)")
+    return 1 if found else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
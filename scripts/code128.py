@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+Code128 rendering for lab barcodes
+
+Encodes text with code set B, switching to code set C for runs of four or
+more digits (the date/time, patient and sequence parts of a lab barcode),
+and renders the symbol as SVG, as a 1-bit PNG (bars only) or as a printable
+multi-page PDF label sheet.
+
+Barcodes are encoded per "-" separated segment and every segment's symbol
+values, bar widths and SVG/PDF/PNG fragments are cached, so repeated parts
+such as the lab code, today's date and common test codes are encoded once
+per process. Fragments use relative coordinates and are simply joined.
+
+Usage:
+    python3 scripts/code128.py LAB-261017013433-000001-CBC-0001-5 --format svg -o label.svg
+    python3 scripts/code128.py LAB-261017013433-000001-CBC-0001-5 --format png --module 3 -o label.png
+    python3 scripts/generate_barcode.py --bulk --sheet labels.pdf < orders.jsonl
+"""
+
+import sys
+import zlib
+import struct
+import argparse
+from html import escape
+from functools import lru_cache
+from collections import namedtuple
+
+# Bar/space widths of symbol values 0-106 (103-105 are the start codes, 106 is stop)
+PATTERNS = (
+    '212222', '222122', '222221', '121223', '121322', '131222', '122213', '122312', '132212', '221213',
+    '221312', '231212', '112232', '122132', '122231', '113222', '123122', '123221', '223211', '221132',
+    '221231', '213212', '223112', '312131', '311222', '321122', '321221', '312212', '322112', '322211',
+    '212123', '212321', '232121', '111323', '131123', '131321', '112313', '132113', '132311', '211313',
+    '231113', '231311', '112133', '112331', '132131', '113123', '113321', '133121', '313121', '211331',
+    '231131', '213113', '213311', '213131', '311123', '311321', '331121', '312113', '312311', '332111',
+    '314111', '221411', '431111', '111224', '111422', '121124', '121421', '141122', '141221', '112214',
+    '112412', '122114', '122411', '142112', '142211', '241211', '221114', '413111', '241112', '134111',
+    '111242', '121142', '121241', '114212', '124112', '124211', '411212', '421112', '421211', '212141',
+    '214121', '412121', '111143', '111341', '131141', '114113', '114311', '411113', '411311', '113141',
+    '114131', '311141', '411131', '211412', '211214', '211232', '2331112',
+)
+# Widths as tuples of ints, looked up per symbol
+WIDTHS = tuple(tuple(int(w) for w in pattern) for pattern in PATTERNS)
+
+CODE_C = 99
+CODE_B = 100
+START_B = 104
+START_C = 105
+STOP = 106
+
+# Modules of white space required on both sides of the symbol
+QUIET_ZONE = 10
+
+# Digit runs at least this long are worth switching to code set C
+MIN_DIGIT_RUN = 4
+
+Segment = namedtuple('Segment', 'values end_mode width svg pdf bits')
+
+# Label sheet geometry in PDF points (1/72 inch); the default is 2 x 8
+# labels of 99.1 x 33.9 mm on A4
+SheetLayout = namedtuple('SheetLayout', 'page_width page_height columns rows label_width label_height '
+                                        'margin_left margin_top gap_x gap_y padding')
+A4_2X8 = SheetLayout(595.28, 841.89, 2, 8, 280.9, 96.1, 13.2, 36.6, 7.1, 0.0, 8.0)
+
+
+def _encode(text, mode):
+    """Symbol values for text starting in mode (None, 'B' or 'C'); returns (values, end mode)"""
+    values = []
+    i, n = 0, len(text)
+    while i < n:
+        run = i
+        while run < n and text[run].isdigit() and text[run].isascii():
+            run += 1
+        digits = run - i
+        if digits >= MIN_DIGIT_RUN or (mode == 'C' and digits >= 2):
+            if mode != 'C' and digits % 2:
+                # Odd run: first digit in code set B, the even rest in C
+                if mode is None:
+                    values.append(START_B)
+                values.append(ord(text[i]) - 32)
+                mode = 'B'
+                i += 1
+                digits -= 1
+            if mode != 'C':
+                values.append(START_C if mode is None else CODE_C)
+                mode = 'C'
+            for j in range(i, i + digits - digits % 2, 2):
+                values.append(int(text[j:j + 2]))
+            i += digits - digits % 2
+            continue
+
+        if mode != 'B':
+            values.append(START_B if mode is None else CODE_B)
+            mode = 'B'
+        code = ord(text[i]) - 32
+        if not 0 <= code <= 95:
+            raise ValueError(f"Character {text[i]!r} cannot be encoded in Code128 set B")
+        values.append(code)
+        i += 1
+    return values, mode
+
+
+def _fragments(values):
+    """Width in modules plus SVG path, PDF rect and bit-string fragments for a run of symbols"""
+    svg, pdf, bits = [], [], []
+    x = 0
+    for value in values:
+        for k, w in enumerate(WIDTHS[value]):
+            if k % 2 == 0:
+                svg.append(f"h{w}")
+                pdf.append(f"{x} 0 {w} 1 re")
+                bits.append('1' * w)
+            else:
+                svg.append(f"m{w},0")
+                bits.append('0' * w)
+            x += w
+    return x, ''.join(svg), ' '.join(pdf), ''.join(bits)
+
+
+@lru_cache(maxsize=4096)
+def encode_segment(segment, mode):
+    """Cached encoding and fragments of one barcode segment starting in mode"""
+    values, end_mode = _encode(segment, mode)
+    return Segment(tuple(values), end_mode, *_fragments(values))
+
+
+def segments(text):
+    """Split text before each '-', so separators travel with the part that follows"""
+    parts = text.split('-')
+    return [parts[0]] + ['-' + part for part in parts[1:]]
+
+
+def symbol(text):
+    """
+    Encode text as a Code128 symbol.
+
+    Returns:
+        List of Segment, the last one holding the checksum and stop symbols
+    """
+    if not text:
+        raise ValueError("Nothing to encode")
+    encoded = []
+    mode = None
+    for part in segments(text):
+        if part:
+            segment = encode_segment(part, mode)
+            encoded.append(segment)
+            mode = segment.end_mode
+
+    checksum = 0
+    position = 0
+    for segment in encoded:
+        for value in segment.values:
+            checksum += value * (position or 1)
+            position += 1
+    tail = (checksum % 103, STOP)
+    encoded.append(Segment(tail, mode, *_fragments(tail)))
+    return encoded
+
+
+def symbol_values(text):
+    """All symbol values, start code through stop"""
+    return [value for segment in symbol(text) for value in segment.values]
+
+
+def symbol_width(encoded):
+    """Width in modules including both quiet zones"""
+    return sum(segment.width for segment in encoded) + 2 * QUIET_ZONE
+
+
+def render_svg(text, module=2, height=60, human_readable=True, caption=None):
+    """
+    SVG of the symbol, with the text (and an optional caption) underneath.
+
+    Args:
+        module: Rendered width of one module in px
+        height: Bar height in modules
+    """
+    encoded = symbol(text)
+    width = symbol_width(encoded)
+    font = 10
+    text_rows = (1 if human_readable else 0) + (1 if caption else 0)
+    total_height = height + text_rows * (font + 2) + (4 if text_rows else 0)
+    path = f"M{QUIET_ZONE},{height / 2}" + ''.join(segment.svg for segment in encoded)
+
+    out = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width * module}" height="{total_height * module}" '
+        f'viewBox="0 0 {width} {total_height}">',
+        f'<rect width="{width}" height="{total_height}" fill="#fff"/>',
+        f'<path d="{path}" stroke="#000" stroke-width="{height}"/>',
+    ]
+    y = height + 2
+    for line in ([text] if human_readable else []) + ([caption] if caption else []):
+        y += font
+        out.append(f'<text x="{width / 2}" y="{y}" font-family="monospace" font-size="{font}" '
+                   f'text-anchor="middle">{escape(line)}</text>')
+        y += 2
+    out.append('</svg>')
+    return '\n'.join(out) + '\n'
+
+
+def _png_chunk(kind, data):
+    chunk = kind + data
+    return struct.pack('>I', len(data)) + chunk + struct.pack('>I', zlib.crc32(chunk))
+
+
+def render_png(text, module=2, height=60):
+    """1-bit grayscale PNG of the bars (no human-readable text), `module` px per module"""
+    encoded = symbol(text)
+    quiet = '0' * QUIET_ZONE
+    modules = quiet + ''.join(segment.bits for segment in encoded) + quiet
+    pixels = modules.translate({ord('0'): '0' * module, ord('1'): '1' * module})
+    width = len(pixels)
+    # PNG grayscale 1-bit: 0 is black, so bars (1) are inverted; rows are padded to bytes
+    padded = pixels + '0' * (-width % 8)
+    row = b'\x00' + (~int(padded, 2) & ((1 << len(padded)) - 1)).to_bytes(len(padded) // 8, 'big')
+    raw = row * (height * module)
+    header = struct.pack('>IIBBBBB', width, height * module, 1, 0, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + _png_chunk(b'IHDR', header) +
+            _png_chunk(b'IDAT', zlib.compress(raw, 6)) + _png_chunk(b'IEND', b''))
+
+
+def _pdf_text(value):
+    value = value.encode('latin-1', 'replace').decode('latin-1')
+    return value.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def _label_ops(text, caption, x, y, layout):
+    """PDF content operators for one label whose bottom-left corner is (x, y)"""
+    encoded = symbol(text)
+    modules = symbol_width(encoded)
+    usable = layout.label_width - 2 * layout.padding
+    module = usable / modules
+    font = 7
+    text_height = font + 2 + (font + 1 if caption else 0)
+    bar_height = layout.label_height - 2 * layout.padding - text_height
+    bars_x = x + layout.padding + QUIET_ZONE * module
+    bars_y = y + layout.padding + text_height
+
+    ops = [f"q 1 0 0 1 {bars_x:.2f} {bars_y:.2f} cm {module:.4f} 0 0 {bar_height:.2f} 0 0 cm"]
+    for segment in encoded:
+        # Fragments are relative to the segment start; move the origin past each one
+        ops.append(f"{segment.pdf} f 1 0 0 1 {segment.width} 0 cm")
+    ops.append("Q")
+
+    centre = x + layout.label_width / 2
+    line_y = y + layout.padding + text_height - font - 1
+    for line, size in ((text, font), (caption, font - 1)):
+        if line:
+            # Helvetica averages about half an em per character
+            ops.append(f"BT /F1 {size} Tf {centre - len(line) * size * 0.27:.2f} {line_y:.2f} Td "
+                       f"({_pdf_text(line)}) Tj ET")
+            line_y -= size + 1
+    return '\n'.join(ops)
+
+
+def render_pdf_sheet(labels, layout=A4_2X8):
+    """
+    Lay labels out on as many sheet pages as needed, in one PDF document.
+
+    Args:
+        labels: Iterable of (barcode text, caption or None)
+
+    Returns:
+        PDF file contents
+    """
+    per_page = layout.columns * layout.rows
+    pages = []
+    ops = []
+    for index, (text, caption) in enumerate(labels):
+        slot = index % per_page
+        if slot == 0 and ops:
+            pages.append(ops)
+            ops = []
+        column, row = slot % layout.columns, slot // layout.columns
+        x = layout.margin_left + column * (layout.label_width + layout.gap_x)
+        y = layout.page_height - layout.margin_top - (row + 1) * layout.label_height - row * layout.gap_y
+        ops.append(_label_ops(text, caption, x, y, layout))
+    if ops or not pages:
+        pages.append(ops)
+
+    objects = [None, None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"]
+    kids = []
+    for page_ops in pages:
+        stream = zlib.compress('\n'.join(page_ops).encode('latin-1'), 6)
+        objects.append(b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_id = len(objects)
+        objects.append(
+            (f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {layout.page_width} {layout.page_height}] "
+             f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>").encode())
+        kids.append(f"{len(objects)} 0 R")
+    objects[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>".encode()
+
+    out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Render a Code128 barcode')
+    parser.add_argument('text', help='Text to encode')
+    parser.add_argument('--format', '-f', choices=['svg', 'png', 'pdf'], default='svg', help='Output format')
+    parser.add_argument('--output', '-o', help='Output file (default: stdout)')
+    parser.add_argument('--module', type=int, default=2, help='Module width in px (SVG/PNG)')
+    parser.add_argument('--height', type=int, default=60, help='Bar height in modules (SVG/PNG)')
+    parser.add_argument('--caption', help='Extra line under the barcode text (SVG/PDF)')
+
+    args = parser.parse_args()
+    try:
+        if args.format == 'svg':
+            data = render_svg(args.text, args.module, args.height, caption=args.caption).encode()
+        elif args.format == 'png':
+            data = render_png(args.text, args.module, args.height)
+        else:
+            data = render_pdf_sheet([(args.text, args.caption)])
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    if args.output:
+        with open(args.output, 'wb') as f:
+            f.write(data)
+    else:
+        sys.stdout.buffer.write(data)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
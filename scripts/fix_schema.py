@@ -1,103 +1,74 @@
-import os
-
-schema_path = 'prisma/schema.prisma'
-
-with open(schema_path, 'r') as f:
-    lines = f.readlines()
-
-def find_nth_occurrence(lines, content, n):
-    count = 0
-    for i, line in enumerate(lines):
-        if content in line:
-            count += 1
-            if count == n:
-                return i
-    return -1
-
-# Find 2nd 'model NurseDuty'
-start_delete = find_nth_occurrence(lines, 'model NurseDuty {', 2)
-if start_delete == -1:
-    print("Could not find 2nd occurrence of 'model NurseDuty'")
-    # Try finding first occurrence just in case it's not duplicated but something else is wrong?
-    # Or maybe it's 'model NurseDuty {' with spaces?
-    # Let's try looser match
-    start_delete = find_nth_occurrence(lines, 'model NurseDuty', 2)
-
-if start_delete == -1:
-    print("Error: Could not find 2nd 'model NurseDuty'. Maybe already fixed?")
-    exit(1)
-
-print(f"Start delete (duplicate NurseDuty) at line {start_delete + 1}")
-
-# Find 2nd 'model PatientImplant'
-implant_start = find_nth_occurrence(lines, 'model PatientImplant', 2)
-if implant_start == -1:
-    print("Error: Could not find 2nd 'model PatientImplant'")
-    exit(1)
-
-print(f"Duplicate PatientImplant starts at line {implant_start + 1}")
-
-# Find closing brace for PatientImplant
-end_delete = -1
-for i in range(implant_start, len(lines)):
-    if lines[i].strip() == '}':
-        end_delete = i
-        break
+#!/usr/bin/env python3
+"""
+Repair prisma/schema.prisma after the NurseDuty..PatientImplant models were
+pasted in twice, and add the ClaimCommunication model after InsuranceClaim.
+
+Both steps are declarative transforms (see prisma_schema.py): duplicates are
+found by block name rather than by line number, and the insert is skipped
+when ClaimCommunication already exists, so running this again is a no-op.
+Only exact repeats are removed; a block redefined with a different body is
+kept, reported as a conflict (as check_schema.py does) and makes the script
+exit 1 until it is resolved by hand.
+
+Usage:
+    python3 scripts/fix_schema.py [schema] [--dry-run]
+"""
 
-if end_delete == -1:
-    print("Error: Could not find closing brace for duplicate PatientImplant")
-    exit(1)
-
-print(f"End delete at line {end_delete + 1}")
-
-# Check content after end_delete
-# It should be close to 'enum EncounterType' or 'enum Gender' etc if those were preserved in original
-# In 1st copy, PatientImplant is typically followed by Enums if they are at end.
-# In duplicated copy, it might be followed by 'enum EncounterType' if that was also duplicated? 
-# Or if duplication stopped there.
-
-# We will cut from start_delete to end_delete (inclusive)
-# So new lines = lines[:start_delete] + lines[end_delete+1:]
-
-new_lines = lines[:start_delete] + lines[end_delete+1:]
-
-# Insert ClaimCommunication
-insert_idx = -1
-for i, line in enumerate(new_lines):
-    if 'model InsuranceClaim' in line:
-        for j in range(i, len(new_lines)):
-            if new_lines[j].strip() == '}':
-                insert_idx = j + 1
-                break
-        break
-
-if insert_idx != -1:
-    print(f"Inserting ClaimCommunication after line {insert_idx}")
-    communication_model = [
-        '\n',
-        'model ClaimCommunication {\n',
-        '  id              String            @id @default(uuid())\n',
-        '  claimId         String?\n',
-        '  preAuthId       String?\n',
-        '  senderId        String\n',
-        '  senderName      String\n',
-        '  senderRole      String\n',
-        '  message         String\n',
-        '  sentAt          DateTime          @default(now())\n',
-        '  isInternal      Boolean           @default(false)\n',
-        '  attachments     String[]\n',
-        '  insuranceClaim  InsuranceClaim?   @relation(fields: [claimId], references: [id])\n',
-        '  preAuth         PreAuthorization? @relation(fields: [preAuthId], references: [id])\n',
-        '\n',
-        '  @@index([claimId])\n',
-        '  @@index([preAuthId])\n',
-        '}\n'
-    ]
-    new_lines[insert_idx:insert_idx] = communication_model
-else:
-    print("Error: Could not find InsuranceClaim model")
-
-with open(schema_path, 'w') as f:
-    f.writelines(new_lines)
-
-print("Schema fixed successfully")
+import os
+import sys
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from prisma_schema import DEFAULT_SCHEMA, Dedupe, InsertAfter, load, run_transforms  # noqa: E402
+from check_schema import check  # noqa: E402
+
+CLAIM_COMMUNICATION = """
+model ClaimCommunication {
+  id              String            @id @default(uuid())
+  claimId         String?
+  preAuthId       String?
+  senderId        String
+  senderName      String
+  senderRole      String
+  message         String
+  sentAt          DateTime          @default(now())
+  isInternal      Boolean           @default(false)
+  attachments     String[]
+  insuranceClaim  InsuranceClaim?   @relation(fields: [claimId], references: [id])
+  preAuth         PreAuthorization? @relation(fields: [preAuthId], references: [id])
+
+  @@index([claimId])
+  @@index([preAuthId])
+}
+"""
+
+TRANSFORMS = [
+    Dedupe(identical_only=True),
+    InsertAfter('InsuranceClaim', CLAIM_COMMUNICATION),
+]
+
+
+def main(description=__doc__.strip().split('\n')[0]):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('schema', nargs='?', default=DEFAULT_SCHEMA, help='Schema file')
+    parser.add_argument('--dry-run', action='store_true', help='Print the planned edits without writing')
+
+    args = parser.parse_args()
+    status = run_transforms(TRANSFORMS, args.schema, write=not args.dry_run)
+    if status:
+        return status
+
+    # Line numbers refer to the file as it is now, i.e. after the write
+    conflicts = check(load(args.schema))["conflicts"]
+    for issue in conflicts:
+        print(f"conflict {issue['kind']} {issue['name']} at line {issue['line']} "
+              f"(differs from line {issue['first_line']}), kept")
+    if conflicts:
+        print(f"{len(conflicts)} conflicting definition(s) left for a human to resolve", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,56 @@
 """
 Lab Barcode Generator - Generates unique barcodes with checksum for lab samples
-Uses Code128 standard with institution prefix, date encoding, and sequence number
+Uses Code128 standard with institution prefix, date encoding, and sequence number;
+--render draws the symbol as SVG or PNG and --bulk --sheet lays a whole batch
+out on one printable PDF label sheet (see code128.py)
+
+Bulk mode (--bulk) reads JSON lines of {"order_id", "lab_code", "patient_id",
+"test_code"} on stdin, allocates consecutive sequences starting at
+--sequence and writes one barcode record per line to stdout. Without
+--sequence, sequences come from the shared daily allocator in
+barcode_sequence.py (bulk mode leases them in blocks of --lease).
+
+Reconciliation mode (--reconcile) streams scanned barcodes (one per line,
+or the JSON lines --bulk writes) from a file or stdin, checks them in
+batches with lookup tables (vectorized with NumPy when installed) and
+prints only the exceptions - malformed, bad check digit, duplicate scan,
+not from --day - followed by a summary line.
+
+Usage:
+    python3 scripts/generate_barcode.py -p UHID-123456 -t CBC -s 12
+    python3 scripts/generate_barcode.py -p UHID-123456 -t CBC
+    python3 scripts/generate_barcode.py --bulk --sequence 101 < orders.jsonl
+    python3 scripts/generate_barcode.py --bulk --lease 64 < orders.jsonl
+    python3 scripts/generate_barcode.py -p UHID-123456 -t CBC --render svg -o label.svg
+    python3 scripts/generate_barcode.py --bulk --sheet labels.pdf < orders.jsonl
+    python3 scripts/generate_barcode.py --bulk --index data/barcode_index < orders.jsonl
+    python3 scripts/generate_barcode.py --reconcile scans.txt --day 261017
 """
 
+import os
 import sys
 import json
 import hashlib
 from datetime import datetime
+from functools import lru_cache
 import argparse
 
+try:
+    import numpy as np
+except ImportError:  # Reconciliation checks batches with bytes tables instead
+    np = None
+
+# Luhn contribution of a doubled digit
+_DOUBLED = [sum(divmod(d * 2, 10)) for d in range(10)]
+
+# Luhn contribution of ord(c) % 10 for every byte, as is and doubled
+_PLAIN_TABLE = bytes(b % 10 for b in range(256))
+_DOUBLED_TABLE = bytes(_DOUBLED[b % 10] for b in range(256))
+
+# Scans checked per batch in reconciliation, and the batch size worth NumPy
+RECONCILE_CHUNK = 4096
+NUMPY_MIN_BATCH = 64
+
 
 def calculate_check_digit(barcode_data: str) -> str:
     """Calculate Luhn check digit for barcode validation"""
@@ -28,11 +70,145 @@ def calculate_check_digit(barcode_data: str) -> str:
     return str(luhn_checksum(numeric_str))
 
 
+def fast_check_digit(barcode_data: str) -> str:
+    """calculate_check_digit() through byte lookup tables, without intermediate strings"""
+    try:
+        data = barcode_data.encode('ascii')
+    except UnicodeEncodeError:
+        return calculate_check_digit(barcode_data)
+    total = sum(data[-1::-2].translate(_PLAIN_TABLE)) + sum(data[-2::-2].translate(_DOUBLED_TABLE))
+    return str((10 - total % 10) % 10)
+
+
+def check_digits_ok(compacts: list) -> list:
+    """
+    Check a batch of separator-free barcodes (base + one check digit).
+
+    Equal-length ASCII barcodes are checked together with NumPy when it is
+    installed and the batch is large enough; otherwise per barcode with the
+    lookup tables.
+
+    Returns:
+        List of booleans, one per barcode
+    """
+    if np is None or len(compacts) < NUMPY_MIN_BATCH:
+        return [len(c) > 1 and fast_check_digit(c[:-1]) == c[-1] for c in compacts]
+
+    ok = [False] * len(compacts)
+    by_length = {}
+    for i, compact in enumerate(compacts):
+        if len(compact) > 1 and compact.isascii():
+            by_length.setdefault(len(compact), []).append(i)
+        elif len(compact) > 1:
+            ok[i] = calculate_check_digit(compact[:-1]) == compact[-1]
+
+    doubled_lookup = np.asarray(_DOUBLED, dtype=np.uint8)
+    for length, indices in by_length.items():
+        rows = np.frombuffer(''.join(compacts[i] for i in indices).encode('ascii'), dtype=np.uint8)
+        rows = rows.reshape(len(indices), length)
+        digits = rows[:, :-1] % 10
+        # Every second digit counting from the right of the base is doubled
+        doubled = (np.arange(length - 1)[::-1] % 2).astype(bool)
+        digits[:, doubled] = doubled_lookup[digits[:, doubled]]
+        expected = (10 - digits.sum(axis=1, dtype=np.int64) % 10) % 10 + ord('0')
+        for i, good in zip(indices, (expected == rows[:, -1]).tolist()):
+            ok[i] = good
+    return ok
+
+
+def _luhn_partial(data: str, offset: int) -> int:
+    """Luhn sum over ord(c) % 10 of data's characters when `offset` digits follow it"""
+    total = 0
+    for i, c in enumerate(reversed(data), start=offset):
+        d = ord(c) % 10
+        total += _DOUBLED[d] if i % 2 else d
+    return total
+
+
+@lru_cache(maxsize=4096)
+def normalize_patient_id(patient_id: str) -> str:
+    """Last six digits of a UHID, zero padded"""
+    return ''.join(c for c in patient_id if c.isdigit())[-6:].zfill(6)
+
+
+class BarcodeBatch:
+    """
+    Generates barcodes for many orders, allocating consecutive sequences.
+
+    Timestamp strings, normalized patient IDs and the Luhn sum of each
+    barcode prefix are computed once and reused across the batch; records
+    match generate_barcode() field for field. With an allocator
+    (barcode_sequence.SequenceAllocator) sequences are drawn from it per lab
+    code and day instead of counting up from start_sequence.
+    """
+
+    def __init__(self, start_sequence: int = 1, timestamp: datetime = None, allocator=None):
+        self.sequence = start_sequence
+        self.timestamp = timestamp
+        self.allocator = allocator
+        self._stamps = {}
+        self._prefix_sums = {}
+
+    def _stamp(self, timestamp: datetime):
+        stamp = self._stamps.get(timestamp)
+        if stamp is None:
+            stamp = (timestamp.strftime('%y%m%d'), timestamp.strftime('%H%M%S'), timestamp.isoformat())
+            self._stamps[timestamp] = stamp
+        return stamp
+
+    def _check_digit(self, prefix: str, seq_str: str) -> str:
+        # Same result as calculate_check_digit(prefix + seq_str)
+        key = (prefix, len(seq_str) % 2)
+        total = self._prefix_sums.get(key)
+        if total is None:
+            total = self._prefix_sums[key] = _luhn_partial(prefix, len(seq_str))
+        total += _luhn_partial(seq_str, 0)
+        return str((10 - total % 10) % 10)
+
+    def generate(self, lab_code: str, patient_id: str, test_code: str, sequence: int = None,
+                 timestamp: datetime = None) -> dict:
+        """Barcode record for one order; takes the next sequence unless one is given"""
+        timestamp = timestamp or self.timestamp or datetime.now()
+        if sequence is None and self.allocator is not None:
+            sequence = self.allocator.next(lab_code, timestamp.date())
+        elif sequence is None:
+            sequence = self.sequence
+            self.sequence += 1
+        date_str, time_str, generated_at = self._stamp(timestamp)
+        patient_short = normalize_patient_id(patient_id)
+        test = test_code.upper()[:4]
+        seq_str = str(sequence).zfill(4)
+
+        check_digit = self._check_digit(f"{lab_code}{date_str}{time_str}{patient_short}{test}", seq_str)
+        barcode = f"{lab_code}-{date_str}{time_str}-{patient_short}-{test}-{seq_str}-{check_digit}"
+
+        hash_input = f"{barcode}{generated_at}"
+        unique_hash = hashlib.sha256(hash_input.encode()).hexdigest()[:8].upper()
+
+        return {
+            "barcode": barcode,
+            "barcode_compact": barcode.replace("-", ""),
+            "components": {
+                "lab_code": lab_code,
+                "date": date_str,
+                "time": time_str,
+                "patient_id": patient_short,
+                "test_code": test,
+                "sequence": seq_str,
+                "check_digit": check_digit
+            },
+            "verification_hash": unique_hash,
+            "generated_at": generated_at,
+            # The check digit is right by construction, only separators in the inputs can break it
+            "is_valid": barcode.count("-") == 5
+        }
+
+
 def generate_barcode(
     lab_code: str,
     patient_id: str,
     test_code: str,
-    sequence: int,
+    sequence: int = None,
     timestamp: datetime = None
 ) -> dict:
     """
@@ -44,84 +220,273 @@ def generate_barcode(
         lab_code: LAB or RAD
         patient_id: Patient UHID (e.g., UHID-123456)
         test_code: Test code (e.g., CBC, LFT)
-        sequence: Sequential number for the day
+        sequence: Sequential number for the day (allocated from barcode_sequence when None)
         timestamp: Optional timestamp (defaults to now)
     
     Returns:
         Dictionary with barcode and metadata
     """
-    if timestamp is None:
-        timestamp = datetime.now()
-    
-    # Clean patient ID - extract numeric portion
-    patient_short = ''.join(c for c in patient_id if c.isdigit())[-6:].zfill(6)
-    
-    # Date/time components
-    date_str = timestamp.strftime('%y%m%d')
-    time_str = timestamp.strftime('%H%M%S')
-    
-    # Sequence padded to 4 digits
-    seq_str = str(sequence).zfill(4)
-    
-    # Build barcode base (without check digit)
-    barcode_base = f"{lab_code}{date_str}{time_str}{patient_short}{test_code.upper()[:4]}{seq_str}"
-    
-    # Calculate check digit
-    check_digit = calculate_check_digit(barcode_base)
-    
-    # Final barcode with separators for readability
-    barcode = f"{lab_code}-{date_str}{time_str}-{patient_short}-{test_code.upper()[:4]}-{seq_str}-{check_digit}"
-    
-    # Generate a unique hash for additional verification
-    hash_input = f"{barcode}{timestamp.isoformat()}"
-    unique_hash = hashlib.sha256(hash_input.encode()).hexdigest()[:8].upper()
-    
-    return {
-        "barcode": barcode,
-        "barcode_compact": barcode.replace("-", ""),
-        "components": {
-            "lab_code": lab_code,
-            "date": date_str,
-            "time": time_str,
-            "patient_id": patient_short,
-            "test_code": test_code.upper()[:4],
-            "sequence": seq_str,
-            "check_digit": check_digit
-        },
-        "verification_hash": unique_hash,
-        "generated_at": timestamp.isoformat(),
-        "is_valid": validate_barcode(barcode)
-    }
+    allocator = None
+    if sequence is None:
+        from barcode_sequence import get_allocator
+        allocator = get_allocator()
+    return BarcodeBatch(allocator=allocator).generate(lab_code, patient_id, test_code, sequence, timestamp)
+
+
+def generate_bulk(lines, start_sequence: int = 1, default_lab_code: str = 'LAB', timestamp: datetime = None,
+                  allocator=None):
+    """
+    Generate barcodes for JSON lines of orders, one record per input line.
+
+    Each line holds order_id, lab_code (optional), patient_id (or uhid) and
+    test_code. Valid orders take consecutive sequences from start_sequence,
+    or from allocator when given; bad lines yield an error record and do not
+    use up a sequence.
+
+    Yields:
+        {"order_id", ...barcode record} or {"line", "order_id", "error"}
+    """
+    batch = BarcodeBatch(start_sequence, timestamp or datetime.now(), allocator)
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        order_id = None
+        try:
+            order = json.loads(line)
+            order_id = order.get('order_id')
+            patient_id = order.get('patient_id') or order.get('uhid')
+            test_code = order.get('test_code')
+            if not patient_id or not test_code:
+                raise ValueError("patient_id and test_code are required")
+            lab_code = str(order.get('lab_code') or default_lab_code).upper()
+            record = batch.generate(lab_code, str(patient_id), str(test_code))
+        except (ValueError, AttributeError) as e:
+            yield {"line": number, "order_id": order_id, "error": str(e)}
+            continue
+        yield {"order_id": order_id, **record}
 
 
 def validate_barcode(barcode: str) -> bool:
     """Validate a barcode's check digit"""
-    try:
-        # Remove separators
-        parts = barcode.split("-")
-        if len(parts) != 6:
-            return False
-        
-        # Reconstruct base (without check digit)
-        check_digit = parts[-1]
-        barcode_base = "".join(parts[:-1])
-        
-        # Verify check digit
-        calculated = calculate_check_digit(barcode_base)
-        return calculated == check_digit
-    except Exception:
+    if not isinstance(barcode, str) or barcode.count("-") != 5:
         return False
+    # Base is everything before the last separator, without separators
+    head, _, check_digit = barcode.rpartition("-")
+    return fast_check_digit(head.replace("-", "")) == check_digit
+
+
+def index_records(records, directory: str = None) -> int:
+    """Add issued barcode records to the issued-barcode index (see barcode_index.py)"""
+    from barcode_index import BarcodeIndex, DEFAULT_DIR
+    index = BarcodeIndex(directory or DEFAULT_DIR)
+    try:
+        return index.add(records)
+    finally:
+        index.close()
+
+
+def label_caption(record: dict) -> str:
+    """Line printed under the barcode text on a label"""
+    components = record["components"]
+    return f"{components['patient_id']}  {components['test_code']}"
+
+
+def render_label(record: dict, fmt: str, path: str) -> None:
+    """Write the record's barcode as an SVG or PNG label"""
+    from code128 import render_svg, render_png
+    if fmt == 'svg':
+        data = render_svg(record["barcode"], caption=label_caption(record)).encode()
+    else:
+        data = render_png(record["barcode"])
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def _scanned(line: str) -> str:
+    """Barcode from a scan line: plain text, or a JSON record with a "barcode" field"""
+    line = line.strip()
+    if line.startswith("{"):
+        try:
+            return str(json.loads(line).get("barcode", ""))
+        except (ValueError, AttributeError):
+            return line
+    return line
+
+
+def reconcile(lines, out, day: str = None, chunk_size: int = RECONCILE_CHUNK) -> dict:
+    """
+    Reconcile scanned barcodes, writing one JSON line per exception to out.
+
+    Args:
+        lines: Iterable of scan lines
+        out: Text stream for exception records
+        day: Expected YYMMDD date component, or None to accept any day
+
+    Returns:
+        Summary with scan counts, issue counts and per-lab sequence ranges
+    """
+    issue_counts = {"malformed": 0, "bad_check_digit": 0, "duplicate": 0, "out_of_day": 0}
+    labs = {}
+    first_seen = {}
+    scanned = 0
+    valid = 0
+
+    def flush(batch):
+        nonlocal valid
+        # One split per scan gives every component; the checks run over the whole batch
+        parts = [barcode.split("-") for _, barcode in batch]
+        well_formed = [len(p) == 6 and len(p[5]) == 1 for p in parts]
+        checks = check_digits_ok([''.join(p) for p, ok in zip(parts, well_formed) if ok])
+        checks = iter(checks)
+
+        for (number, barcode), p, formed in zip(batch, parts, well_formed):
+            issues = []
+            if not formed:
+                issues.append("malformed")
+            elif not next(checks):
+                issues.append("bad_check_digit")
+            if barcode in first_seen:
+                issues.append("duplicate")
+            else:
+                first_seen[barcode] = number
+            if formed and day is not None and p[1][:6] != day:
+                issues.append("out_of_day")
+
+            if not issues:
+                valid += 1
+            # Sequence ranges cover every genuine tube, whatever its day
+            if formed and p[4].isdigit() and issues in ([], ["out_of_day"]):
+                sequence = int(p[4])
+                lab = labs.get(p[0])
+                if lab is None:
+                    labs[p[0]] = {"count": 1, "min_sequence": sequence, "max_sequence": sequence}
+                else:
+                    lab["count"] += 1
+                    lab["min_sequence"] = min(sequence, lab["min_sequence"])
+                    lab["max_sequence"] = max(sequence, lab["max_sequence"])
+            if issues:
+                for issue in issues:
+                    issue_counts[issue] += 1
+                record = {"line": number, "barcode": barcode, "issues": issues}
+                if "duplicate" in issues:
+                    record["first_line"] = first_seen[barcode]
+                out.write(json.dumps(record, separators=(',', ':')) + '\n')
+
+    batch = []
+    for number, line in enumerate(lines, start=1):
+        barcode = _scanned(line)
+        if not barcode:
+            continue
+        scanned += 1
+        batch.append((number, barcode))
+        if len(batch) >= chunk_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+    out.flush()
+
+    return {
+        "scanned": scanned,
+        "unique": len(first_seen),
+        "valid": valid,
+        "exceptions": sum(issue_counts.values()),
+        "issues": issue_counts,
+        "labs": labs,
+        "day": day,
+    }
 
 
 def main():
     parser = argparse.ArgumentParser(description='Generate lab sample barcode')
     parser.add_argument('--lab-code', '-l', default='LAB', help='Lab code (LAB or RAD)')
-    parser.add_argument('--patient-id', '-p', required=True, help='Patient UHID')
-    parser.add_argument('--test-code', '-t', required=True, help='Test code')
-    parser.add_argument('--sequence', '-s', type=int, required=True, help='Sequence number')
+    parser.add_argument('--patient-id', '-p', help='Patient UHID')
+    parser.add_argument('--test-code', '-t', help='Test code')
+    parser.add_argument('--sequence', '-s', type=int,
+                        help='Sequence number (first sequence with --bulk); allocated for the day when omitted')
     parser.add_argument('--validate', '-v', help='Validate an existing barcode')
+    parser.add_argument('--bulk', action='store_true', help='Read JSON-lines orders on stdin, write JSON-lines barcodes')
+    parser.add_argument('--lease', type=int, default=32, help='Sequences leased per allocator round-trip in --bulk')
+    parser.add_argument('--reconcile', nargs='?', const='-', metavar='FILE',
+                        help='Reconcile scanned barcodes from FILE (default: stdin)')
+    parser.add_argument('--day', help='Expected scan day as YYMMDD for --reconcile (default: today, "any" to skip)')
+    parser.add_argument('--render', choices=['svg', 'png'], help='Also draw the barcode to --output')
+    parser.add_argument('--output', '-o', help='Image file for --render')
+    parser.add_argument('--sheet', help='With --bulk, also write every label to this PDF label sheet')
+    parser.add_argument('--index', nargs='?', const='', default=os.environ.get('BARCODE_INDEX_DIR'), metavar='DIR',
+                        help='Record issued barcodes in the index at DIR (default: $BARCODE_INDEX_DIR)')
     
     args = parser.parse_args()
+    if args.render and not args.output:
+        parser.error('--render needs --output')
+    
+    if args.reconcile:
+        day = args.day or datetime.now().strftime('%y%m%d')
+        if len(day) == 10 and day[4] == '-':
+            day = day[2:].replace('-', '')  # YYYY-MM-DD
+        source = sys.stdin if args.reconcile == '-' else open(args.reconcile)
+        try:
+            summary = reconcile(source, sys.stdout, None if day == 'any' else day)
+        finally:
+            if source is not sys.stdin:
+                source.close()
+        print(json.dumps({"summary": summary}, separators=(',', ':')))
+        return 0
+    
+    if args.bulk:
+        out = sys.stdout
+        allocator = None
+        if args.sequence is None:
+            from barcode_sequence import SequenceAllocator, DEFAULT_DB
+            allocator = SequenceAllocator(DEFAULT_DB, args.lease)
+        labels = []
+        issued = []
+        for record in generate_bulk(sys.stdin, args.sequence or 1, args.lab_code, allocator=allocator):
+            out.write(json.dumps(record, separators=(',', ':')) + '\n')
+            if "barcode" in record:
+                if args.sheet:
+                    labels.append((record["barcode"], label_caption(record)))
+                if args.index is not None:
+                    issued.append(record)
+                    if len(issued) >= 1024:
+                        index_records(issued, args.index)
+                        issued = []
+        out.flush()
+        if issued:
+            index_records(issued, args.index)
+        if args.sheet:
+            from code128 import render_pdf_sheet
+            with open(args.sheet, 'wb') as f:
+                f.write(render_pdf_sheet(labels))
+        return 0
+    
+    if not args.validate and (not args.patient_id or not args.test_code):
+        parser.error('--patient-id and --test-code are required')
+    
+    # Forward to the persistent worker when one is configured
+    if os.environ.get('MEDFLOW_WORKER_SOCKET'):
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib'))
+        try:
+            from python_worker import call
+            if args.validate:
+                result = call('barcode.validate', {"barcode": args.validate})
+            else:
+                result = call('barcode.generate', {
+                    "lab_code": args.lab_code,
+                    "patient_id": args.patient_id,
+                    "test_code": args.test_code,
+                    "sequence": args.sequence
+                })
+        except (OSError, RuntimeError, ValueError):
+            result = None  # Worker not running, draining or failing; generate in-process
+        if result is not None:
+            # The worker indexes by itself when it has $BARCODE_INDEX_DIR
+            if args.index is not None and not os.environ.get('BARCODE_INDEX_DIR') and not args.validate:
+                index_records([result], args.index)
+            if args.render and "barcode" in result and not args.validate:
+                render_label(result, args.render, args.output)
+            print(json.dumps(result, indent=2))
+            return 0
     
     if args.validate:
         is_valid = validate_barcode(args.validate)
@@ -133,6 +498,10 @@ def main():
             test_code=args.test_code,
             sequence=args.sequence
         )
+        if args.index is not None:
+            index_records([result], args.index)
+        if args.render:
+            render_label(result, args.render, args.output)
     
     print(json.dumps(result, indent=2))
     return 0
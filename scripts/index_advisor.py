@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Index advisor for prisma/schema.prisma
+
+Parses every model and compares its indexes (@id, @unique, @@id, @@unique,
+@@index) with the fields queries are likely to filter on:
+
+- relation scalar fields (the `fields:` of each @relation); PostgreSQL does
+  not index foreign keys on its own, so joins, cascades and per-patient
+  lookups scan without one
+- commonly filtered fields (HOT_FIELDS), e.g. barcode, status or
+  LabTestOrder.updatedAt
+- query shapes, when a file of them is given
+
+A field list counts as covered when an index starts with the same fields in
+any order (for query shapes, with the range/sort field last). Uncovered
+candidates are ranked by score and printed with the @@index declaration to
+add. Indexes that duplicate or are a leading prefix of another index (e.g.
+@@index([barcode]) next to barcode @unique) are reported as redundant.
+
+Query shape files have one shape per line, "Model field[,field...] [weight]",
+with equality fields first and a range/sort field last:
+
+    LabTestOrder barcode 500
+    LabTestOrder patientId,createdAt 120
+    # comments and blank lines are ignored
+
+Usage:
+    python3 scripts/index_advisor.py [schema]
+    python3 scripts/index_advisor.py --shapes query_shapes.txt --json
+"""
+
+import os
+import re
+import sys
+import json
+import argparse
+from collections import namedtuple
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from prisma_schema import DEFAULT_SCHEMA, load  # noqa: E402
+from check_schema import SCALAR_TYPES, base_type  # noqa: E402
+
+# Fields the hot endpoints filter or sort on: "field" in any model that has it, or "Model.field"
+HOT_FIELDS = frozenset(['barcode', 'status', 'patientId', 'encounterId',
+                        'LabTestOrder.createdAt', 'LabTestOrder.updatedAt'])
+
+SCORE_RELATION = 3
+SCORE_HOT = 2
+SCORE_ID_LIKE = 1
+SCORE_SHAPE = 1  # per unit of shape weight
+
+Index = namedtuple('Index', 'model fields unique source line')
+
+_FIELD_LIST = re.compile(r'^\s*(?:fields\s*:\s*)?\[([^\]]*)\]')
+_RELATION_FIELDS = re.compile(r'\bfields\s*:\s*\[([^\]]*)\]')
+
+
+def _names(field_list):
+    """["a", "b(sort: Desc)"] from "a, b(sort: Desc)" -> ('a', 'b')"""
+    return tuple(name.split('(')[0].strip() for name in field_list.split(',') if name.strip())
+
+
+def model_indexes(block):
+    """Every index declared on a model, field-level and block-level"""
+    indexes = []
+    for member in block.members:
+        for attribute in member.attributes:
+            if member.name is not None and attribute.name in ('@id', '@unique'):
+                indexes.append(Index(block.name, (member.name,), True, attribute.name, member.line))
+            elif member.name is None and attribute.name in ('@@id', '@@unique', '@@index'):
+                match = _FIELD_LIST.match(attribute.args or '')
+                if match:
+                    indexes.append(Index(block.name, _names(match.group(1)), attribute.name != '@@index',
+                                         attribute.name, member.line))
+    return indexes
+
+
+def covered(fields, indexes, last_fixed=False):
+    """
+    True if an index leads with exactly these fields, in any order.
+
+    With last_fixed the final field (a range or sort) must also be the last of
+    those index columns, as a B-tree can only range-scan after the equalities.
+    """
+    wanted = set(fields)
+    for index in indexes:
+        lead = index.fields[:len(fields)]
+        if set(lead) == wanted and (not last_fixed or lead[-1] == fields[-1]):
+            return True
+    return False
+
+
+def redundant_indexes(indexes):
+    """(index, covering index) pairs for indexes another one makes unnecessary"""
+    redundant = []
+    for i, index in enumerate(indexes):
+        for j, other in enumerate(indexes):
+            if i == j or other.fields[:len(index.fields)] != index.fields:
+                continue
+            same = other.fields == index.fields
+            if index.unique and not (same and other.unique and j < i):
+                continue  # a unique index enforces a constraint; only an identical earlier one replaces it
+            if same and not other.unique and j > i:
+                continue  # of two identical plain indexes, report the later one
+            redundant.append((index, other))
+            break
+    return redundant
+
+
+def load_shapes(path):
+    """[(model, fields, weight)] from a query shape file ('-' for stdin)"""
+    shapes = []
+    with (sys.stdin if path == '-' else open(path, encoding='utf-8')) as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+            parts = line.split()
+            if len(parts) not in (2, 3):
+                raise ValueError(f"{path}:{line_no}: expected 'Model field[,field...] [weight]'")
+            weight = float(parts[2]) if len(parts) == 3 else 1.0
+            shapes.append((parts[0], tuple(f.strip() for f in parts[1].split(',') if f.strip()), weight))
+    return shapes
+
+
+def _suggestion(fields):
+    return f"@@index([{', '.join(fields)}])"
+
+
+def _declaration(index):
+    if index.source.startswith('@@'):
+        return f"{index.source}([{', '.join(index.fields)}])"
+    return f"{index.fields[0]} {index.source}"
+
+
+def advise(schema, shapes=()):
+    """
+    Rank missing indexes and list redundant ones.
+
+    Args:
+        schema: Parsed Schema
+        shapes: Optional (model, fields, weight) query shapes
+
+    Returns:
+        Dict with suggestions (highest score first), redundant indexes and warnings
+    """
+    candidates = {}  # (model, fields) -> suggestion dict
+    warnings = []
+
+    def propose(block, fields, score, reason):
+        key = (block.name, fields)
+        entry = candidates.setdefault(key, {"model": block.name, "fields": list(fields), "score": 0,
+                                            "reasons": [], "line": block.end_line,
+                                            "suggestion": _suggestion(fields)})
+        entry["score"] += score
+        if reason not in entry["reasons"]:
+            entry["reasons"].append(reason)
+
+    # First definition of each model; check_schema.py reports the repeats
+    models = {name: blocks[0] for name, blocks in schema.index.items() if blocks[0].kind == 'model'}
+    indexes = {name: model_indexes(block) for name, block in models.items()}
+    redundant = []
+
+    for name, block in models.items():
+        model_index = indexes[name]
+        relation_fields = set()
+        for field in block.fields:
+            for attribute in field.attributes:
+                if attribute.name == '@relation':
+                    match = _RELATION_FIELDS.search(attribute.args or '')
+                    if match:
+                        fields = _names(match.group(1))
+                        relation_fields.update(fields)
+                        if not covered(fields, model_index):
+                            propose(block, fields, SCORE_RELATION, f"relation {field.name} -> {base_type(field.type)}")
+        for field in block.fields:
+            if base_type(field.type) not in SCALAR_TYPES or field.name in relation_fields:
+                continue
+            fields = (field.name,)
+            if covered(fields, model_index):
+                continue
+            if field.name in HOT_FIELDS or f"{name}.{field.name}" in HOT_FIELDS:
+                propose(block, fields, SCORE_HOT, "commonly filtered field")
+            elif field.name.endswith('Id') and field.name != 'id':
+                propose(block, fields, SCORE_ID_LIKE, "id-like field without relation")
+        for index, other in redundant_indexes(model_index):
+            redundant.append({"model": name, "index": _declaration(index), "covered_by": _declaration(other),
+                              "line": index.line})
+
+    for model, fields, weight in shapes:
+        block = models.get(model)
+        if block is None:
+            warnings.append(f"query shape {model} {','.join(fields)}: unknown model")
+            continue
+        known = {field.name for field in block.fields}
+        missing = [f for f in fields if f not in known]
+        if missing:
+            warnings.append(f"query shape {model} {','.join(fields)}: unknown field(s) {', '.join(missing)}")
+            continue
+        if not covered(fields, indexes[model], last_fixed=True):
+            propose(block, fields, SCORE_SHAPE * weight, f"query shape (weight {weight:g})")
+
+    suggestions = sorted(candidates.values(), key=lambda s: (-s["score"], s["model"], s["fields"]))
+    return {"suggestions": suggestions, "redundant": redundant, "warnings": warnings,
+            "models": len(models), "indexes": sum(len(i) for i in indexes.values())}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Suggest missing and redundant Prisma indexes')
+    parser.add_argument('schema', nargs='?', default=DEFAULT_SCHEMA, help='Schema file')
+    parser.add_argument('--shapes', help="Query shape file ('-' for stdin)")
+    parser.add_argument('--min-score', type=float, default=0, help='Hide suggestions scoring below this')
+    parser.add_argument('--json', action='store_true', help='Emit machine-readable JSON')
+
+    args = parser.parse_args()
+    try:
+        schema = load(args.schema)
+        shapes = load_shapes(args.shapes) if args.shapes else []
+    except (OSError, ValueError) as e:
+        print(json.dumps({"success": False, "error": str(e)}) if args.json else f"Error: {e}", file=sys.stderr)
+        return 1
+
+    report = advise(schema, shapes)
+    report["suggestions"] = [s for s in report["suggestions"] if s["score"] >= args.min_score]
+
+    if args.json:
+        print(json.dumps(dict(report, success=True), indent=2))
+        return 0
+    for warning in report["warnings"]:
+        print(f"warning: {warning}", file=sys.stderr)
+    print(f"{report['models']} models, {report['indexes']} indexes; "
+          f"{len(report['suggestions'])} suggested, {len(report['redundant'])} redundant")
+    if report["suggestions"]:
+        print(f"\n{'score':>6}  {'model':<28} {'add':<40} reason")
+        for s in report["suggestions"]:
+            print(f"{s['score']:>6g}  {s['model']:<28} {s['suggestion']:<40} {'; '.join(s['reasons'])}")
+    if report["redundant"]:
+        print(f"\n{'line':>6}  {'model':<28} {'redundant':<40} covered by")
+        for r in report["redundant"]:
+            print(f"{r['line']:>6}  {r['model']:<28} {r['index']:<40} {r['covered_by']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+OCR load generator
+
+Drives lib/ocr_handwriting.py against a Vision endpoint (by default a
+scripts/vision_stub.py started on a free port) and reports throughput,
+latency percentiles, errors and how many backend requests were made:
+
+    single  one ocr_handwriting.py process per image, as the API route spawns it
+    pooled  in-process recognize() calls sharing a ClientPool of --clients
+    batch   OcrService, which groups concurrent images into batch requests
+
+Caching is off so every image reaches the backend.
+
+Usage:
+    python3 scripts/load_ocr.py
+    python3 scripts/load_ocr.py --requests 500 --concurrency 32 --modes pooled,batch
+    python3 scripts/load_ocr.py --latency lognormal:0.2,0.6 --error-rate 0.05 --json
+    python3 scripts/load_ocr.py --endpoint http://127.0.0.1:8089
+"""
+
+import os
+import sys
+import json
+import time
+import base64
+import random
+import asyncio
+import argparse
+import subprocess
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+LIB_DIR = os.path.join(SCRIPTS_DIR, '..', 'lib')
+OCR_SCRIPT = os.path.join(LIB_DIR, 'ocr_handwriting.py')
+MODES = ['single', 'pooled', 'batch']
+
+
+def start_stub(args):
+    """Start vision_stub.py on a free port; returns (process, endpoint)"""
+    cmd = [sys.executable, os.path.join(SCRIPTS_DIR, 'vision_stub.py'), '--port', '0',
+           '--latency', args.latency, '--error-rate', str(args.error_rate),
+           '--image-error-rate', str(args.image_error_rate), '--seed', str(args.seed)]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True)
+    line = proc.stdout.readline()
+    if not line.startswith('listening on '):
+        proc.kill()
+        raise RuntimeError("vision_stub.py did not start")
+    return proc, line.split()[-1]
+
+
+def stub_stats(endpoint):
+    try:
+        with urllib.request.urlopen(endpoint.rstrip('/') + '/stats', timeout=5) as response:
+            return json.load(response)
+    except (OSError, ValueError):
+        return None
+
+
+def percentile(ordered, q):
+    if not ordered:
+        return None
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def summarize(mode, latencies, errors, elapsed, backend):
+    ordered = sorted(latencies)
+    ms = lambda v: round(v * 1000, 1) if v is not None else None  # noqa: E731
+    return {
+        "mode": mode,
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else None,
+        "p50_ms": ms(percentile(ordered, 0.50)),
+        "p90_ms": ms(percentile(ordered, 0.90)),
+        "p99_ms": ms(percentile(ordered, 0.99)),
+        "max_ms": ms(ordered[-1] if ordered else None),
+        "backend_requests": backend,
+    }
+
+
+def run_single(images, concurrency, deadline):
+    """One CLI process per image, `concurrency` at a time"""
+    env = {k: v for k, v in os.environ.items() if k not in ('MEDFLOW_WORKER_SOCKET', 'OCR_CACHE_DIR')}
+
+    def one(encoded):
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, OCR_SCRIPT, '--preset', 'none', '--deadline', str(deadline)],
+                              input=encoded, capture_output=True, text=True, env=env)
+        elapsed = time.perf_counter() - start
+        try:
+            ok = json.loads(proc.stdout).get("success", False)
+        except ValueError:
+            ok = False
+        return elapsed, ok
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(one, images))
+
+
+def run_pooled(images, concurrency, clients, deadline):
+    """recognize() from `concurrency` threads over a shared ClientPool"""
+    from ocr_handwriting import ClientPool, recognize
+    pool = ClientPool(clients)
+
+    def one(encoded):
+        start = time.perf_counter()
+        result = recognize(encoded, client=pool.get(), preset='none', deadline=deadline)
+        return time.perf_counter() - start, result.get("success", False)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(one, images))
+
+
+async def run_batch(images, concurrency, clients, deadline, window):
+    """OcrService with `concurrency` images outstanding at a time"""
+    from ocr_handwriting import ClientPool, OcrService
+    service = OcrService(ClientPool(clients), window=window, deadline=deadline)
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one(encoded):
+        async with slots:
+            start = time.perf_counter()
+            try:
+                result = await service.recognize_image(base64.b64decode(encoded), 'none')
+            except Exception:
+                result = {}
+            return time.perf_counter() - start, result.get("success", False)
+
+    try:
+        return await asyncio.gather(*(one(encoded) for encoded in images))
+    finally:
+        await service.close()
+
+
+def run_mode(mode, args, images, endpoint):
+    before = stub_stats(endpoint)
+    start = time.perf_counter()
+    if mode == 'single':
+        outcomes = run_single(images, args.concurrency, args.deadline)
+    elif mode == 'pooled':
+        outcomes = run_pooled(images, args.concurrency, args.clients, args.deadline)
+    else:
+        outcomes = asyncio.run(run_batch(images, args.concurrency, args.clients, args.deadline, args.batch_window))
+    elapsed = time.perf_counter() - start
+    after = stub_stats(endpoint)
+
+    backend = after["requests"] - before["requests"] if before and after else None
+    latencies = [latency for latency, _ in outcomes]
+    errors = sum(1 for _, ok in outcomes if not ok)
+    return summarize(mode, latencies, errors, elapsed, backend)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load-test OCR against a Vision stand-in')
+    parser.add_argument('--endpoint', help='Existing Vision endpoint (default: start scripts/vision_stub.py)')
+    parser.add_argument('--modes', default=','.join(MODES), help='Comma-separated modes: single,pooled,batch')
+    parser.add_argument('--requests', '-n', type=int, default=200, help='Images per mode')
+    parser.add_argument('--single-requests', type=int, default=40, help='Images for single mode (process per image)')
+    parser.add_argument('--concurrency', '-c', type=int, default=16, help='Images in flight at once')
+    parser.add_argument('--clients', type=int, default=2, help='ClientPool size for pooled and batch modes')
+    parser.add_argument('--batch-window', type=float, default=0.05, help='OcrService batching window in seconds')
+    parser.add_argument('--image-bytes', type=int, default=50_000, help='Size of each synthetic image')
+    parser.add_argument('--deadline', type=float, default=20.0, help='Per-image deadline in seconds')
+    parser.add_argument('--latency', default='lognormal:0.1,0.4', help='Stub latency distribution')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Stub request failure rate')
+    parser.add_argument('--image-error-rate', type=float, default=0.0, help='Stub per-image failure rate')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for images and the stub')
+    parser.add_argument('--json', action='store_true', help='Emit machine-readable JSON')
+
+    args = parser.parse_args()
+    modes = [m.strip() for m in args.modes.split(',') if m.strip()]
+    unknown = set(modes) - set(MODES)
+    if unknown:
+        print(f"Unknown modes: {', '.join(sorted(unknown))}", file=sys.stderr)
+        return 1
+
+    stub = None
+    endpoint = args.endpoint
+    if endpoint is None:
+        stub, endpoint = start_stub(args)
+    # Read by ocr_handwriting at import and inherited by single-mode processes
+    os.environ['VISION_API_ENDPOINT'] = endpoint
+    os.environ.pop('OCR_BACKEND', None)
+    sys.path.insert(0, LIB_DIR)
+
+    rng = random.Random(args.seed)
+    rows = []
+    try:
+        for mode in modes:
+            count = args.single_requests if mode == 'single' else args.requests
+            # Distinct images, so nothing could be served from a cache
+            images = [base64.b64encode(rng.randbytes(args.image_bytes)).decode() for _ in range(count)]
+            rows.append(run_mode(mode, args, images, endpoint))
+    finally:
+        if stub is not None:
+            stub.terminate()
+            stub.wait()
+
+    if args.json:
+        print(json.dumps({"endpoint": endpoint, "concurrency": args.concurrency, "clients": args.clients,
+                          "latency": None if args.endpoint else args.latency, "results": rows}, indent=2))
+    else:
+        print(f"endpoint {endpoint}, concurrency {args.concurrency}, clients {args.clients}")
+        print(f"{'mode':>7} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50 ms':>8} {'p90 ms':>8} "
+              f"{'p99 ms':>8} {'max ms':>8} {'backend':>8}")
+        for row in rows:
+            print(f"{row['mode']:>7} {row['requests']:>9} {row['errors']:>7} {row['throughput_rps'] or 0:>8.1f} "
+                  f"{row['p50_ms'] or 0:>8.1f} {row['p90_ms'] or 0:>8.1f} {row['p99_ms'] or 0:>8.1f} "
+                  f"{row['max_ms'] or 0:>8.1f} {row['backend_requests'] if row['backend_requests'] is not None else '-':>8}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
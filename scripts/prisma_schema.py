@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+"""
+Prisma schema parser and transform engine
+
+parse() tokenizes a schema in one pass (comments, strings, braces and
+newlines) and returns a block-level AST: every model/enum/type/view/
+generator/datasource with its character span, line range, leading ///
+doc comments and a name -> blocks index. Block members (fields, enum values,
+@@ attributes) are parsed on first access.
+
+Transforms are declarative: each one looks at the parsed schema and returns
+edits as (start, end, replacement) spans of the original text. apply()
+collects the edits of many transforms, checks that they do not overlap and
+rewrites the file once. The built-in transforms are idempotent - applying
+them to their own output changes nothing.
+
+Usage:
+    python3 scripts/prisma_schema.py                      # block summary of prisma/schema.prisma
+    python3 scripts/prisma_schema.py --blocks --json
+    python3 scripts/prisma_schema.py --dedupe --write     # drop exact repeats, report conflicts
+"""
+
+import os
+import re
+import sys
+import json
+import argparse
+from collections import namedtuple
+
+DEFAULT_SCHEMA = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'prisma', 'schema.prisma')
+
+BLOCK_KINDS = frozenset(['model', 'enum', 'type', 'view', 'generator', 'datasource'])
+
+# Everything the block scanner has to look at; other characters are skipped in C
+_TOKENS = re.compile(r'//[^\n]*|"(?:[^"\\\n]|\\.)*"|[{}\n]')
+_HEADER = re.compile(r'[ \t]*(\w+)[ \t]+(\w+)[ \t]*\Z')
+# One member per line: "@@attr(...)", "name = value" or "name Type? @attr..."
+_MEMBER = re.compile(r'^[ \t]*(?:(@@[^\n]*)|([\w.]+)[ \t]*(?:=[^\n]*|([^\s@/]*)[ \t]*([^\n]*)))', re.MULTILINE)
+# @name or @name(args); args may hold strings, [] lists and two levels of nested ()
+_ATTRIBUTE = re.compile(r'''
+    (@@?[\w.]+)
+    (?:\(( (?: [^()"] | "(?:[^"\\]|\\.)*" | \( (?: [^()"] | "(?:[^"\\]|\\.)*" | \([^()]*\) )* \) )* )\))?
+''', re.VERBOSE)
+
+Member = namedtuple('Member', 'name type attributes line')
+Attribute = namedtuple('Attribute', 'name args')
+Edit = namedtuple('Edit', 'start end text description')
+
+
+class SchemaSyntaxError(ValueError):
+    def __init__(self, message, line):
+        super().__init__(f"line {line}: {message}")
+        self.line = line
+
+
+def _strip_comment(line):
+    """Line without a trailing // comment (ignoring // inside strings)"""
+    if '//' not in line:
+        return line
+    for match in _TOKENS.finditer(line):
+        if match.group().startswith('//'):
+            return line[:match.start()]
+    return line
+
+
+def parse_attributes(text):
+    """All @attr(...) / @@attr(...) in text, in order, with raw argument text"""
+    return [Attribute(m.group(1), m.group(2)) for m in _ATTRIBUTE.finditer(text)]
+
+
+class Block:
+    """One top-level block; offsets index into Schema.text"""
+
+    __slots__ = ('schema', 'kind', 'name', 'start', 'header_start', 'body_start', 'end', 'line', 'end_line',
+                 '_members')
+
+    def __init__(self, schema, kind, name, start, header_start, body_start, end, line, end_line):
+        self.schema = schema
+        self.kind = kind
+        self.name = name
+        self.start = start              # first /// doc comment line, or the header
+        self.header_start = header_start
+        self.body_start = body_start    # just past '{'
+        self.end = end                  # just past '}' and its newline
+        self.line = line                # 1-based header line
+        self.end_line = end_line        # 1-based line of '}'
+        self._members = None
+
+    def __repr__(self):
+        return f"<{self.kind} {self.name} lines {self.line}-{self.end_line}>"
+
+    @property
+    def text(self):
+        return self.schema.text[self.start:self.end]
+
+    @property
+    def body(self):
+        return self.schema.text[self.body_start:self.schema.text.rindex('}', self.body_start, self.end)]
+
+    def normalized(self):
+        """Body with comments and whitespace runs collapsed, for comparing definitions"""
+        lines = (' '.join(_strip_comment(line).split()) for line in self.body.split('\n'))
+        return '\n'.join(line for line in lines if line)
+
+    @property
+    def members(self):
+        """Fields / enum values / settings and block attributes in source order, as Member tuples"""
+        if self._members is None:
+            body = self.body
+            members = []
+            line_no = self.line
+            pos = 0
+            for match in _MEMBER.finditer(body):
+                line_no += body.count('\n', pos, match.start())
+                pos = match.start()
+                block_attribute, name, type_, attrs = match.groups()
+                if block_attribute:
+                    members.append(Member(None, None, parse_attributes(_strip_comment(block_attribute)), line_no))
+                else:  # type_ and attrs are None for generator / datasource settings
+                    attributes = parse_attributes(_strip_comment(attrs)) if attrs and '@' in attrs else []
+                    members.append(Member(name, type_ or None, attributes, line_no))
+            self._members = members
+        return self._members
+
+    @property
+    def fields(self):
+        return [m for m in self.members if m.name is not None]
+
+    @property
+    def block_attributes(self):
+        return [a for m in self.members if m.name is None for a in m.attributes]
+
+
+class Schema:
+    """Parsed schema text with its blocks in source order and a name index"""
+
+    def __init__(self, text, path=None):
+        self.text = text
+        self.path = path
+        self.blocks = []
+        self.index = {}
+
+    def get(self, name, kind=None):
+        """First block called name (of the given kind), or None"""
+        for block in self.index.get(name, ()):
+            if kind is None or block.kind == kind:
+                return block
+        return None
+
+    def all(self, name):
+        return list(self.index.get(name, ()))
+
+    def duplicates(self):
+        """name -> blocks for names defined more than once"""
+        return {name: blocks for name, blocks in self.index.items() if len(blocks) > 1}
+
+    @property
+    def line_count(self):
+        return self.text.count('\n') + (0 if self.text.endswith('\n') else 1)
+
+
+def _leading_comments(text, header_start):
+    """Start of the /// doc comment lines directly above a header"""
+    start = header_start
+    while start > 0:
+        prev_start = text.rfind('\n', 0, start - 1) + 1
+        if not text[prev_start:start].lstrip().startswith('///'):
+            break
+        start = prev_start
+    return start
+
+
+def parse(text, path=None):
+    """
+    Parse schema text into a Schema in a single pass over its tokens.
+
+    Raises:
+        SchemaSyntaxError: On unbalanced braces or a block header that is not "<kind> <Name> {"
+    """
+    schema = Schema(text, path)
+    line = 1
+    depth = 0
+    open_block = None
+    for match in _TOKENS.finditer(text):
+        token = match.group()
+        if token == '\n':
+            line += 1
+        elif token == '{':
+            depth += 1
+            if depth == 1:
+                header_start = text.rfind('\n', 0, match.start()) + 1
+                header = _HEADER.match(text, header_start, match.start())
+                if not header or header.group(1) not in BLOCK_KINDS:
+                    raise SchemaSyntaxError(f"unexpected block header {text[header_start:match.start()].strip()!r}",
+                                            line)
+                open_block = (header.group(1), header.group(2), header_start, match.end(), line)
+        elif token == '}':
+            depth -= 1
+            if depth < 0:
+                raise SchemaSyntaxError("unmatched '}'", line)
+            if depth == 0:
+                kind, name, header_start, body_start, start_line = open_block
+                end = match.end()
+                if text.startswith('\n', end):
+                    end += 1
+                block = Block(schema, kind, name, _leading_comments(text, header_start), header_start, body_start,
+                              end, start_line, line)
+                schema.blocks.append(block)
+                schema.index.setdefault(name, []).append(block)
+                open_block = None
+    if depth:
+        raise SchemaSyntaxError(f"block {open_block[1]!r} is never closed", open_block[4])
+    return schema
+
+
+def load(path=DEFAULT_SCHEMA):
+    with open(path, encoding='utf-8') as f:
+        return parse(f.read(), path)
+
+
+# Transforms: each has edits(schema) -> list of Edit on the original text
+
+def _removal_span(schema, block):
+    """Block span plus the blank lines after it, so removals leave no gaps behind"""
+    text = schema.text
+    end = block.end
+    while True:
+        nl = text.find('\n', end)
+        if nl == -1 or text[end:nl].strip():
+            if nl == -1 and not text[end:].strip():
+                end = len(text)
+            return block.start, end
+        end = nl + 1
+
+
+def _block_text(text):
+    return text.strip('\n') + '\n'
+
+
+class Remove:
+    """Remove every block called name (or only its nth occurrence, 1-based)"""
+
+    def __init__(self, name, occurrence=None):
+        self.name = name
+        self.occurrence = occurrence
+
+    def edits(self, schema):
+        blocks = schema.all(self.name)
+        if self.occurrence is not None:
+            blocks = blocks[self.occurrence - 1:self.occurrence]
+        return [Edit(*_removal_span(schema, b), '', f"remove {b.kind} {b.name} (line {b.line})") for b in blocks]
+
+
+class Dedupe:
+    """Keep the first definition of every repeated block name, remove the later ones"""
+
+    def __init__(self, kinds=None, identical_only=False):
+        self.kinds = set(kinds) if kinds else None
+        self.identical_only = identical_only
+
+    def edits(self, schema):
+        edits = []
+        for name, blocks in schema.duplicates().items():
+            first = blocks[0]
+            for block in blocks[1:]:
+                if self.kinds and block.kind not in self.kinds:
+                    continue
+                if self.identical_only and block.normalized() != first.normalized():
+                    continue
+                edits.append(Edit(*_removal_span(schema, block), '',
+                                  f"remove duplicate {block.kind} {name} (line {block.line}, first at {first.line})"))
+        return edits
+
+
+class InsertAfter:
+    """Insert block text after the block called anchor, unless a block with the new name exists"""
+
+    def __init__(self, anchor, text):
+        self.anchor = anchor
+        self.text = _block_text(text)
+        header = re.search(r'^[ \t]*(\w+)[ \t]+(\w+)[ \t]*\{', self.text, re.MULTILINE)
+        if not header:
+            raise ValueError("Inserted text must contain a block header")
+        self.name = header.group(2)
+
+    def edits(self, schema):
+        if schema.get(self.name) is not None:
+            return []
+        anchor = schema.get(self.anchor)
+        if anchor is None:
+            raise ValueError(f"Anchor block {self.anchor!r} not found")
+        return [Edit(anchor.end, anchor.end, '\n' + self.text, f"insert {self.name} after {self.anchor}")]
+
+
+class Replace:
+    """Replace the first block called name with new text"""
+
+    def __init__(self, name, text):
+        self.name = name
+        self.text = _block_text(text)
+
+    def edits(self, schema):
+        block = schema.get(self.name)
+        if block is None or block.text == self.text:
+            return []
+        return [Edit(block.start, block.end, self.text, f"replace {block.kind} {self.name}")]
+
+
+def plan(schema, transforms):
+    """Edits of all transforms, sorted and checked for overlaps"""
+    edits = sorted((e for t in transforms for e in t.edits(schema)), key=lambda e: (e.start, e.end))
+    for previous, edit in zip(edits, edits[1:]):
+        if edit.start < previous.end:
+            raise ValueError(f"Overlapping edits: {previous.description!r} and {edit.description!r}")
+    return edits
+
+
+def rewrite(text, edits):
+    """Apply sorted, non-overlapping edits in one pass"""
+    out = []
+    pos = 0
+    for edit in edits:
+        out.append(text[pos:edit.start])
+        out.append(edit.text)
+        pos = edit.end
+    out.append(text[pos:])
+    return ''.join(out)
+
+
+def apply(schema, transforms):
+    """
+    Run transforms against schema.
+
+    Returns:
+        (new text, list of edit descriptions)
+    """
+    edits = plan(schema, transforms)
+    return rewrite(schema.text, edits), [e.description for e in edits]
+
+
+def run_transforms(transforms, path=DEFAULT_SCHEMA, write=True):
+    """Load path, apply transforms and write the result back atomically; prints what changed"""
+    try:
+        schema = load(path)
+        text, changes = apply(schema, transforms)
+        parse(text)  # Never write a schema that no longer parses
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    for change in changes:
+        print(change)
+    if not changes:
+        print("Schema already up to date")
+    elif write:
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp, path)
+        print(f"Wrote {path}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Parse and transform a Prisma schema')
+    parser.add_argument('schema', nargs='?', default=DEFAULT_SCHEMA, help='Schema file')
+    parser.add_argument('--blocks', action='store_true', help='List every block with its line span')
+    parser.add_argument('--dedupe', action='store_true',
+                        help='Remove exact repeats of a block (redefinitions with a different body are kept '
+                             'and reported as conflicts)')
+    parser.add_argument('--write', action='store_true', help='Write transform results back (default: dry run)')
+    parser.add_argument('--json', action='store_true', help='Emit machine-readable JSON')
+
+    args = parser.parse_args()
+    if args.dedupe:
+        status = run_transforms([Dedupe(identical_only=True)], args.schema, args.write)
+        if status:
+            return status
+        from check_schema import check  # check_schema builds on this module
+        conflicts = check(load(args.schema))["conflicts"]
+        for issue in conflicts:
+            print(f"conflict {issue['kind']} {issue['name']} at line {issue['line']} "
+                  f"(differs from line {issue['first_line']}), kept")
+        return 1 if conflicts else 0
+
+    try:
+        schema = load(args.schema)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    kinds = {}
+    for block in schema.blocks:
+        kinds[block.kind] = kinds.get(block.kind, 0) + 1
+    summary = {
+        "lines": schema.line_count,
+        "blocks": kinds,
+        "duplicates": {name: [b.line for b in blocks] for name, blocks in schema.duplicates().items()},
+    }
+    if args.blocks:
+        summary["spans"] = [{"kind": b.kind, "name": b.name, "line": b.line, "end_line": b.end_line,
+                             "members": len(b.members)} for b in schema.blocks]
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return 0
+    print(f"{summary['lines']} lines, " + ', '.join(f"{n} {k}" for k, n in sorted(kinds.items())))
+    for name, lines in summary["duplicates"].items():
+        print(f"duplicate {name}: lines {', '.join(map(str, lines))}")
+    for span in summary.get("spans", []):
+        print(f"{span['kind']:>10} {span['name']:<32} {span['line']:>6}-{span['end_line']:<6} "
+              f"{span['members']:>4} members")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
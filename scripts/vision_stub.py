@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Cloud Vision REST API
+
+Serves POST /v1/images:annotate (what ImageAnnotatorClient's REST transport,
+lib/vision_rest.py and batch_annotate_images all call) with canned
+DOCUMENT_TEXT_DETECTION annotations after a sampled latency, and injects
+request-level HTTP errors and per-image errors at configurable rates. Point
+the OCR code at it with VISION_API_ENDPOINT=http://127.0.0.1:<port>.
+GET /stats returns request, image and error counters.
+
+Latency distributions (--latency, seconds):
+    fixed:0.08            every request takes 80 ms
+    uniform:0.05,0.2      uniform between the two bounds
+    normal:0.1,0.02       mean, standard deviation (clamped at 0)
+    lognormal:0.1,0.5     median, sigma - a realistic long tail
+--per-image adds seconds for every image after the first in a batch, and
+--slow-rate/--slow-latency mix in rare stalls.
+
+Canned annotations (--annotations) are a JSON list of texts or of full
+fullTextAnnotation objects; each image gets the entry picked by its content
+hash, so the same image always reads the same.
+
+Usage:
+    python3 scripts/vision_stub.py --port 8089
+    python3 scripts/vision_stub.py --latency lognormal:0.12,0.6 --error-rate 0.02 --image-error-rate 0.01
+    python3 scripts/vision_stub.py --port 0 --annotations canned.json
+"""
+
+import sys
+import json
+import time
+import random
+import base64
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_TEXTS = [
+    'Paracetamol 500 mg\nTwice daily after food',
+    'Amoxicillin 250 mg\nThree times daily for 5 days',
+    'CBC, LFT, HbA1c\nFasting sample',
+    'Metformin 500 mg\nOnce daily with dinner\nReview in 2 weeks',
+]
+
+# HTTP status -> gRPC status name for injected errors
+STATUS_NAMES = {400: 'INVALID_ARGUMENT', 429: 'RESOURCE_EXHAUSTED', 500: 'INTERNAL', 503: 'UNAVAILABLE',
+                504: 'DEADLINE_EXCEEDED'}
+
+
+def parse_latency(spec):
+    """
+    Turn a latency spec such as 'lognormal:0.1,0.5' into a sampler.
+
+    Returns:
+        Function rng -> seconds
+    """
+    name, _, params = spec.partition(':')
+    try:
+        values = [float(v) for v in params.split(',')] if params else []
+    except ValueError:
+        raise ValueError(f"Invalid latency parameters: {spec}")
+    arity = {'fixed': 1, 'uniform': 2, 'normal': 2, 'lognormal': 2}
+    if name not in arity or len(values) != arity[name]:
+        raise ValueError(f"Invalid latency spec: {spec} (expected e.g. fixed:0.05, lognormal:0.1,0.5)")
+    if name == 'fixed':
+        return lambda rng: values[0]
+    if name == 'uniform':
+        return lambda rng: rng.uniform(*values)
+    if name == 'normal':
+        return lambda rng: max(rng.gauss(*values), 0.0)
+    median, sigma = values
+    return lambda rng: rng.lognormvariate(0.0, sigma) * median
+
+
+def text_annotation(text, rng):
+    """
+    fullTextAnnotation JSON for `text`: one page, one block and paragraph
+    per line, words with random confidences and line breaks on last symbols.
+    """
+    def poly(x0, y0, x1, y1):
+        return {"vertices": [{"x": x0, "y": y0}, {"x": x1, "y": y0}, {"x": x1, "y": y1}, {"x": x0, "y": y1}]}
+
+    blocks = []
+    for row, line in enumerate(text.split('\n')):
+        words, x, y = [], 20, 40 + row * 60
+        tokens = line.split()
+        for i, token in enumerate(tokens):
+            brk = 'LINE_BREAK' if i == len(tokens) - 1 else 'SPACE'
+            width = 18 * len(token)
+            symbols = [{"text": ch, "confidence": 0.9} for ch in token]
+            symbols[-1]["property"] = {"detectedBreak": {"type": brk}}
+            words.append({
+                "confidence": round(rng.uniform(0.55, 0.99), 3),
+                "boundingBox": poly(x, y, x + width, y + 40),
+                "symbols": symbols,
+            })
+            x += width + 16
+        box = poly(20, y, max(x - 16, 20), y + 40)
+        blocks.append({"blockType": "TEXT", "confidence": 0.9, "boundingBox": box,
+                       "paragraphs": [{"confidence": 0.9, "boundingBox": box, "words": words}]})
+    return {"text": text, "pages": [{"width": 1200, "height": 1600, "confidence": 0.9, "blocks": blocks}]}
+
+
+def load_annotations(path, seed=0):
+    """Canned fullTextAnnotation objects from a JSON file of texts/objects, or the defaults"""
+    entries = DEFAULT_TEXTS
+    if path:
+        with open(path) as f:
+            entries = json.load(f)
+        if not isinstance(entries, list) or not entries:
+            raise ValueError(f"{path} must hold a non-empty JSON list")
+    rng = random.Random(seed)
+    return [text_annotation(entry, rng) if isinstance(entry, str) else entry for entry in entries]
+
+
+class StubState:
+    """Configuration and counters shared by all handler threads"""
+
+    def __init__(self, latency='lognormal:0.1,0.4', per_image=0.005, error_rate=0.0, error_status=503,
+                 image_error_rate=0.0, slow_rate=0.0, slow_latency=2.0, annotations=None, seed=None):
+        self.sample_latency = parse_latency(latency)
+        self.per_image = per_image
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.image_error_rate = image_error_rate
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.annotations = annotations or load_annotations(None)
+        self.counters = {"requests": 0, "images": 0, "errors": 0, "image_errors": 0, "max_batch": 0}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def plan(self, n_images):
+        """Decide delay, request failure and per-image failures for one request"""
+        with self._lock:
+            self.counters["requests"] += 1
+            self.counters["images"] += n_images
+            self.counters["max_batch"] = max(self.counters["max_batch"], n_images)
+            if self._rng.random() < self.slow_rate:
+                delay = self.slow_latency
+            else:
+                delay = self.sample_latency(self._rng) + self.per_image * max(n_images - 1, 0)
+            fail = self._rng.random() < self.error_rate
+            image_failures = [self._rng.random() < self.image_error_rate for _ in range(n_images)]
+            if fail:
+                self.counters["errors"] += 1
+            else:
+                self.counters["image_errors"] += sum(image_failures)
+        return delay, fail, image_failures
+
+    def annotation_for(self, content):
+        digest = hashlib.blake2b(content.encode(), digest_size=8).digest()
+        return self.annotations[int.from_bytes(digest, 'big') % len(self.annotations)]
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    state = None  # set by make_server
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, payload):
+        body = json.dumps(payload, separators=(',', ':')).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status, message):
+        self._send(status, {"error": {"code": status, "message": message,
+                                      "status": STATUS_NAMES.get(status, 'UNKNOWN')}})
+
+    def do_GET(self):
+        if self.path.rstrip('/') == '/stats':
+            self._send(200, self.state.stats())
+        else:
+            self._error(404, f"Unknown path {self.path}")
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length)
+        if not self.path.split('?')[0].endswith('/images:annotate'):
+            self._error(404, f"Unknown path {self.path}")
+            return
+        try:
+            requests = json.loads(raw)["requests"]
+            contents = [request["image"]["content"] for request in requests]
+        except (ValueError, KeyError, TypeError):
+            self._error(400, "Expected {\"requests\": [{\"image\": {\"content\": ...}}]}")
+            return
+
+        delay, fail, image_failures = self.state.plan(len(contents))
+        time.sleep(delay)
+        if fail:
+            self._error(self.state.error_status, 'injected failure')
+            return
+
+        responses = []
+        for content, failed in zip(contents, image_failures):
+            if failed:
+                responses.append({"error": {"code": 14, "message": "injected image failure"}})
+            else:
+                responses.append({"fullTextAnnotation": self.state.annotation_for(content)})
+        self._send(200, {"responses": responses})
+
+
+def make_server(host='127.0.0.1', port=8089, state=None):
+    """A ThreadingHTTPServer bound to host:port (0 picks a free port) serving `state`"""
+    handler = type('BoundStubHandler', (StubHandler,), {"state": state or StubState()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local stand-in for the Cloud Vision images:annotate API')
+    parser.add_argument('--host', default='127.0.0.1', help='Interface to bind')
+    parser.add_argument('--port', type=int, default=8089, help='Port to bind (0 picks a free one)')
+    parser.add_argument('--latency', default='lognormal:0.1,0.4', help='Per-request latency distribution')
+    parser.add_argument('--per-image', type=float, default=0.005, help='Extra seconds per additional image in a batch')
+    parser.add_argument('--slow-rate', type=float, default=0.0, help='Fraction of requests that stall')
+    parser.add_argument('--slow-latency', type=float, default=2.0, help='Seconds a stalled request takes')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests failing with --error-status')
+    parser.add_argument('--error-status', type=int, default=503, help='HTTP status of injected request failures')
+    parser.add_argument('--image-error-rate', type=float, default=0.0,
+                        help='Fraction of images answered with an UNAVAILABLE error inside a 200 response')
+    parser.add_argument('--annotations', help='JSON list of canned texts or fullTextAnnotation objects')
+    parser.add_argument('--seed', type=int, help='Random seed for latencies and failures')
+
+    args = parser.parse_args()
+    try:
+        state = StubState(args.latency, args.per_image, args.error_rate, args.error_status, args.image_error_rate,
+                          args.slow_rate, args.slow_latency, load_annotations(args.annotations), args.seed)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    server = make_server(args.host, args.port, state)
+    host, port = server.server_address[:2]
+    # First stdout line is machine-readable, scripts/load_ocr.py waits for it
+    print(f"listening on http://{host}:{port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
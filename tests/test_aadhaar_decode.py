@@ -0,0 +1,41 @@
+import sys
+import random
+
+import pytest
+
+from decode_aadhaar import base10_to_int, decode_payload
+from aadhaar_fixtures import build_payload, build_raw, sample_fields
+
+# CPython's int/str conversion limit (3.11+); real Secure QR payloads run past it
+DEFAULT_LIMIT = getattr(sys, 'int_info', None) and getattr(sys.int_info, 'default_max_str_digits', 0)
+
+pytestmark = pytest.mark.skipif(not DEFAULT_LIMIT, reason='interpreter has no int/str digit limit')
+
+
+@pytest.fixture(autouse=True)
+def default_limit():
+    """Run under the interpreter's default limit, whatever else changed it"""
+    previous = sys.get_int_max_str_digits()
+    sys.set_int_max_str_digits(DEFAULT_LIMIT)
+    yield
+    sys.set_int_max_str_digits(previous)
+
+
+def test_payload_longer_than_limit_decodes():
+    digits = build_payload('v2', photo_bytes=4000)
+    assert len(digits) > DEFAULT_LIMIT
+    with pytest.raises(ValueError):
+        int(digits)  # what base10_to_int is there to avoid
+
+    result = decode_payload(digits)
+    assert result["success"], result.get("error")
+    assert result["data"]["name"] == sample_fields(random.Random(0))[2]
+
+
+def test_base10_to_int_matches_bytes_past_limit():
+    rng = random.Random(3)
+    raw = build_raw(sample_fields(rng), 9000, rng)
+    value = int.from_bytes(raw, 'big')
+    digits = build_payload('v2', photo_bytes=9000, compression='raw', seed=3)
+    assert len(digits) > 4 * DEFAULT_LIMIT
+    assert base10_to_int(digits) == value
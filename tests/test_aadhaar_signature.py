@@ -0,0 +1,92 @@
+import os
+import random
+
+import pytest
+
+pytest.importorskip('cryptography')
+
+import decode_aadhaar  # noqa: E402
+from decode_aadhaar import AadhaarSecureQrDecoder, decode_payload, load_public_key, verify_payload  # noqa: E402
+from aadhaar_fixtures import build_raw, encode, generate_key, public_key_pem, sample_fields  # noqa: E402
+
+
+@pytest.fixture(scope='module')
+def signing_key():
+    return generate_key()
+
+
+@pytest.fixture(scope='module')
+def other_key():
+    return generate_key()
+
+
+@pytest.fixture(autouse=True)
+def fresh_caches():
+    decode_aadhaar._public_keys.clear()
+    decode_aadhaar._verified = decode_aadhaar.MemoryCache()
+
+
+@pytest.fixture
+def cert_path(tmp_path, signing_key):
+    path = tmp_path / 'qr_pub.pem'
+    path.write_bytes(public_key_pem(signing_key))
+    return str(path)
+
+
+def signed_raw(private_key, seed=0):
+    rng = random.Random(seed)
+    return build_raw(sample_fields(rng), 800, rng, private_key)
+
+
+def test_valid_signature(signing_key, cert_path):
+    assert verify_payload(encode(signed_raw(signing_key)), cert_path) is True
+
+
+def test_valid_signature_through_decode_payload(signing_key, cert_path):
+    result = decode_payload(encode(signed_raw(signing_key), 'zlib'), ['name'], verify=True, cert_path=cert_path)
+    assert result['success'] and result['verified'] is True
+
+
+def test_tampered_body(signing_key, cert_path):
+    raw = bytearray(signed_raw(signing_key))
+    raw[20] ^= 0x01  # Inside the text fields, well before the signature
+    assert verify_payload(encode(bytes(raw)), cert_path) is False
+
+
+def test_wrong_key(other_key, cert_path):
+    assert verify_payload(encode(signed_raw(other_key)), cert_path) is False
+
+
+@pytest.mark.parametrize('cut', [1, 100, 255])
+def test_truncated_signature(signing_key, cert_path, cut):
+    payload = encode(signed_raw(signing_key)[:-cut])
+    assert verify_payload(payload, cert_path) is False
+    decoder = AadhaarSecureQrDecoder(payload)
+    assert decoder.verify_signature(load_public_key(cert_path)) is False
+
+
+def test_default_and_explicit_cert_share_cache_entry(signing_key, cert_path, monkeypatch):
+    monkeypatch.setattr(decode_aadhaar, 'DEFAULT_CERT_PATH', cert_path)
+    monkeypatch.delenv('AADHAAR_CERT_PATH', raising=False)
+    payload = encode(signed_raw(signing_key))
+
+    assert verify_payload(payload) is True
+    assert verify_payload(payload, cert_path) is True
+    assert verify_payload(payload, os.path.join(os.path.dirname(cert_path), '.', 'qr_pub.pem')) is True
+    stats = decode_aadhaar._verified.stats()
+    assert (stats['entries'], stats['hits'], stats['misses']) == (1, 2, 1)
+    assert len(decode_aadhaar._public_keys) == 1
+
+
+def test_replaced_cert_is_not_served_from_cache(signing_key, other_key, cert_path):
+    payload = encode(signed_raw(signing_key))
+    assert verify_payload(payload, cert_path) is True
+
+    # Rotate the certificate the way a deploy would: write a new file and rename it over the old one
+    replacement = cert_path + '.new'
+    with open(replacement, 'wb') as f:
+        f.write(public_key_pem(other_key))
+    os.replace(replacement, cert_path)
+
+    assert verify_payload(payload, cert_path) is False
+    assert verify_payload(encode(signed_raw(other_key)), cert_path) is True
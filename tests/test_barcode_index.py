@@ -0,0 +1,74 @@
+"""BarcodeIndex readers racing a compaction in another process"""
+
+import os
+
+import pytest
+
+import barcode_index
+from barcode_index import BarcodeIndex, Issued
+
+
+def issued(count, date=261017, start=1):
+    return [Issued('LAB', date, seq, 83012, 123456, 'CBC', '7', seq) for seq in range(start, start + count)]
+
+
+@pytest.fixture
+def directory(tmp_path):
+    writer = BarcodeIndex(str(tmp_path), compact_every=10 ** 6)
+    writer.add(issued(100))
+    writer.compact()
+    writer.add(issued(20, start=101))
+    writer.close()
+    return str(tmp_path)
+
+
+def publish_without_truncating(directory):
+    """The first half of _compact_locked: the merged file is in place, the log still full"""
+    writer = BarcodeIndex(directory)
+    writer.refresh()
+    merged = sorted(list(writer._iter_sorted(0, writer._count)) + writer._log, key=barcode_index._sort_key)
+    writer._write_sorted(merged, len(merged))
+    writer.close()
+
+
+def test_reader_ignores_log_already_merged(directory):
+    publish_without_truncating(directory)
+
+    reader = BarcodeIndex(directory)
+    assert len(reader) == 120
+    sequences = [r.sequence for r in reader.range('LAB', 261017)]
+    assert sequences == list(range(1, 121))
+
+    # Once truncated, appends that reach the stale log's size are still picked up
+    open(os.path.join(directory, 'issued.log'), 'wb').close()
+    BarcodeIndex(directory).add(issued(20, start=121))
+    assert len(reader) == 140
+    assert reader.gaps('LAB', 261017) == []
+    reader.close()
+
+
+def test_reader_retries_when_compaction_empties_log(directory, monkeypatch):
+    reader = BarcodeIndex(directory)
+    getsize = os.path.getsize
+    compacted = []
+
+    def compact_first(path):
+        # Another process compacts after the reader mapped the old file but before it reads the log
+        if path.endswith('issued.log') and not compacted:
+            compacted.append(True)
+            BarcodeIndex(directory).compact()
+        return getsize(path)
+
+    monkeypatch.setattr(barcode_index.os.path, 'getsize', compact_first)
+    assert len(reader) == 120
+    assert compacted
+    assert reader._count == 120 and reader._log == []
+    reader.close()
+
+
+def test_exact_reissue_in_log_is_kept_until_compaction(directory):
+    # A log that is not wholly in the sorted file is read as is, duplicates included
+    writer = BarcodeIndex(directory)
+    writer.add(issued(1, start=5))
+    assert len(writer) == 121
+    writer.close()
@@ -0,0 +1,162 @@
+"""check_schema.check() and --fix on a synthetic multi-thousand-model schema"""
+
+import os
+import sys
+import json
+import subprocess
+
+import pytest
+
+import check_schema
+from prisma_schema import parse
+
+MODELS = 3000
+DUPLICATED = ['Model10', 'Model11', 'Model12', 'Status7']
+CONFLICTING = 'Model20'
+
+HEADER = """generator client {
+  provider = "prisma-client-js"
+}
+
+datasource db {
+  provider = "postgresql"
+  url      = env("DATABASE_URL")
+}
+"""
+
+DANGLING = """
+model Orphan {
+  id       String   @id
+  ghostId  String
+  ghost    Ghost    @relation(fields: [ghostId], references: [id])
+  parentId String
+  parent   Model1   @relation("orphanParent", fields: [parentId, missingId], references: [id])
+  otherId  String
+  other    Model2   @relation("orphanOther", fields: [otherId], references: [nope])
+}
+"""
+
+
+def model(i):
+    # Each model points at the previous one; // comments must not affect the digest
+    relation = (f"  parentId  String?\n  parent    Model{i - 1}? @relation(\"chain{i}\", fields: [parentId], "
+                f"references: [id])\n" if i else "")
+    return (f"model Model{i} {{\n  id        String   @id @default(uuid())  // row id\n"
+            f"  name      String\n  status    Status{i % 10}\n  createdAt DateTime @default(now())\n"
+            f"{relation}\n  @@index([name])\n}}\n")
+
+
+def enum(i):
+    return f"enum Status{i} {{\n  ACTIVE\n  INACTIVE\n}}\n"
+
+
+def blocks_by_name():
+    blocks = {f"Status{i}": enum(i) for i in range(10)}
+    blocks.update((f"Model{i}", model(i)) for i in range(MODELS))
+    return blocks
+
+
+def synthetic_schema():
+    blocks = blocks_by_name()
+    parts = [HEADER] + list(blocks.values())
+    # Exact repeats, one re-indented with different comments, and one real redefinition
+    parts += [blocks[name] for name in DUPLICATED[:-1]]
+    parts.append(blocks[DUPLICATED[-1]].replace('  ACTIVE', '    ACTIVE  // still identical'))
+    parts.append(blocks[CONFLICTING].replace('  name      String\n', '  name      String?\n'))
+    parts.append(DANGLING)
+    return '\n'.join(parts)
+
+
+@pytest.fixture(scope='module')
+def text():
+    return synthetic_schema()
+
+
+@pytest.fixture
+def schema_path(tmp_path, text):
+    path = tmp_path / 'schema.prisma'
+    path.write_text(text, encoding='utf-8')
+    return path
+
+
+def run_main(monkeypatch, *argv):
+    monkeypatch.setattr(sys, 'argv', ['check_schema.py', *map(str, argv)])
+    return check_schema.main()
+
+
+def test_check_finds_injected_issues(text):
+    schema = parse(text)
+    assert len(schema.blocks) > MODELS
+
+    report = check_schema.check(schema)
+
+    assert [issue["name"] for issue in report["duplicates"]] == DUPLICATED
+    for issue in report["duplicates"] + report["conflicts"]:
+        assert issue["line"] > issue["first_line"]
+        assert text.splitlines()[issue["line"] - 1].split()[1] == issue["name"]
+    assert [(issue["kind"], issue["name"]) for issue in report["conflicts"]] == [('model', CONFLICTING)]
+
+    dangling = {(issue["model"], issue["field"]): issue["reason"] for issue in report["dangling"]}
+    assert dangling == {
+        ('Orphan', 'ghost'): "unknown type",
+        ('Orphan', 'parent'): "fields not on Orphan: missingId",
+        ('Orphan', 'other'): "references not on Model2: nope",
+    }
+
+
+def test_clean_schema_has_no_issues():
+    text = '\n'.join([HEADER] + list(blocks_by_name().values()))
+    assert check_schema.check(parse(text)) == {"duplicates": [], "conflicts": [], "dangling": []}
+
+
+def test_fix_removes_duplicates_and_keeps_conflicts(monkeypatch, capsys, schema_path, text):
+    status = run_main(monkeypatch, schema_path, '--fix', '--json')
+    captured = capsys.readouterr()
+
+    # The edit log goes to stderr so stdout stays one JSON document
+    report = json.loads(captured.out)
+    assert status == 1
+    assert report["success"] is False
+    assert report["duplicates"] == []
+    assert [issue["name"] for issue in report["conflicts"]] == [CONFLICTING]
+    assert len(report["dangling"]) == 3
+    for name in DUPLICATED:
+        assert "remove duplicate" in captured.err and f" {name} " in captured.err
+
+    fixed = schema_path.read_text(encoding='utf-8')
+    for name in DUPLICATED:
+        assert fixed.count(f" {name} {{") == 1
+    assert fixed.count(f"model {CONFLICTING} {{") == 2
+    assert 'model Orphan {' in fixed
+    # Only the removed blocks changed
+    assert len(parse(fixed).blocks) == len(parse(text).blocks) - len(DUPLICATED)
+
+    # A second run has nothing left to remove
+    assert run_main(monkeypatch, schema_path, '--fix') == 1
+    out = capsys.readouterr().out
+    assert "Schema already up to date" in out
+    assert f"conflict model {CONFLICTING}" in out
+    assert schema_path.read_text(encoding='utf-8') == fixed
+
+
+def test_exit_status_and_text_report(monkeypatch, capsys, tmp_path):
+    path = tmp_path / 'clean.prisma'
+    path.write_text('\n'.join([HEADER, enum(0), model(0)]), encoding='utf-8')
+    assert run_main(monkeypatch, path) == 0
+    assert "0 issue(s)" in capsys.readouterr().out
+
+    assert run_main(monkeypatch, tmp_path / 'missing.prisma', '--json') == 1
+    assert json.loads(capsys.readouterr().err)["success"] is False
+
+
+def test_prisma_schema_dedupe_keeps_conflicts(schema_path):
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts', 'prisma_schema.py')
+    completed = subprocess.run([sys.executable, script, str(schema_path), '--dedupe', '--write'],
+                               capture_output=True, text=True, timeout=120)
+    assert completed.returncode == 1, completed.stderr
+    assert f"conflict model {CONFLICTING}" in completed.stdout
+
+    fixed = schema_path.read_text(encoding='utf-8')
+    for name in DUPLICATED:
+        assert fixed.count(f" {name} {{") == 1
+    assert fixed.count(f"model {CONFLICTING} {{") == 2
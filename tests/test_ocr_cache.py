@@ -0,0 +1,54 @@
+"""What the OCR result cache stores for plain and structured requests"""
+
+import base64
+
+import pytest
+
+import ocr_handwriting
+from ocr_resilience import FakeVisionBackend
+
+IMAGE = base64.b64encode(b'not really a png').decode()
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ocr_handwriting.open_cache(str(tmp_path))
+    yield cache
+    cache.close()
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    monkeypatch.setattr(ocr_handwriting, '_SDK_REQUIRED', False)
+    return FakeVisionBackend(latency=0, jitter=0, error_rate=0, slow_rate=0, seed=7)
+
+
+def stored(cache):
+    return cache.get(ocr_handwriting.raw_cache_key(base64.b64decode(IMAGE)))
+
+
+def test_plain_request_caches_no_structure(cache, backend):
+    result = ocr_handwriting.recognize(IMAGE, client=backend, preset='none', cache=cache)
+    assert "structure" not in result
+    assert "structure" not in stored(cache)
+
+    # A structured request cannot be answered from that entry, and replaces it
+    structured = ocr_handwriting.recognize(IMAGE, client=backend, preset='none', cache=cache, structured=True)
+    assert "cached" not in structured
+    assert backend.calls == 2
+    assert stored(cache)["structure"]["words"]["conf"]["dtype"] == 'float32'
+
+
+def test_structure_is_cached_packed_and_rebuilt(cache, backend):
+    fresh = ocr_handwriting.recognize(IMAGE, client=backend, preset='none', cache=cache, structured=True)
+    packed = ocr_handwriting.recognize(IMAGE, client=backend, preset='none', cache=cache, structured=True,
+                                       packed=True)
+    unpacked = ocr_handwriting.recognize(IMAGE, client=backend, preset='none', cache=cache, structured=True)
+    plain = ocr_handwriting.recognize(IMAGE, client=backend, preset='none', cache=cache)
+
+    assert backend.calls == 1
+    assert packed["cached"] and unpacked["cached"] and plain["cached"]
+    assert packed["structure"] == stored(cache)["structure"]
+    assert unpacked["structure"] == fresh["structure"]
+    assert isinstance(fresh["structure"]["words"]["conf"], list)
+    assert "structure" not in plain
@@ -0,0 +1,61 @@
+"""ocr_document page window and error reporting"""
+
+import io
+import os
+import sys
+import json
+import asyncio
+import subprocess
+
+from ocr_document import ocr_document
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+class SlowFirstPage:
+    """Answers every page at once except page 1, which waits for `release`"""
+
+    def __init__(self):
+        self.release = asyncio.Event()
+
+    async def recognize_image(self, image_bytes, preset=None, structured=False, packed=False):
+        if image_bytes == b'1':
+            await self.release.wait()
+        return {"success": True, "text": f"page {image_bytes.decode()}"}
+
+
+def test_slow_page_holds_back_only_the_window():
+    pulled = []
+
+    def pages():
+        for number in range(1, 41):
+            pulled.append(number)
+            yield number, str(number).encode()
+
+    async def scenario():
+        service, out = SlowFirstPage(), io.StringIO()
+        document = asyncio.ensure_future(ocr_document(None, out, service, window=3, pages=pages()))
+        for _ in range(50):
+            await asyncio.sleep(0.01)
+        # Pages 2 and 3 finished behind page 1; nothing past the window was rasterized
+        assert pulled == [1, 2, 3]
+        service.release.set()
+        return await asyncio.wait_for(document, 5), out.getvalue()
+
+    summary, output = asyncio.run(scenario())
+    assert summary == {"done": True, "pages": 40, "failed": []}
+    final = json.loads(output.splitlines()[-1])
+    assert final["text"] == '\n\f\n'.join(f"page {n}" for n in range(1, 41))
+
+
+def test_unreadable_document_ends_with_error_line():
+    completed = subprocess.run(
+        [sys.executable, os.path.join(ROOT, 'lib/ocr_handwriting.py'), '--document'],
+        input='not*base64', capture_output=True, text=True, timeout=60,
+        env=dict(os.environ, OCR_BACKEND='fake', OCR_FAKE_LATENCY='0'))
+    lines = completed.stdout.splitlines()
+    assert completed.returncode == 0
+    assert len(lines) == 1
+    result = json.loads(lines[0])
+    assert result["done"] is True and result["success"] is False
+    assert "Invalid base64" in result["error"]
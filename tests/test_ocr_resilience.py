@@ -0,0 +1,210 @@
+"""ResilientCaller / CircuitBreaker against FakeVisionBackend with a fake clock and fixed seeds"""
+
+import random
+import threading
+import itertools
+from types import SimpleNamespace
+
+import pytest
+
+import ocr_resilience
+from ocr_resilience import (BackendError, CircuitBreaker, CircuitOpenError, DeadlineExceededError,
+                            FakeVisionBackend, LatencyTracker, ResilientCaller)
+
+SEED = 1234
+
+
+class FakeClock:
+    """monotonic()/sleep() where sleeping only advances the reading"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+        self._lock = threading.Lock()
+
+    def monotonic(self):
+        with self._lock:
+            return self.now
+
+    def sleep(self, seconds):
+        with self._lock:
+            self.sleeps.append(seconds)
+            self.now += max(seconds, 0)
+
+    def advance(self, seconds):
+        self.sleep(seconds)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(ocr_resilience, 'time', SimpleNamespace(monotonic=clock.monotonic, sleep=clock.sleep))
+    monkeypatch.setattr(ocr_resilience.random, 'uniform', random.Random(SEED).uniform)
+    return clock
+
+
+def backend(**kwargs):
+    options = dict(latency=0, jitter=0, error_rate=0, slow_rate=0, seed=SEED)
+    options.update(kwargs)
+    return FakeVisionBackend(**options)
+
+
+def detect(fake):
+    return lambda timeout: fake.document_text_detection(timeout=timeout)
+
+
+def test_retries_stop_at_deadline(clock):
+    fake = backend(error_rate=1)
+    caller = ResilientCaller(max_attempts=10, base_delay=1.0, max_delay=8.0)
+
+    with pytest.raises(BackendError) as excinfo:
+        caller.call(detect(fake), deadline_s=2.0)
+
+    # Replay the seeded full-jitter schedule: retry while the next delay still fits the deadline
+    rng, now, attempts = random.Random(SEED), 0.0, 0
+    for attempt in range(10):
+        attempts += 1
+        delay = rng.uniform(0, min(8.0, 1.0 * 2 ** attempt))
+        if now + delay >= 2.0:
+            break
+        now += delay
+    assert excinfo.value.status == 'UNAVAILABLE'
+    assert 1 < attempts < 10
+    assert fake.calls == attempts
+    assert caller.retries == attempts - 1
+    assert clock.now == pytest.approx(now)
+    assert clock.now < 2.0
+
+
+def test_slow_backend_exhausts_deadline_in_one_attempt(clock):
+    fake = backend(latency=5.0)
+    caller = ResilientCaller(max_attempts=4)
+
+    with pytest.raises(DeadlineExceededError):
+        caller.call(detect(fake), deadline_s=1.0)
+
+    assert fake.calls == 1
+    assert caller.retries == 0
+    assert clock.now == pytest.approx(1.0)
+
+
+def test_non_retryable_error_is_not_retried(clock):
+    fake = backend(error_rate=1, error_status='INVALID_ARGUMENT')
+    caller = ResilientCaller(max_attempts=4)
+
+    with pytest.raises(BackendError):
+        caller.call(detect(fake), deadline_s=10.0)
+
+    assert fake.calls == 1
+    assert caller.breaker.state == 'closed'
+    assert caller.breaker.failures == 0
+
+
+def test_breaker_opens_half_opens_and_closes(clock):
+    fake = backend(error_rate=1)
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30.0)
+    caller = ResilientCaller(max_attempts=1, breaker=breaker)
+
+    for _ in range(3):
+        with pytest.raises(BackendError):
+            caller.call(detect(fake), deadline_s=5.0)
+    assert breaker.state == 'open'
+
+    # Open: fail fast without touching the backend
+    with pytest.raises(CircuitOpenError):
+        caller.call(detect(fake), deadline_s=5.0)
+    assert fake.calls == 3
+
+    clock.advance(29.0)
+    with pytest.raises(CircuitOpenError):
+        caller.call(detect(fake), deadline_s=5.0)
+
+    # Half-open: one trial, which fails and re-opens the breaker
+    clock.advance(1.0)
+    with pytest.raises(BackendError):
+        caller.call(detect(fake), deadline_s=5.0)
+    assert fake.calls == 4
+    assert breaker.state == 'open'
+
+    # The next trial succeeds and closes it
+    clock.advance(30.0)
+    fake.error_rate = 0
+    response = caller.call(detect(fake), deadline_s=5.0)
+    assert response.full_text_annotation.text == fake.text
+    assert fake.calls == 5
+    assert breaker.state == 'closed'
+    assert breaker.failures == 0
+
+
+def test_half_open_admits_a_single_trial(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10.0)
+    breaker.record_failure()
+    clock.advance(10.0)
+
+    breaker.allow()
+    assert breaker.state == 'half-open'
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+    breaker.record_success()
+    assert breaker.state == 'closed'
+    breaker.allow()
+
+
+def warm_latency(seconds):
+    latency = LatencyTracker(min_samples=20)
+    for _ in range(20):
+        latency.add(seconds)
+    return latency
+
+
+def test_hedge_wins_over_stuck_request(clock):
+    fake = backend()
+    order = itertools.count()
+    release = threading.Event()
+
+    def fn(timeout):
+        if next(order) == 0:
+            release.wait(5)
+            raise BackendError('UNAVAILABLE', 'late loser')
+        return fake.document_text_detection(timeout=timeout)
+
+    caller = ResilientCaller(hedge=True, latency=warm_latency(0.02))
+    try:
+        response = caller.call(fn, deadline_s=10.0)
+        # Returned while the first request is still stuck
+        assert not release.is_set()
+    finally:
+        release.set()
+        caller._pool.shutdown(wait=True)
+
+    assert response.full_text_annotation.text == fake.text
+    assert caller.hedged == 1
+    assert caller.retries == 0
+    assert fake.calls == 1
+    # The loser's late failure does not count against the breaker
+    assert caller.breaker.failures == 0
+
+
+def test_winner_cancels_queued_hedge(clock):
+    fake = backend()
+    order = itertools.count()
+    busy = threading.Event()
+    caller = ResilientCaller(hedge=True, latency=warm_latency(0.02), workers=1)
+
+    def fn(timeout):
+        if next(order) == 0:
+            # Other traffic queues up on the only worker, so the hedge waits behind it
+            caller._pool.submit(busy.wait, 5)
+            threading.Event().wait(0.3)
+        return fake.document_text_detection(timeout=timeout)
+
+    try:
+        response = caller.call(fn, deadline_s=10.0)
+    finally:
+        busy.set()
+        caller._pool.shutdown(wait=True)
+
+    assert response.full_text_annotation.text == fake.text
+    assert caller.hedged == 1
+    assert next(order) == 1  # the cancelled hedge never ran
+    assert fake.calls == 1
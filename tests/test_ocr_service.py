@@ -0,0 +1,77 @@
+"""OcrService resolves every caller of a batch, whatever the batch call does"""
+
+import asyncio
+import base64
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+import ocr_handwriting
+from ocr_handwriting import OcrService
+
+IMAGES = [base64.b64encode(f'image {i}'.encode()).decode() for i in range(4)]
+
+
+@pytest.fixture(autouse=True)
+def local_backend(monkeypatch):
+    monkeypatch.setattr(ocr_handwriting, '_SDK_REQUIRED', False)
+
+
+def service(annotate):
+    return OcrService(SimpleNamespace(size=1, get=lambda: None), window=0.05, annotate=annotate)
+
+
+async def recognize_all(ocr):
+    try:
+        return await asyncio.wait_for(asyncio.gather(*(ocr.recognize(image) for image in IMAGES)), 5)
+    finally:
+        await ocr.close()
+
+
+def ok(images, client, deadline):
+    return [{"success": True, "text": image.decode()} for image in images]
+
+
+def test_batch_results_reach_their_callers():
+    results = asyncio.run(recognize_all(service(ok)))
+    assert [r["text"] for r in results] == [f'image {i}' for i in range(4)]
+
+
+def test_short_response_fails_every_caller():
+    results = asyncio.run(recognize_all(service(lambda images, client, deadline: ok(images, client, deadline)[:-1])))
+    assert all(not r["success"] for r in results)
+    assert all("3 responses for 4 images" in r["error"] for r in results)
+
+
+def test_batch_error_fails_every_caller():
+    def fail(images, client, deadline):
+        raise ValueError("quota exceeded")
+
+    results = asyncio.run(recognize_all(service(fail)))
+    assert [r["error"] for r in results] == ["quota exceeded"] * 4
+
+
+def test_cancelled_batch_fails_every_caller():
+    started, release = threading.Event(), threading.Event()
+
+    def stuck(images, client, deadline):
+        started.set()
+        release.wait(5)
+        return ok(images, client, deadline)
+
+    async def scenario():
+        ocr = service(stuck)
+        pending = [asyncio.ensure_future(ocr.recognize(image)) for image in IMAGES]
+        while not started.is_set():
+            await asyncio.sleep(0.01)
+        for task in list(ocr._inflight):
+            task.cancel()
+        try:
+            return await asyncio.wait_for(asyncio.gather(*pending), 5)
+        finally:
+            release.set()
+            await ocr.close()
+
+    results = asyncio.run(scenario())
+    assert [r["error"] for r in results] == ["OCR batch was cancelled"] * 4
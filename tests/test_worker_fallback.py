@@ -0,0 +1,84 @@
+"""CLIs fall back to in-process work when the worker answers but fails"""
+
+import os
+import sys
+import json
+import base64
+import socket
+import shutil
+import tempfile
+import threading
+import subprocess
+
+import pytest
+
+from aadhaar_fixtures import build_payload
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+REPLIES = {
+    'draining': b'{"id": 1, "ok": false, "error": "Worker is draining"}\n',
+    'handler-error': b'{"id": 1, "ok": false, "error": "KeyError: \'patient_id\'"}\n',
+    'truncated': b'{"id": 1, "ok": tr',
+}
+
+
+@pytest.fixture(params=sorted(REPLIES))
+def stub_worker(request):
+    """A unix socket that answers every request with one canned reply"""
+    directory = tempfile.mkdtemp(prefix='wk', dir='/tmp')  # AF_UNIX paths are short
+    path = os.path.join(directory, 'worker.sock')
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen()
+    requests = []
+
+    def answer():
+        while True:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                return
+            with conn, conn.makefile('rb') as stream:
+                requests.append(json.loads(stream.readline()))
+                conn.sendall(REPLIES[request.param])
+
+    thread = threading.Thread(target=answer, daemon=True)
+    thread.start()
+    yield path, requests
+    server.close()
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+def run(script, args, stdin, socket_path, **env):
+    environ = dict(os.environ, MEDFLOW_WORKER_SOCKET=socket_path, **env)
+    completed = subprocess.run([sys.executable, os.path.join(ROOT, script), *args], input=stdin,
+                               capture_output=True, text=True, env=environ, timeout=60)
+    assert completed.returncode == 0, completed.stderr
+    assert 'Traceback' not in completed.stderr
+    return json.loads(completed.stdout)
+
+
+def test_barcode_generated_in_process(stub_worker):
+    path, requests = stub_worker
+    result = run('scripts/generate_barcode.py', ['-p', 'UHID-123456', '-t', 'CBC', '-s', '12'], '', path)
+    assert requests and requests[0]["op"] == 'barcode.generate'
+    assert result["is_valid"] is True
+    assert result["components"]["sequence"] == '0012'
+
+
+def test_aadhaar_decoded_in_process(stub_worker):
+    path, requests = stub_worker
+    result = run('lib/decode_aadhaar.py', [], build_payload('v2', photo_bytes=500), path)
+    assert requests and requests[0]["op"] == 'aadhaar.decode'
+    assert result["success"], result
+
+
+def test_ocr_recognized_in_process(stub_worker):
+    path, requests = stub_worker
+    image = base64.b64encode(b'not really a png').decode()
+    result = run('lib/ocr_handwriting.py', ['--preset', 'none'], image, path,
+                 OCR_BACKEND='fake', OCR_FAKE_LATENCY='0')
+    assert requests and requests[0]["op"] == 'ocr.handwriting'
+    assert result["success"], result
+    assert result["text"]